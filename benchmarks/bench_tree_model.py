@@ -0,0 +1,114 @@
+"""
+Benchmark sorting, filtering and searching the tag tree of a large save.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tree_model [tag count]
+"""
+
+import random
+import sys
+import time
+
+from PyQt6.QtCore import QCoreApplication, QSortFilterProxyModel, Qt
+
+from msc.es2.enums import ES2ValueType
+from msc.es2.types import ES2Field
+from msc.es2.unity import Transform
+from gui.models import TagFilterProxyModel, TreeModel, TreeItemIndex
+from gui.search import SearchIndex
+
+
+def make_data(count: int) -> dict[str, ES2Field]:
+    random.seed(count)
+    vins = ["101", "102", "103", "111", "201", "301"]
+    data: dict[str, ES2Field] = {}
+    for i in range(count):
+        match i % 4:
+            case 0:
+                tag = f"VIN{random.choice(vins)}{i}WEA"
+                field = ES2Field.from_value_type(ES2ValueType.float, random.random())
+            case 1:
+                tag = f"item{i}Transform"
+                field = ES2Field.from_value_type(ES2ValueType.transform, Transform())
+            case 2:
+                tag = f"beercase{i}Consumed"
+                field = ES2Field.from_value_type(ES2ValueType.int32, i)
+            case _:
+                tag = f"tag{i}Name"
+                field = ES2Field.from_value_type(ES2ValueType.string, f"value {i}")
+        data[tag] = field
+    return data
+
+
+def bench(name: str, func, repeat: int = 3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<24} {min(timings) * 1000:10.1f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    app = QCoreApplication(sys.argv)  # noqa: F841
+
+    data = make_data(count)
+    print(f"{count} tags")
+
+    model: TreeModel | None = None
+
+    def build():
+        nonlocal model
+        model = TreeModel(data)
+        model.fetch_all()
+
+    bench("build + fetch all", build, repeat=1)
+    assert model is not None
+
+    proxy = QSortFilterProxyModel()
+    proxy.setRecursiveFilteringEnabled(True)
+    proxy.setAutoAcceptChildRows(True)
+    proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    proxy.setSourceModel(model)
+
+    orders = iter([Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder] * 10)
+    bench("sort", lambda: proxy.sort(TreeItemIndex.TAG.value, next(orders)))
+
+    patterns = iter(["*WEA", "beercase1*", "*Transform", "tag9*", "*"] * 10)
+
+    def filter():
+        proxy.setFilterWildcard(next(patterns))
+        proxy.rowCount()
+
+    bench("filter", filter)
+
+    search_index: SearchIndex | None = None
+
+    def build_index():
+        nonlocal search_index
+        search_index = SearchIndex.build(data)
+
+    bench("search index build", build_index, repeat=1)
+    assert search_index is not None
+
+    queries = iter(["*WEA", "beercase1*", "value 9", "engine", "*"] * 10)
+    bench("search index query", lambda: search_index.search(next(queries)))
+
+    tag_proxy = TagFilterProxyModel()
+    tag_proxy.setRecursiveFilteringEnabled(True)
+    tag_proxy.setAutoAcceptChildRows(True)
+    tag_proxy.setSourceModel(model)
+    queries = iter(["*WEA", "beercase1*", "value 9", "engine", "*"] * 10)
+
+    def search_and_filter():
+        assert search_index is not None
+        tag_proxy.set_matching_tags(search_index.search(next(queries)))
+        tag_proxy.rowCount()
+
+    bench("search + filter", search_and_filter)
+
+
+if __name__ == "__main__":
+    main()
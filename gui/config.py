@@ -18,10 +18,22 @@ def _default_open_file_dir():
     return str(open_file_dir.resolve())
 
 
+def cache_dir() -> Path:
+    """
+    Directory for files that can be generated again, like the map tiles.
+    """
+    if sys.platform == "win32":
+        return Path(os.path.expandvars("%LOCALAPPDATA%/msceditor"))
+    return Path("~/.cache/msceditor").expanduser()
+
+
 @dataclass
 class Config:
     open_file_dir: str = field(default_factory=_default_open_file_dir)
     open_files: list[str] = field(default_factory=list)
+    # Backups kept per save file, see msc.backups.RetentionPolicy
+    backup_versions: int = 50
+    backup_max_age_days: float | None = None
 
 
 class ConfigLoader:
@@ -1,3 +1,4 @@
 from .bolts import BoltCheckerDialog  # noqa
+from .bulk import BulkEditDialog  # noqa
 from .edit import EditDialog  # noqa
 from .error import ErrorDialog  # noqa
@@ -0,0 +1,84 @@
+from typing import Any
+
+from PyQt6.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QLineEdit,
+)
+
+from msc.bulk import BulkEditError, bulk_edit
+from msc.es2.types import ES2Field
+from msc.query import QueryError, ValueIndex
+
+
+class BulkEditDialog(QDialog):
+    """
+    Ask for a query and an expression, and preview how many tags change.
+    """
+
+    # The new values for the current query and expression
+    values: dict[str, Any]
+
+    def __init__(
+        self, data: dict[str, ES2Field], index: ValueIndex, query: str = "", parent=None
+    ):
+        super().__init__(parent)
+
+        self.data = data
+        self.index = index
+        self.values = {}
+
+        self.setWindowTitle("Bulk edit")
+        self.query_field = QLineEdit(query)
+        self.query_field.setPlaceholderText("tag:*WEA type:float")
+        self.expression_field = QLineEdit()
+        self.expression_field.setPlaceholderText("0, max(value, 10), not value, ...")
+        self.preview = QLabel()
+        self.preview.setWordWrap(True)
+
+        self.buttonBox = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+
+        layout = QFormLayout()
+        layout.addRow("Query", self.query_field)
+        layout.addRow("Expression", self.expression_field)
+        layout.addRow(self.preview)
+        layout.addRow(self.buttonBox)
+        self.setLayout(layout)
+
+        self.query_field.textChanged.connect(self.update_preview)
+        self.expression_field.textChanged.connect(self.update_preview)
+        self.update_preview()
+
+    def query(self) -> str:
+        return self.query_field.text().strip()
+
+    def update_preview(self):
+        """
+        Slot that gets triggered by the textChanged signal of both fields.
+        """
+        self.values = {}
+        ok = self.buttonBox.button(QDialogButtonBox.StandardButton.Ok)
+        query, expression = self.query(), self.expression_field.text().strip()
+        if not query or not expression:
+            self.preview.setText("Enter a query and an expression")
+            ok.setEnabled(False)
+            return
+        try:
+            self.values = bulk_edit(self.data, query, expression, self.index)
+        except (QueryError, BulkEditError) as e:
+            self.preview.setText(str(e))
+            ok.setEnabled(False)
+            return
+        examples = ", ".join(
+            f"{tag} = {value!r}" for tag, value in list(self.values.items())[:3]
+        )
+        self.preview.setText(
+            f"{len(self.values)} tag(s) change" + (f": {examples}" if examples else "")
+        )
+        ok.setEnabled(bool(self.values))
@@ -4,7 +4,9 @@ from PyQt6.QtWidgets import QDialog
 from PyQt6.uic.load_ui import loadUi
 
 from msc.es2.types import ES2Field
+from msc.es2.writer import check_field
 
+from gui.dialogs.error import ErrorDialog
 from gui.widgets.edit import EditWidget
 
 
@@ -22,5 +24,16 @@ class EditDialog(QDialog):
         self.widget = EditWidget(tag=tag, item=item)
         self.ui.verticalLayout.insertWidget(0, self.widget)
 
+    def accept(self):
+        """
+        Only close the dialog when the value can be saved, like a byte up to 255.
+        """
+        try:
+            check_field(ES2Field(self.item.header, self.widget.get_value()))
+        except ValueError as e:
+            ErrorDialog(e, self).exec()
+            return
+        super().accept()
+
     def get_value(self):
         return self.widget.get_value()
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+import re
+
+
+@dataclass(frozen=True)
+class GroupingRule:
+    """
+    Tags that start with a match of pattern are grouped under the matched prefix.
+
+    The pattern must not contain named groups, it gets combined with the patterns of
+    the other rules into one regex.
+    """
+
+    name: str
+    pattern: str
+    # Only group when the document also has a tag that is exactly the prefix.
+    require_root: bool = False
+
+
+GROUPING_RULES = [
+    # VIN1010AID, VIN1010TGH, ... -> VIN101; VIN213B1POS -> VIN213B
+    GroupingRule("vin", r"VIN\d{3}[B-Z]?"),
+    # shoppingbag12Keys, shoppingbag12Values -> shoppingbag12, no root means the bag is gone
+    GroupingRule("shoppingbag", r"shoppingbag\d+", require_root=True),
+    # beercase12Bottles, r20batterybox01Quantity -> beercase12, r20batterybox01
+    GroupingRule("item", r"[a-z][a-z0-9]*?[a-z]\d+(?=[A-Z]|$)", require_root=True),
+]
+
+
+class TagGrouper:
+    """
+    Classifies tags into groups with a single regex match per tag.
+
+    All rules are compiled into one alternation, the first rule that matches wins.
+    Classifications are cached by tag, so they are shared between documents.
+    """
+
+    rules: list[GroupingRule]
+
+    def __init__(self, rules: list[GroupingRule] = GROUPING_RULES):
+        self.rules = list(rules)
+        self._regex = re.compile(
+            "|".join(
+                f"(?P<rule{i}>{rule.pattern})" for i, rule in enumerate(self.rules)
+            )
+        )
+        self._cache: dict[str, tuple[GroupingRule, str] | None] = {}
+
+    def classify(self, tag: str) -> tuple[GroupingRule, str] | None:
+        """
+        The rule that matches tag and the prefix it groups under, or None.
+        """
+        try:
+            return self._cache[tag]
+        except KeyError:
+            pass
+        result = None
+        if m := self._regex.match(tag):
+            assert m.lastgroup
+            result = (self.rules[int(m.lastgroup.removeprefix("rule"))], m.group())
+        self._cache[tag] = result
+        return result
+
+    def group_prefix(self, tag: str, tags: dict | set) -> str | None:
+        """
+        The prefix tag gets grouped under in a document with the given tags, or None.
+        """
+        result = self.classify(tag)
+        if result is None:
+            return None
+        rule, prefix = result
+        if rule.require_root and prefix not in tags:
+            return None
+        return prefix
+
+    def group(self, tags: dict | set) -> dict[str, str | None]:
+        """
+        Classify all tags of a document, maps every tag to its group prefix or None.
+        """
+        return {tag: self.group_prefix(tag, tags) for tag in tags}
+
+
+tag_grouper = TagGrouper()
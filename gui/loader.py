@@ -0,0 +1,245 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from io import BytesIO
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from msc.es2 import ES2Reader, read_chunk
+from msc.es2.types import ES2Field
+from .utils import tag_names
+
+logger = logging.getLogger(__name__)
+
+# Emit a progress update every this many tags.
+PROGRESS_INTERVAL = 100
+
+
+@dataclass
+class LoadedFile:
+    filename: Path
+    data: dict[str, ES2Field]
+    # Raw bytes of every tag, used to find the tags that changed on reload.
+    raw_chunks: dict[str, bytes]
+    reload: bool = False
+    # Friendly name of every tag, resolved on the loader thread or process.
+    tag_names: dict[str, str] = field(default_factory=dict)
+    # Tags that could not be decoded, kept raw, see ES2Reader.tolerant.
+    damaged_tags: list[str] = field(default_factory=list)
+
+
+class FileLoaderSignals(QObject):
+    """
+    Signals of a FileLoader, QRunnable cannot emit signals itself.
+
+    Created on the GUI thread so that the connected slots run on the GUI thread.
+    """
+
+    progress = pyqtSignal(Path, int, int, int)  # bytes read, total bytes, tags read
+    loaded = pyqtSignal(LoadedFile)
+    failed = pyqtSignal(Path, Exception)
+    cancelled = pyqtSignal(Path)
+
+
+class FileLoader(QRunnable):
+    """
+    Parse an ES2 file on a QThreadPool thread.
+
+    On reload only the tags whose raw bytes differ from previous_chunks are decoded,
+    the other fields are taken from previous_data.
+    """
+
+    filename: Path
+    reload: bool
+    signals: FileLoaderSignals
+
+    def __init__(
+        self,
+        filename: Path,
+        *,
+        reload: bool = False,
+        previous_data: dict[str, ES2Field] | None = None,
+        previous_chunks: dict[str, bytes] | None = None,
+    ):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.filename = filename
+        self.reload = reload
+        self.signals = FileLoaderSignals()
+        self._previous_data = previous_data or {}
+        self._previous_chunks = previous_chunks or {}
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self):
+        try:
+            with open(self.filename, "rb") as f:
+                stream = BytesIO(f.read())
+            if self.reload and self._previous_chunks:
+                loaded_file = self._read_changed(stream)
+            else:
+                loaded_file = self._read(stream)
+        except Exception as e:
+            logger.exception("Failed to load file '%s'", self.filename)
+            self.signals.failed.emit(self.filename, e)
+            return
+
+        if loaded_file is None:
+            logger.info("Cancelled loading '%s'", self.filename)
+            self.signals.cancelled.emit(self.filename)
+            return
+
+        self.signals.loaded.emit(loaded_file)
+
+    def _read(self, stream: BytesIO) -> LoadedFile | None:
+        total_bytes = len(stream.getbuffer())
+
+        file_data: dict[str, ES2Field] = {}
+        reader = ES2Reader(stream, tolerant=True)
+        for tag, field in reader.iter_all():
+            if self._cancelled:
+                return None
+            file_data[tag] = field
+            if len(file_data) % PROGRESS_INTERVAL == 0:
+                self.signals.progress.emit(
+                    self.filename, stream.tell(), total_bytes, len(file_data)
+                )
+        raw_chunks = dict(reader.iter_raw())
+        self.signals.progress.emit(
+            self.filename, total_bytes, total_bytes, len(file_data)
+        )
+        return LoadedFile(
+            self.filename,
+            file_data,
+            raw_chunks,
+            self.reload,
+            tag_names.names(file_data.keys()),
+            damaged_tags(file_data),
+        )
+
+    def _read_changed(self, stream: BytesIO) -> LoadedFile | None:
+        total_bytes = len(stream.getbuffer())
+
+        file_data: dict[str, ES2Field] = {}
+        raw_chunks: dict[str, bytes] = {}
+        decoded = 0
+        for tag, chunk in ES2Reader(stream).iter_raw():
+            if self._cancelled:
+                return None
+            raw_chunks[tag] = chunk
+            if self._previous_chunks.get(tag) == chunk and tag in self._previous_data:
+                file_data[tag] = self._previous_data[tag]
+            else:
+                file_data[tag] = read_chunk(chunk, tolerant=True)
+                decoded += 1
+            if len(file_data) % PROGRESS_INTERVAL == 0:
+                self.signals.progress.emit(
+                    self.filename, stream.tell(), total_bytes, len(file_data)
+                )
+        logger.info(
+            "Reloaded '%s', decoded %d of %d tags", self.filename, decoded, len(file_data)
+        )
+        self.signals.progress.emit(
+            self.filename, total_bytes, total_bytes, len(file_data)
+        )
+        return LoadedFile(
+            self.filename,
+            file_data,
+            raw_chunks,
+            self.reload,
+            tag_names.names(file_data.keys()),
+            damaged_tags(file_data),
+        )
+
+
+class FolderLoader(QObject):
+    """
+    Parse many ES2 files in parallel on a ProcessPoolExecutor.
+
+    Results get emitted as soon as a worker has finished parsing its file.
+    """
+
+    loaded = pyqtSignal(LoadedFile)
+    failed = pyqtSignal(Path, Exception)
+    cancelled = pyqtSignal(Path)
+
+    filenames: list[Path]
+
+    def __init__(self, filenames: list[Path], parent: QObject | None = None):
+        super().__init__(parent)
+
+        # Start with the largest files, so the total load time is close to that
+        # of the largest file instead of it being started last.
+        self.filenames = sorted(filenames, key=_file_size, reverse=True)
+        self._cancelled = False
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if not self.filenames:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=min(len(self.filenames), os.cpu_count() or 1),
+            # Forking a process with running Qt threads is not safe.
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        for filename in self.filenames:
+            future = self._executor.submit(load_file, filename)
+            future.add_done_callback(partial(self._file_done, filename))
+        # Returns immediately, the workers exit after the last file is parsed.
+        self._executor.shutdown(wait=False)
+
+    def cancel(self):
+        self._cancelled = True
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _file_done(self, filename: Path, future: Future):
+        # Runs on an executor thread, signals get queued to the GUI thread.
+        if self._cancelled or future.cancelled():
+            self.cancelled.emit(filename)
+            return
+        try:
+            loaded_file = future.result()
+        except Exception as e:
+            logger.exception("Failed to load file '%s'", filename)
+            self.failed.emit(filename, e)
+            return
+        self.loaded.emit(loaded_file)
+
+
+def load_file(filename: Path) -> LoadedFile:
+    """
+    Read a file with its raw chunks, module level so it can run on a process pool.
+    """
+    with open(filename, "rb") as f:
+        reader = ES2Reader(BytesIO(f.read()), tolerant=True)
+    file_data = reader.read_all()
+    return LoadedFile(
+        filename,
+        file_data,
+        dict(reader.iter_raw()),
+        tag_names=tag_names.names(file_data.keys()),
+        damaged_tags=damaged_tags(file_data),
+    )
+
+
+def damaged_tags(data: dict[str, ES2Field]) -> list[str]:
+    return [tag for tag, field in data.items() if field.is_raw]
+
+
+def _file_size(filename: Path) -> int:
+    try:
+        return filename.stat().st_size
+    except OSError:
+        return 0
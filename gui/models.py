@@ -1,12 +1,22 @@
 from collections import defaultdict
 from enum import Enum
-import re
 from typing import Any, Self, cast
 
-from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt6.QtCore import (
+    Qt,
+    QAbstractItemModel,
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+)
+from PyQt6.QtGui import QColor, QFont
 
-from msc.es2.types import ES2Field
-from .utils import header_name, tag_name
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.es2.types import ES2Field, ES2Header
+from msc.es2.unity import Color, Quaternion, Transform, Vector3
+from msc.es2.writer import check_field
+from .grouping import tag_grouper
+from .utils import header_name, tag_name, value_summary
 
 
 def _truncate_value(value: str, max_length: int = 100):
@@ -15,47 +25,141 @@ def _truncate_value(value: str, max_length: int = 100):
     return value
 
 
+# Number of rows that get created per fetchMore call.
+FETCH_BATCH_SIZE = 1000
+
+
 class TreeItemIndex(int, Enum):
     TAG = 0
     TYPE = 1
     VALUE = 2
 
 
+# A child row that has not been created yet: tag, display tag and its own pending
+# children. The entry is looked up in the model data when the row gets created.
+PendingItem = tuple[str, str | None, list["PendingItem"]]
+
+
 class TableItem:
     parent_item: Self | None
     child_items: list[Self]
+    # Index of this item in parent_item.child_items, kept up to date so row() is O(1).
+    _row: int
+    pending_items: list[PendingItem]
     checked: Qt.CheckState
     tag: str
     type: str
-    value: str
+    entry: ES2Field | None
+    raw_value: Any
 
     def __init__(
         self,
         tag: str,
         type: str,
-        value: str,
+        value: Any,
         display_tag: str | None = None,
         parent: Self | None = None,
         checked: Qt.CheckState = Qt.CheckState.Unchecked,
+        *,
+        entry: ES2Field | None = None,
     ):
         self.tag = tag
         self.display_tag = display_tag if display_tag else tag
         self.type = type
-        self.value = value
+        self.entry = entry
+        self.raw_value = value
+        self._value: str | None = None
+        self._display_value: str | None = None
 
         self.parent_item = parent
         self.child_items = []
+        self.pending_items = []
+        self._row = 0
         self.checked = checked
 
+    @property
+    def value(self) -> str:
+        """
+        The full value as a string, only built when asked for and then cached.
+        """
+        if self._value is None:
+            self._value = "" if self.raw_value is None else str(self.raw_value)
+        return self._value
+
+    @property
+    def display_value(self) -> str:
+        """
+        A short version of the value, without stringifying the whole value.
+        """
+        if self._display_value is None:
+            if self._value is not None:
+                self._display_value = _truncate_value(self._value)
+            else:
+                self._display_value = value_summary(
+                    self.raw_value, self.entry.header if self.entry else None
+                )
+        return self._display_value
+
     def appendChild(self, item: Self):
+        item._row = len(self.child_items)
         self.child_items.append(item)
 
+    def insertChild(self, row: int, item: Self):
+        self.child_items.insert(row, item)
+        self._renumber(row)
+
+    def removeChildren(self, row: int, count: int = 1):
+        del self.child_items[row : row + count]
+        self._renumber(row)
+
+    def _renumber(self, start: int):
+        for row in range(start, len(self.child_items)):
+            self.child_items[row]._row = row
+
     def child(self, row: int):
         return self.child_items[row]
 
     def childCount(self):
         return len(self.child_items)
 
+    def canFetchMore(self) -> bool:
+        return len(self.pending_items) > 0
+
+    def hasChildren(self) -> bool:
+        return len(self.child_items) > 0 or len(self.pending_items) > 0
+
+    def fetchMore(self, count: int, data: dict[str, ES2Field]) -> list[Self]:
+        """
+        Create up to count of the pending child items.
+        """
+        pending, self.pending_items = (
+            self.pending_items[:count],
+            self.pending_items[count:],
+        )
+        items = []
+        for tag, display_tag, children in pending:
+            entry = data.get(tag)
+            item = type(self)(
+                tag,
+                header_name(entry.header) if entry else "",
+                entry.value if entry else None,
+                display_tag if display_tag is not None else tag_name(tag),
+                self,
+                entry=entry,
+            )
+            item.pending_items = children
+            self.appendChild(item)
+            items.append(item)
+        return items
+
+    def child_tags(self) -> list[str]:
+        """
+        The tags of all direct children, also the ones that have not been fetched yet.
+        """
+        return [item.tag for item in self.child_items] + [
+            pending[0] for pending in self.pending_items
+        ]
+
     def columnCount(self):
         return 3
 
@@ -68,12 +172,17 @@ class TableItem:
             case 2:
                 match role:
                     case Qt.ItemDataRole.DisplayRole:
-                        return _truncate_value(self.value)
+                        return self.display_value
                     case Qt.ItemDataRole.EditRole:
                         return self.value
                 return None
         return None
 
+    def set_entry(self, entry: ES2Field | None):
+        self.entry = entry
+        self.type = header_name(entry.header) if entry else ""
+        self.setData(2, entry.value if entry else None)
+
     def setData(self, column: int, value: Any):
         match column:
             case 0:
@@ -81,7 +190,9 @@ class TableItem:
             case 1:
                 self.type = value
             case 2:
-                self.value = value
+                self.raw_value = value
+                self._value = None
+                self._display_value = None
             case _:
                 return False
         return True
@@ -91,17 +202,25 @@ class TableItem:
 
     def row(self):
         if self.parent_item:
-            return cast(Self, self.parent_item).child_items.index(self)
+            return self._row
         return 0
 
 
 class TreeModel(QAbstractItemModel):
     rootItem: TableItem
+    # The rows that have been created, by tag.
+    _items: dict[str, TableItem]
+    _data: dict[str, ES2Field]
+    # The group prefix of every tag in _data, or None for tags at the root.
+    _groups: dict[str, str | None]
 
     def __init__(self, data: dict[str, ES2Field] | None, parent=None):
         super(TreeModel, self).__init__(parent)
 
         self.rootItem = TableItem("Tag", "Type", "Value")
+        self._items = {}
+        self._data = {}
+        self._groups = {}
         if data is None:
             return
 
@@ -121,7 +240,10 @@ class TreeModel(QAbstractItemModel):
 
         item = cast(TableItem, index.internalPointer())
 
+        # DisplayRole first, it is asked for by far the most (painting, sorting).
         match role:
+            case Qt.ItemDataRole.DisplayRole | Qt.ItemDataRole.EditRole:
+                return item.data(index.column(), role)
             case Qt.ItemDataRole.UserRole:
                 if index.column() == TreeItemIndex.TAG.value:
                     return item.tag
@@ -129,8 +251,6 @@ class TreeModel(QAbstractItemModel):
             case Qt.ItemDataRole.CheckStateRole:
                 if index.column() == TreeItemIndex.TAG.value:
                     return item.checked
-            case Qt.ItemDataRole.DisplayRole | Qt.ItemDataRole.EditRole:
-                return item.data(index.column(), role)
         return None
 
     def setData(
@@ -142,7 +262,7 @@ class TreeModel(QAbstractItemModel):
         item = cast(TableItem, index.internalPointer())
         match role:
             case Qt.ItemDataRole.EditRole:
-                item.setData(index.column(), str(value))
+                item.setData(index.column(), value)
                 self.dataChanged.emit(index, index)
                 return True
             case Qt.ItemDataRole.CheckStateRole:
@@ -174,19 +294,19 @@ class TreeModel(QAbstractItemModel):
         return None
 
     def index(self, row: int, column: int, parent: QModelIndex):
-        if not self.hasIndex(row, column, parent):
-            return QModelIndex()
-
+        # Bounds are checked here instead of with hasIndex, which calls back into
+        # rowCount and columnCount and is the hot path while sorting.
         if not parent.isValid():
             parentItem = self.rootItem
+        elif parent.column() > 0:
+            return QModelIndex()
         else:
             parentItem = parent.internalPointer()
 
-        childItem = parentItem.child(row)
-        if childItem:
-            return self.createIndex(row, column, childItem)
-        else:
-            return QModelIndex()
+        child_items = parentItem.child_items
+        if 0 <= row < len(child_items) and 0 <= column < parentItem.columnCount():
+            return self.createIndex(row, column, child_items[row])
+        return QModelIndex()
 
     def parent(self, index: QModelIndex) -> QModelIndex:
         if not index.isValid():
@@ -214,105 +334,463 @@ class TreeModel(QAbstractItemModel):
 
         return parentItem.childCount()
 
-    def setupModelData(self, data: dict[str, ES2Field]):
-        # regex = re.compile(r"^(?P<key>\D.+?)(\d+)$")
-        # data_items = sorted(
-        #     [
-        #         (m.group("key"), tag)
-        #         for tag, item in data.items()
-        #         if item.header.value_type == ES2ValueType.int32
-        #         and not tag.startswith("VIN")
-        #         and (m := regex.match(tag))
-        #     ],
-        #     key=lambda r: r[0],
-        # )
-        # from rich import print as rprint
-
-        # rprint(data_items)
-
-        grouped_items_prefixes = [
-            r"^(?P<prefix>VIN(\d{3})[B-Z]?)",
-            # r"^(?P<prefix>[A-Za-z][A-Za-z]+0?)",
-        ]
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.column() > 0:
+            return False
+        return self._item(parent).hasChildren()
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if parent.column() > 0:
+            return False
+        return self._item(parent).canFetchMore()
+
+    def fetchMore(self, parent: QModelIndex):
+        item = self._item(parent)
+        count = min(len(item.pending_items), FETCH_BATCH_SIZE)
+        if count == 0:
+            return
+        first = item.childCount()
+        self.beginInsertRows(parent, first, first + count - 1)
+        self._register(item.fetchMore(count, self._data))
+        self.endInsertRows()
+
+    def fetch_all(self, parent: QModelIndex = QModelIndex()):
+        """
+        Create every row below parent, needed before filtering on all rows.
+        """
+        item = self._item(parent)
+        if item.canFetchMore():
+            first = item.childCount()
+            self.beginInsertRows(parent, first, first + len(item.pending_items) - 1)
+            self._register(item.fetchMore(len(item.pending_items), self._data))
+            self.endInsertRows()
+        for row, child in enumerate(item.child_items):
+            if child.hasChildren():
+                self.fetch_all(self.createIndex(row, 0, child))
+
+    def _item(self, index: QModelIndex) -> TableItem:
+        if not index.isValid():
+            return self.rootItem
+        return cast(TableItem, index.internalPointer())
+
+    def _index(self, item: TableItem, column: int = 0) -> QModelIndex:
+        if item is self.rootItem:
+            return QModelIndex()
+        return self.createIndex(item.row(), column, item)
+
+    def _register(self, items: list[TableItem]):
+        for item in items:
+            if item.tag:
+                self._items[item.tag] = item
+
+    def update_data(self, data: dict[str, ES2Field]):
+        """
+        Switch to a new version of the data, only touching the rows that changed.
 
-        grouped_items: defaultdict[str, list] = defaultdict(list)
-        shopping_bags: defaultdict[str, dict] = defaultdict(dict)
+        Unchanged tags are expected to keep the same ES2Field object, so comparing
+        identity is enough to find the changed tags.
+        """
+        old_data, self._data = self._data, data
 
         for tag, entry in data.items():
-            # if tag.startswith("shoppingbag"):
-            #     m = re.match(r"^(?P<id>shoppingbag\d+)(?P<name>\w*)$", tag)
-            #     if m:
-            #         id = m.group("id")
-            #         if id in data:  # no root entry means bag is gone
-            #             shopping_bags[id][m.group("name")] = entry.value
-            #             continue
-
-            for prefix in grouped_items_prefixes:
-                if m := re.match(prefix, tag):
-                    grouped_items[m.group("prefix")].append((tag, entry))
-                    break
-            else:
-                display_tag = tag_name(tag)
-                item = TableItem(
-                    tag,
-                    header_name(entry.header),
-                    str(entry.value),
-                    display_tag,
-                    self.rootItem,
+            old_entry = old_data.get(tag)
+            if old_entry is None:
+                self._add_tag(tag)
+            elif old_entry is not entry and (item := self._items.get(tag)):
+                item.set_entry(entry)
+                self.dataChanged.emit(
+                    self._index(item, TreeItemIndex.TYPE.value),
+                    self._index(item, TreeItemIndex.VALUE.value),
                 )
-                self.rootItem.appendChild(item)
-
-        for prefix, items in grouped_items.items():
-            entry = data[prefix] if prefix in data else None
-            root_item = TableItem(
-                prefix,
-                header_name(entry.header) if entry else "",
-                str(entry.value) if entry else "",
-                tag_name(prefix),
-                self.rootItem,
+            # Rows that are not created yet pick up the new entry when fetched.
+
+        for tag in old_data.keys() - data.keys():
+            self._remove_tag(tag)
+            self._groups.pop(tag, None)
+
+    def update_values(self, values: dict[str, Any]):
+        """
+        Show new values of tags, with one dataChanged per parent row.
+
+        Rows that are not created yet read the value from the field when fetched.
+        """
+        rows: dict[int, tuple[TableItem, int, int]] = {}
+        for tag, value in values.items():
+            item = self._items.get(tag)
+            if item is None:
+                continue
+            item.setData(TreeItemIndex.VALUE.value, value)
+            row = item.row()
+            parent, first, last = rows.get(
+                id(item.parent_item), (item.parent_item, row, row)
             )
-            self.rootItem.appendChild(root_item)
-            for tag, entry in items:
-                if tag == prefix:
-                    continue
-                display_tag = tag_name(tag)
-                tree_item = TableItem(
-                    tag,
-                    header_name(entry.header),
-                    str(entry.value),
-                    display_tag,
-                    root_item,
+            rows[id(parent)] = (parent, min(first, row), max(last, row))
+        for parent, first, last in rows.values():
+            parent_index = self._index(parent)
+            self.dataChanged.emit(
+                self.index(first, TreeItemIndex.VALUE.value, parent_index),
+                self.index(last, TreeItemIndex.VALUE.value, parent_index),
+            )
+
+    def _add_tag(self, tag: str):
+        prefix = tag_grouper.group_prefix(tag, self._data)
+        self._groups[tag] = prefix
+        if prefix is None:
+            self._append_pending(self.rootItem, (tag, None, []))
+            return
+
+        group = self._items.get(prefix)
+        if group is not None:
+            if tag == prefix:
+                group.set_entry(self._data[tag])
+                self.dataChanged.emit(
+                    self._index(group, TreeItemIndex.TYPE.value),
+                    self._index(group, TreeItemIndex.VALUE.value),
                 )
-                root_item.appendChild(tree_item)
-
-        for shopping_bag_id, shopping_bag in shopping_bags.items():
-            shopping_bag_root = data[shopping_bag_id]
-            item = TableItem(
-                shopping_bag_id,
-                header_name(shopping_bag_root.header),
-                str(shopping_bag_root.value),
-                shopping_bag_id,
-                self.rootItem,
+            else:
+                self._append_pending(group, (tag, None, []))
+            return
+
+        pending_group = next(
+            (p for p in self.rootItem.pending_items if p[0] == prefix), None
+        )
+        if pending_group is None:
+            self._append_pending(
+                self.rootItem, (prefix, None, [] if tag == prefix else [(tag, None, [])])
+            )
+        elif tag != prefix:
+            pending_group[2].append((tag, None, []))
+
+    def _append_pending(self, parent: TableItem, pending: PendingItem):
+        if parent.canFetchMore():
+            # Not visible yet, it will be created together with the other pending rows.
+            parent.pending_items.append(pending)
+            return
+        row = parent.childCount()
+        self.beginInsertRows(self._index(parent), row, row)
+        parent.pending_items.append(pending)
+        self._register(parent.fetchMore(1, self._data))
+        self.endInsertRows()
+
+    def _remove_tag(self, tag: str):
+        item = self._items.get(tag)
+        if item is None:
+            self._remove_pending(tag)
+            return
+
+        if item.hasChildren():
+            # A group whose own tag is gone, keep it for its children.
+            item.set_entry(None)
+            self.dataChanged.emit(
+                self._index(item, TreeItemIndex.TYPE.value),
+                self._index(item, TreeItemIndex.VALUE.value),
             )
-            self.rootItem.appendChild(item)
-
-            for key, value in shopping_bag.items():
-                if key in ("", "Keys", "Values"):
-                    continue
-                tag = f"{shopping_bag_id}{key}"
-                entry = data[tag]
-                sub_item = TableItem(
-                    tag, header_name(entry.header), str(entry.value), key, item
+            return
+
+        del self._items[tag]
+        parent = cast(TableItem, item.parent())
+        row = item.row()
+        self.beginRemoveRows(self._index(parent), row, row)
+        parent.removeChildren(row)
+        self.endRemoveRows()
+
+    def _remove_pending(self, tag: str):
+        prefix = self._groups.get(tag)
+        if prefix is not None and prefix != tag:
+            group = self._items.get(prefix)
+            if group is not None:
+                pending_items = group.pending_items
+            else:
+                pending_group = next(
+                    (p for p in self.rootItem.pending_items if p[0] == prefix), None
                 )
-                item.appendChild(sub_item)
+                pending_items = pending_group[2] if pending_group else []
+        else:
+            pending_items = self.rootItem.pending_items
+        for i, pending in enumerate(pending_items):
+            if pending[0] == tag:
+                if not pending[2]:
+                    del pending_items[i]
+                break
+
+    def setupModelData(self, data: dict[str, ES2Field]):
+        self._data = data
+        self._groups = tag_grouper.group(data)
 
-            contents_item = TableItem("", "", "", "Contents", item)
-            item.appendChild(contents_item)
+        grouped_items: defaultdict[str, list[str]] = defaultdict(list)
 
-            contents: dict[str, str] = dict(
-                zip(shopping_bag["Keys"], shopping_bag["Values"])
+        root_items: list[PendingItem] = []
+        for tag, prefix in self._groups.items():
+            if prefix:
+                grouped_items[prefix].append(tag)
+            else:
+                root_items.append((tag, None, []))
+
+        for prefix, tags in grouped_items.items():
+            root_items.append(
+                (prefix, None, [(tag, None, []) for tag in tags if tag != prefix])
+            )
+
+        # Rows get created when the view asks for them, see fetchMore.
+        self.rootItem.pending_items = root_items
+
+
+class TagFilterProxyModel(QSortFilterProxyModel):
+    """
+    Sort/filter proxy that can filter on a precomputed set of matching tags.
+
+    Without a set of tags the normal filter of QSortFilterProxyModel is used.
+    """
+
+    _matching_tags: set[str] | None = None
+
+    def set_matching_tags(self, tags: set[str] | None):
+        self._matching_tags = tags
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if self._matching_tags is None:
+            return super().filterAcceptsRow(source_row, source_parent)
+        if source_parent.isValid():
+            parent_item = cast(TableItem, source_parent.internalPointer())
+        else:
+            parent_item = cast(TreeModel, self.sourceModel()).rootItem
+        return parent_item.child_items[source_row].tag in self._matching_tags
+
+
+# Columns of the components of an element of a collection, by value type. Types that
+# are not listed have a single value column.
+COMPONENT_COLUMNS: dict[ES2ValueType, list[str]] = {
+    ES2ValueType.vector3: ["x", "y", "z"],
+    ES2ValueType.quaternion: ["x", "y", "z", "w"],
+    ES2ValueType.color: ["r", "g", "b", "a"],
+    ES2ValueType.transform: [
+        "position x",
+        "position y",
+        "position z",
+        "rotation x",
+        "rotation y",
+        "rotation z",
+        "rotation w",
+        "scale x",
+        "scale y",
+        "scale z",
+        "layer",
+    ],
+}
+
+# Value types that CollectionModel can edit.
+EDITABLE_ELEMENT_TYPES = {
+    ES2ValueType.bool,
+    ES2ValueType.byte,
+    ES2ValueType.int32,
+    ES2ValueType.float,
+    ES2ValueType.string,
+    *COMPONENT_COLUMNS,
+}
+
+
+def element_components(value_type: ES2ValueType, value: Any) -> list:
+    """
+    The scalar components of an element, in the order of COMPONENT_COLUMNS.
+    """
+    match value_type:
+        case ES2ValueType.vector3 | ES2ValueType.quaternion | ES2ValueType.color:
+            return value.as_list()
+        case ES2ValueType.transform:
+            return [
+                *value.position.as_list(),
+                *value.rotation.as_list(),
+                *value.scale.as_list(),
+                value.layer,
+            ]
+    return [value]
+
+
+def element_from_components(value_type: ES2ValueType, components: list) -> Any:
+    match value_type:
+        case ES2ValueType.vector3:
+            return Vector3(*components)
+        case ES2ValueType.quaternion:
+            return Quaternion(*components)
+        case ES2ValueType.color:
+            return Color(*components)
+        case ES2ValueType.transform:
+            return Transform(
+                Vector3(*components[0:3]),
+                Quaternion(*components[3:7]),
+                Vector3(*components[7:10]),
+                components[10],
             )
-            for name, count in contents.items():
-                # f"{shopping_bag_id}{name}",
-                sub_item = TableItem("", "", count, name, contents_item)
-                contents_item.appendChild(sub_item)
+    return components[0]
+
+
+def component_type(value_type: ES2ValueType, column: int) -> type:
+    """
+    Python type of a component, to parse edited text.
+    """
+    match value_type:
+        case ES2ValueType.bool:
+            return bool
+        case ES2ValueType.byte | ES2ValueType.int32:
+            return int
+        case ES2ValueType.string:
+            return str
+        case ES2ValueType.transform if column == 10:
+            return str
+    return float
+
+
+class CollectionModel(QAbstractTableModel):
+    """
+    The elements of a NativeArray, List or Dictionary field as a table, one column
+    per component, like x, y and z of a vector.
+
+    Edits are kept apart from the field as changed elements by row, the field itself
+    is not modified. Dictionaries have a read-only key column first.
+    """
+
+    value_type: ES2ValueType
+    keys: list
+    columns: list[str]
+    # Elements that were edited, by row
+    changes: dict[int, Any]
+
+    def __init__(self, item: ES2Field, parent=None):
+        super().__init__(parent)
+
+        self.item = item
+        self.value_type = item.header.value_type
+        self.is_dict = item.header.collection_type == ES2Key.Dictionary
+        if self.is_dict:
+            self.keys = list(item.value.keys())
+            self._elements = list(item.value.values())
+        else:
+            self.keys = list(range(len(item.value)))
+            self._elements = item.value
+        self.columns = COMPONENT_COLUMNS.get(self.value_type, ["value"])
+        self.changes = {}
+
+    @property
+    def _key_columns(self) -> int:
+        return 1 if self.is_dict else 0
+
+    def element(self, row: int) -> Any:
+        """
+        The element of a row, with its changes.
+        """
+        if row in self.changes:
+            return self.changes[row]
+        return self._elements[row]
+
+    def component_type(self, index: QModelIndex) -> type | None:
+        """
+        Type of the component in a cell, None for the key column.
+        """
+        column = index.column() - self._key_columns
+        if column < 0:
+            return None
+        return component_type(self.value_type, column)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.keys)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._key_columns + len(self.columns)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = 0):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Vertical:
+            return str(section)
+        if section < self._key_columns:
+            return "key"
+        return self.columns[section - self._key_columns]
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() < self._key_columns:
+            return flags
+        if self.value_type == ES2ValueType.bool:
+            return flags | Qt.ItemFlag.ItemIsUserCheckable
+        return flags | Qt.ItemFlag.ItemIsEditable
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column() - self._key_columns
+        if role == Qt.ItemDataRole.FontRole:
+            if row in self.changes:
+                font = QFont()
+                font.setBold(True)
+                return font
+            return None
+        if column < 0:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return str(self.keys[row])
+            return None
+
+        value = element_components(self.value_type, self.element(row))[column]
+        match role:
+            case Qt.ItemDataRole.CheckStateRole if self.value_type == ES2ValueType.bool:
+                return Qt.CheckState.Checked if value else Qt.CheckState.Unchecked
+            case Qt.ItemDataRole.DisplayRole if self.value_type != ES2ValueType.bool:
+                return str(value)
+            case Qt.ItemDataRole.EditRole:
+                return value
+            case Qt.ItemDataRole.DecorationRole if (
+                self.value_type == ES2ValueType.color and column == 0
+            ):
+                r, g, b, a = element_components(self.value_type, self.element(row))
+                return QColor.fromRgbF(*(min(max(c, 0.0), 1.0) for c in (r, g, b, a)))
+        return None
+
+    def setData(
+        self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole
+    ) -> bool:
+        row, column = index.row(), index.column() - self._key_columns
+        if column < 0:
+            return False
+        if role == Qt.ItemDataRole.CheckStateRole:
+            value = Qt.CheckState(value) == Qt.CheckState.Checked
+        elif role != Qt.ItemDataRole.EditRole:
+            return False
+
+        components = element_components(self.value_type, self.element(row))
+        components[column] = value
+        element = element_from_components(self.value_type, components)
+        try:
+            check_field(ES2Field(ES2Header(value_type=self.value_type), element))
+        except ValueError:
+            # Out of the range of the type, like 300 for a byte
+            return False
+        if element == self._elements[row]:
+            self.changes.pop(row, None)
+        else:
+            self.changes[row] = element
+        self.dataChanged.emit(
+            self.index(row, 0), self.index(row, self.columnCount() - 1)
+        )
+        return True
+
+    def changed_elements(self) -> dict:
+        """
+        The edited elements by list index or dictionary key.
+        """
+        return {self.keys[row]: element for row, element in self.changes.items()}
+
+    def value(self) -> list | dict:
+        """
+        The value of the field with the changes, the field's own value when nothing
+        was changed.
+        """
+        if not self.changes:
+            return self.item.value
+        value = self.item.value.copy()
+        for key, element in self.changed_elements().items():
+            value[key] = element
+        return value
@@ -0,0 +1,44 @@
+import logging
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from msc.es2.types import ES2Field
+from msc.report import CarReport, PartsMatcher
+from .utils import PARTS_DATA, parse_tag, tag_name2
+
+logger = logging.getLogger(__name__)
+
+parts_matcher = PartsMatcher(PARTS_DATA)
+
+
+def part_name(part_prefix: str) -> str:
+    return tag_name2(parse_tag(part_prefix))
+
+
+def car_report(data: dict[str, ES2Field]) -> CarReport:
+    return CarReport(data, parts_matcher, part_name)
+
+
+class ReportBuilderSignals(QObject):
+    finished = pyqtSignal(object)  # CarReport
+
+
+class ReportBuilder(QRunnable):
+    """
+    Build the car report of a document on a QThreadPool thread.
+    """
+
+    def __init__(self, data: dict[str, ES2Field]):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.data = data
+        self.signals = ReportBuilderSignals()
+
+    def run(self):
+        try:
+            report = car_report(self.data)
+        except Exception:
+            logger.exception("Failed to build car report")
+            return
+        self.signals.finished.emit(report)
@@ -0,0 +1,67 @@
+import logging
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from msc.backups import RetentionPolicy
+from msc.es2.types import ES2Field
+from msc.save import SaveResult, save_file
+
+logger = logging.getLogger(__name__)
+
+
+class FileSaverSignals(QObject):
+    """
+    Signals of a FileSaver, created on the GUI thread so the slots run there.
+    """
+
+    progress = pyqtSignal(Path, int, int)  # tags written, total tags
+    saved = pyqtSignal(SaveResult)
+    failed = pyqtSignal(Path, Exception)
+
+
+class FileSaver(QRunnable):
+    """
+    Save a document on a QThreadPool thread, see msc.save.save_file.
+
+    data should be a snapshot that the GUI thread does not change while saving.
+    """
+
+    filename: Path
+    # TableWidget.data_version of the snapshot
+    data_version: int
+    # EditHistory.state() of the snapshot
+    history_state: object
+    signals: FileSaverSignals
+
+    def __init__(
+        self,
+        filename: Path,
+        data: dict[str, ES2Field],
+        data_version: int,
+        history_state: object,
+        retention: RetentionPolicy | None = None,
+    ):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.filename = filename
+        self.data_version = data_version
+        self.history_state = history_state
+        self.retention = retention
+        self.signals = FileSaverSignals()
+        self._data = data
+
+    def run(self):
+        try:
+            result = save_file(
+                self.filename, self._data, self._progress, retention=self.retention
+            )
+        except Exception as e:
+            logger.exception("Failed to save file '%s'", self.filename)
+            self.signals.failed.emit(self.filename, e)
+            return
+        self.signals.saved.emit(result)
+
+    def _progress(self, done: int, total: int):
+        self.signals.progress.emit(self.filename, done, total)
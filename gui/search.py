@@ -0,0 +1,145 @@
+from bisect import bisect_right
+import logging
+import re
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from msc.es2.types import ES2Field
+from msc.query import ValueIndex
+from msc.spatial import TransformIndex
+from .utils import tag_name, value_summary
+
+logger = logging.getLogger(__name__)
+
+
+def wildcard_to_regex(wildcard: str) -> str:
+    """
+    Translate a wildcard like Qt's unanchored wildcard filter into a regex for SearchIndex.
+
+    `*` and `?` do not match across lines, every entry of the index is a single line.
+    """
+    regex = []
+    i = 0
+    while i < len(wildcard):
+        c = wildcard[i]
+        if c == "*":
+            regex.append(r"[^\n]*")
+        elif c == "?":
+            regex.append(r"[^\n]")
+        elif c == "[" and (end := wildcard.find("]", i + 2)) != -1:
+            chars = wildcard[i + 1 : end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex.append(f"[{chars.replace(chr(92), chr(92) * 2)}]")
+            i = end
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return "".join(regex)
+
+
+class SearchIndex:
+    """
+    Text index over the tag names, friendly names and values of one document.
+
+    All entries are joined into one string, one line per tag, so a query is a single
+    regex scan in C instead of a Python call per row. Matches are mapped back to
+    tags with a bisect on the line offsets.
+    """
+
+    tags: list[str]
+    # Index of the typed values, for queries like `type:float value<10`.
+    values: ValueIndex
+
+    def __init__(self, lines: dict[str, str], values: ValueIndex):
+        self.tags = list(lines.keys())
+        self._offsets = []
+        offset = 0
+        for line in lines.values():
+            self._offsets.append(offset)
+            offset += len(line) + 1
+        self._text = "\n".join(lines.values())
+        self.values = values
+        # Tags that changed or were added after building, checked one by one.
+        self._overrides: dict[str, str] = {}
+        self._removed: set[str] = set()
+
+    @classmethod
+    def build(
+        cls, data: dict[str, ES2Field], positions: TransformIndex | None = None
+    ) -> "SearchIndex":
+        return cls(
+            {tag: _index_line(tag, field) for tag, field in data.items()},
+            ValueIndex(data, positions),
+        )
+
+    def update(self, tag: str, field: ES2Field | None):
+        """
+        Update a single tag after an edit, or remove it when field is None.
+        """
+        self.values.update(tag, field)
+        if field is None:
+            self._removed.add(tag)
+            self._overrides.pop(tag, None)
+        else:
+            self._removed.discard(tag)
+            self._overrides[tag] = _index_line(tag, field)
+
+    def search(self, wildcard: str, case_sensitive: bool = False) -> set[str]:
+        """
+        All tags whose tag, friendly name or value matches the wildcard.
+        """
+        flags = 0 if case_sensitive else re.IGNORECASE
+        regex = re.compile(wildcard_to_regex(wildcard), flags)
+
+        matches: set[str] = set()
+        text, offsets, tags = self._text, self._offsets, self.tags
+        position = 0
+        while m := regex.search(text, position):
+            entry = bisect_right(offsets, m.start()) - 1
+            matches.add(tags[entry])
+            # Continue at the next line, one match per tag is enough.
+            position = text.find("\n", m.end())
+            if position == -1:
+                break
+            position += 1
+
+        matches.difference_update(self._overrides.keys())
+        matches.difference_update(self._removed)
+        for tag, line in self._overrides.items():
+            if regex.search(line):
+                matches.add(tag)
+        return matches
+
+
+def _index_line(tag: str, field: ES2Field) -> str:
+    line = f"{tag}\t{tag_name(tag)}\t{value_summary(field.value, field.header)}"
+    return line.replace("\n", " ")
+
+
+class SearchIndexBuilderSignals(QObject):
+    finished = pyqtSignal(object)  # SearchIndex
+
+
+class SearchIndexBuilder(QRunnable):
+    """
+    Build the SearchIndex of a document on a QThreadPool thread.
+    """
+
+    def __init__(
+        self, data: dict[str, ES2Field], positions: TransformIndex | None = None
+    ):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.data = data
+        self.positions = positions
+        self.signals = SearchIndexBuilderSignals()
+
+    def run(self):
+        try:
+            index = SearchIndex.build(self.data, self.positions)
+        except Exception:
+            logger.exception("Failed to build search index")
+            return
+        self.signals.finished.emit(index)
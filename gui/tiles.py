@@ -0,0 +1,164 @@
+from collections import OrderedDict
+import logging
+from math import ceil, log2
+from pathlib import Path
+import shutil
+
+from PyQt6.QtCore import QObject, QRect, QRunnable, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+from .config import cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+class TilePyramid:
+    """
+    A map image cut into square tiles at several resolutions, cached on disk.
+
+    Level 0 has the resolution of the image, every next level half of the one
+    before, down to a level that fits in a single tile. The tiles are generated
+    once per version of the image.
+    """
+
+    TILE_SIZE = 256
+
+    source: Path
+    # Tiles of all images, and of this version of the image
+    root: Path
+    directory: Path
+    width: int
+    height: int
+    levels: int
+
+    def __init__(self, source: str | Path, root: Path | None = None):
+        self.source = Path(source)
+        size = QImageReader(str(self.source)).size()
+        if not size.isValid():
+            raise OSError(f"Can't read map image '{self.source}'")
+        self.width, self.height = size.width(), size.height()
+        longest = max(self.width, self.height)
+        self.levels = 1 + max(0, ceil(log2(longest / self.TILE_SIZE)))
+
+        stat = self.source.stat()
+        self.root = root or cache_dir() / "map_tiles"
+        self.directory = (
+            self.root / f"{self.source.stem}-{stat.st_size}-{stat.st_mtime_ns}"
+        )
+
+    @property
+    def is_generated(self) -> bool:
+        return (self.directory / "complete").exists()
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        return ceil(self.width / 2**level), ceil(self.height / 2**level)
+
+    def tile_count(self, level: int) -> tuple[int, int]:
+        """
+        Number of columns and rows of tiles of a level.
+        """
+        width, height = self.level_size(level)
+        return ceil(width / self.TILE_SIZE), ceil(height / self.TILE_SIZE)
+
+    def tile_path(self, level: int, column: int, row: int) -> Path:
+        return self.directory / str(level) / f"{column}_{row}.png"
+
+    def generate(self):
+        """
+        Cut the image into the tiles of all levels.
+
+        Only uses QImage, so it can run on a worker thread. Tiles of older versions
+        of the image are removed.
+        """
+        image = QImage(str(self.source))
+        if image.isNull():
+            raise OSError(f"Can't read map image '{self.source}'")
+
+        if self.root.exists():
+            for old in self.root.glob(f"{self.source.stem}-*"):
+                if old != self.directory:
+                    shutil.rmtree(old, ignore_errors=True)
+
+        for level in range(self.levels):
+            if level:
+                image = image.scaled(
+                    *self.level_size(level),
+                    Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+            (self.directory / str(level)).mkdir(parents=True, exist_ok=True)
+            columns, rows = self.tile_count(level)
+            for column in range(columns):
+                for row in range(rows):
+                    rect = QRect(
+                        column * self.TILE_SIZE,
+                        row * self.TILE_SIZE,
+                        self.TILE_SIZE,
+                        self.TILE_SIZE,
+                    ).intersected(image.rect())
+                    path = self.tile_path(level, column, row)
+                    if not image.copy(rect).save(str(path)):
+                        raise OSError(f"Can't write map tile '{path}'")
+        (self.directory / "complete").touch()
+        logger.info("Generated map tiles in '%s'", self.directory)
+
+
+class TileCache:
+    """
+    Pixmaps of the most recently used tiles of a TilePyramid, at most max_tiles.
+    """
+
+    # 256 tiles of 256x256 pixels are about 64 MB
+    MAX_TILES = 256
+
+    def __init__(self, pyramid: TilePyramid, max_tiles: int = MAX_TILES):
+        self.pyramid = pyramid
+        self.max_tiles = max_tiles
+        self._tiles: OrderedDict[tuple[int, int, int], QPixmap] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def tile(self, level: int, column: int, row: int) -> QPixmap | None:
+        key = (level, column, row)
+        if (pixmap := self._tiles.get(key)) is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap(str(self.pyramid.tile_path(level, column, row)))
+        if pixmap.isNull():
+            logger.warning("Missing map tile %s", key)
+            return None
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    def clear(self):
+        self._tiles.clear()
+
+
+class TileGeneratorSignals(QObject):
+    finished = pyqtSignal()
+    failed = pyqtSignal(Exception)
+
+
+class TileGenerator(QRunnable):
+    """
+    Generate the tiles of a TilePyramid on a QThreadPool thread.
+    """
+
+    def __init__(self, pyramid: TilePyramid):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.pyramid = pyramid
+        self.signals = TileGeneratorSignals()
+
+    def run(self):
+        try:
+            self.pyramid.generate()
+        except Exception as e:
+            logger.exception("Failed to generate map tiles")
+            self.signals.failed.emit(e)
+            return
+        self.signals.finished.emit()
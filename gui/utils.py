@@ -17,6 +17,9 @@ with open("gui/vin.yaml") as f:
 
 
 def header_name(header: ES2Header):
+    if header.value_type == ES2ValueType.Null and header.collection_type == ES2Key.Null:
+        # Only the fields of tags that could not be read, see RawValue
+        return "unreadable"
     if header.collection_type != ES2Key.Null:
         if header.key_type != ES2ValueType.Null:
             return f"{header.collection_type.name}[{header.key_type.name}, {header.value_type.name}]"
@@ -57,34 +60,119 @@ class CarPartsEnum(str, Enum):
     CC = "color code"  # found on doors/fenders/bumpers etc
 
 
-def parse_tag(tag: str):
-    parsed_tag: dict[str, str] = {"name": tag}
-    if tag.lower().startswith("vin"):
+# Rest of a VIN tag, VIN1010AID -> index 0, category AID; VIN213B1POS -> variant B
+_rest_of_vin_regex = re.compile(
+    r"^(?P<variant>[A-Z]?)((?P<index>\d+)(?P<category>[A-Z][A-Z0-9]*)?)?$"
+)
+_category_names: dict[str, str] = {part.name: part.value for part in CarPartsEnum}
+
+
+class TagNameResolver:
+    """
+    Resolves tags to friendly names like `VIN1010AID - engineblock [0] assembly_id`.
+
+    Results are cached by tag and shared between documents, a document's names can
+    be resolved at once with names() on a loader thread so the tree does not have to.
+    """
+
+    def __init__(self, vin_data: dict[str, str] = VIN_DATA):
+        self.vin_data = vin_data
+        self._names: dict[str, str] = {}
+        self._parsed: dict[str, dict[str, str]] = {}
+
+    def name(self, tag: str) -> str:
+        try:
+            return self._names[tag]
+        except KeyError:
+            pass
+        name = self._names[tag] = self._resolve_name(tag)
+        return name
+
+    def names(self, tags) -> dict[str, str]:
+        """
+        Friendly names of all tags, e.g. all tags of a document.
+        """
+        names = self._names
+        resolve = self._resolve_name
+        result = {}
+        for tag in tags:
+            name = names.get(tag)
+            if name is None:
+                name = names[tag] = resolve(tag)
+            result[tag] = name
+        return result
+
+    def add_names(self, names: dict[str, str]):
+        """
+        Add names resolved elsewhere, like by names() in a loader process.
+        """
+        self._names.update(names)
+
+    def parse(self, tag: str) -> dict[str, str]:
+        try:
+            return dict(self._parsed[tag])
+        except KeyError:
+            pass
+        parsed_tag = self._parsed[tag] = self._parse(tag)
+        return dict(parsed_tag)
+
+    def _split(self, tag: str) -> tuple[str, str, re.Match | None] | None:
+        """
+        The VIN, the rest of the tag and its match, or None when tag has no known VIN.
+        """
+        if tag[:3].lower() != "vin":
+            return None
         tag_vin = tag[3:6]
-        if tag_vin in VIN_DATA:
-            parsed_tag["name"] = f"VIN{tag_vin}"
-            friendly_vin = VIN_DATA[tag_vin]
-            rest_of_vin = tag[6:]
-            match = re.match(
-                r"^(?P<variant>[A-Z]?)((?P<index>\d+)(?P<category>[A-Z][A-Z0-9]*)?)?$",
-                rest_of_vin,
-            )
-            parsed_tag["friendly_vin"] = friendly_vin
-            if match:
-                if variant := match.group("variant"):
-                    parsed_tag["variant"] = variant
-                if index := match.group("index"):
-                    parsed_tag["index"] = index
-                if category := match.group("category"):
-                    if hasattr(CarPartsEnum, category):
-                        category = getattr(CarPartsEnum, category).value
-                    parsed_tag["category"] = category
-            elif len(rest_of_vin) > 0:
-                logger.warning(
-                    f"FAILED TO MATCH '{tag}' '{friendly_vin}' '{rest_of_vin}'"
-                )
-                parsed_tag["rest_of_vin"] = rest_of_vin
-    return parsed_tag
+        friendly_vin = self.vin_data.get(tag_vin)
+        if friendly_vin is None:
+            return None
+        rest_of_vin = tag[6:]
+        return friendly_vin, rest_of_vin, _rest_of_vin_regex.match(rest_of_vin)
+
+    def _resolve_name(self, tag: str) -> str:
+        split = self._split(tag)
+        if split is None:
+            return tag
+        friendly_vin, rest_of_vin, match = split
+        if match:
+            friendly_name = f"{tag} - {friendly_vin}"
+            if variant := match.group("variant"):
+                friendly_name += f" {variant}"
+            if index := match.group("index"):
+                friendly_name += f" [{index}]"
+            if category := match.group("category"):
+                friendly_name += f" {_category_names.get(category, category)}"
+            return friendly_name
+        elif len(rest_of_vin) > 0:
+            logger.warning(f"FAILED TO MATCH '{tag}' '{friendly_vin}' '{rest_of_vin}'")
+        return f"[{friendly_vin}]{rest_of_vin}"
+
+    def _parse(self, tag: str) -> dict[str, str]:
+        parsed_tag: dict[str, str] = {"name": tag}
+        split = self._split(tag)
+        if split is None:
+            return parsed_tag
+        friendly_vin, rest_of_vin, match = split
+        parsed_tag["name"] = f"VIN{tag[3:6]}"
+        parsed_tag["friendly_vin"] = friendly_vin
+        if match:
+            if variant := match.group("variant"):
+                parsed_tag["variant"] = variant
+            if index := match.group("index"):
+                parsed_tag["index"] = index
+            if category := match.group("category"):
+                parsed_tag["category"] = _category_names.get(category, category)
+        elif len(rest_of_vin) > 0:
+            logger.warning(f"FAILED TO MATCH '{tag}' '{friendly_vin}' '{rest_of_vin}'")
+            parsed_tag["rest_of_vin"] = rest_of_vin
+        return parsed_tag
+
+
+tag_names = TagNameResolver()
+
+
+def parse_tag(tag: str):
+    return tag_names.parse(tag)
 
 
 def tag_name2(parsed_tag: dict):
@@ -94,37 +182,33 @@ def tag_name2(parsed_tag: dict):
 
 
 def tag_name(tag: str):
-    if tag.lower().startswith("vin"):
-        tag_vin = tag[3:6]
-        if tag_vin in VIN_DATA:
-            friendly_vin = VIN_DATA[tag_vin]
-            rest_of_vin = tag[6:]
-            match = re.match(
-                r"^(?P<variant>[A-Z]?)((?P<index>\d+)(?P<category>[A-Z][A-Z0-9]*)?)?$",
-                rest_of_vin,
-            )
-            if match:
-                friendly_name = f"{tag} - {friendly_vin}"
-                if variant := match.group("variant"):
-                    friendly_name += f" {variant}"
-                if index := match.group("index"):
-                    friendly_name += f" [{index}]"
-                if category := match.group("category"):
-                    if hasattr(CarPartsEnum, category):
-                        category = getattr(CarPartsEnum, category).value
-                        friendly_name += f" {category}"
-                    else:
-                        friendly_name += f" {category}"
-                return friendly_name
-            elif len(rest_of_vin) > 0:
-                logger.warning(
-                    f"FAILED TO MATCH '{tag}' '{friendly_vin}' '{rest_of_vin}'"
-                )
-            return f"[{friendly_vin}]{rest_of_vin}"
-    return tag
-
-
-def scale_value(
-    old_value: float, old_min: float, old_max: float, new_min: float, new_max: float
-) -> float:
-    return ((new_max - new_min) * (old_value - old_min) / (old_max - old_min)) + new_min
+    return tag_names.name(tag)
+
+
+def value_summary(value, header: ES2Header | None = None, max_length: int = 100) -> str:
+    """
+    Short display string for a value, without stringifying all of it.
+
+    Collections that do not fit in max_length are summarized, like
+    `List[string](500) ['a', 'b', ...`.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        is_dict = isinstance(value, dict)
+        items = value.items() if is_dict else value
+        parts: list[str] = []
+        length = 2
+        for item in items:
+            part = f"{item[0]!r}: {item[1]!r}" if is_dict else repr(item)
+            parts.append(part)
+            length += len(part) + 2
+            if length > max_length:
+                summary = header_name(header) if header else type(value).__name__
+                preview = ("{" if is_dict else "[") + ", ".join(parts)
+                return f"{summary}({len(value)}) {preview[:max_length]}..."
+        return ("{%s}" if is_dict else "[%s]") % ", ".join(parts)
+    text = str(value)
+    if len(text) > max_length:
+        return text[:max_length] + "..."
+    return text
@@ -1,7 +1,7 @@
 import logging
 from typing import cast
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import (
     QWidget,
@@ -13,6 +13,8 @@ from PyQt6.QtWidgets import (
     QLayout,
     QLineEdit,
     QScrollArea,
+    QStyledItemDelegate,
+    QTableView,
     QVBoxLayout,
 )
 
@@ -28,14 +30,46 @@ from msc.es2.unity import (
     Vector3,
 )
 
+from ..models import EDITABLE_ELEMENT_TYPES, CollectionModel
+
 logger = logging.getLogger(__name__)
 
 
+class ComponentDelegate(QStyledItemDelegate):
+    """
+    Edits a cell of a CollectionModel as text, parsed to the type of the component.
+
+    Editors only exist while a cell is being edited.
+    """
+
+    def createEditor(self, parent, option, index: QModelIndex):
+        return QLineEdit(parent)
+
+    def setEditorData(self, editor, index: QModelIndex):
+        cast(QLineEdit, editor).setText(str(index.data(Qt.ItemDataRole.EditRole)))
+
+    def setModelData(self, editor, model, index: QModelIndex):
+        text = cast(QLineEdit, editor).text()
+        value_type = cast(CollectionModel, model).component_type(index)
+        if value_type is None:
+            return
+        try:
+            value = value_type(text)
+        except ValueError:
+            logger.warning("Invalid %s '%s'", value_type.__name__, text)
+            return
+        if not cast(QAbstractItemModel, model).setData(index, value):
+            logger.warning("Value '%s' is out of range", text)
+
+
 class EditWidget(QWidget):
     tag: str
     item: ES2Field
 
     _layout: QVBoxLayout
+    # Collections are edited in a table, other values in a form
+    _collection_model: CollectionModel | None = None
+    _table: QTableView | None = None
     _label: QLabel
     _scroll_area: QScrollArea
     _form_widget: QWidget
@@ -61,6 +95,10 @@ class EditWidget(QWidget):
         self.item = item
 
         match self.item.header.collection_type:
+            case ES2Key.NativeArray | ES2Key.List | ES2Key.Dictionary if (
+                self.item.header.value_type in EDITABLE_ELEMENT_TYPES
+            ):
+                self._add_collection_table()
             case ES2Key.NativeArray | ES2Key.List:
                 for item in self.item.value:
                     self._add_edit_widgets_to_layout(
@@ -80,6 +118,15 @@ class EditWidget(QWidget):
                     f"Cannot render widgets for {self.item.header.collection_type}"
                 )
 
+    def _add_collection_table(self):
+        self._collection_model = CollectionModel(self.item, self)
+        self._table = QTableView()
+        self._table.setModel(self._collection_model)
+        self._table.setItemDelegate(ComponentDelegate(self._table))
+        self._table.horizontalHeader().setStretchLastSection(True)
+        self._scroll_area.setVisible(False)
+        self._layout.addWidget(self._table)
+
     def _add_edit_widgets_to_layout(
         self, value_type: ES2ValueType, label, value, *, is_dict: bool = False
     ):
@@ -247,6 +294,8 @@ class EditWidget(QWidget):
                 return Color(*values)
 
     def get_value(self):
+        if self._collection_model is not None:
+            return self._collection_model.value()
         form_layout = self._form_layout
         assert self.item
         match self.item.header.collection_type:
@@ -1,17 +1,35 @@
 from itertools import cycle
 import logging
+from math import ceil, floor, log2
+from pathlib import Path
+from typing import Iterable
 
-from PyQt6.QtCore import Qt, QPointF, QRectF
+from PyQt6.QtCore import Qt, QPointF, QRectF, QSizeF, QThreadPool, pyqtSignal
 from PyQt6.QtWidgets import (
     QDockWidget,
+    QGraphicsItem,
     QGraphicsScene,
     QGraphicsView,
+    QListWidget,
+    QListWidgetItem,
+    QStyleOptionGraphicsItem,
     QVBoxLayout,
     QWidget,
 )
-from PyQt6.QtGui import QPixmap, QTransform, QWheelEvent
+from PyQt6.QtGui import (
+    QColor,
+    QFont,
+    QFontMetricsF,
+    QMouseEvent,
+    QPainter,
+    QPixmap,
+    QTransform,
+    QWheelEvent,
+)
 
 from msc.es2.unity import Transform
+from msc.spatial import GridIndex
+from ..tiles import TileCache, TileGenerator, TilePyramid
 
 
 logger = logging.getLogger(__name__)
@@ -27,16 +45,21 @@ class MapDockWidget(QDockWidget):
         self.setWidget(self._map_widget)
 
 
+_game_to_map = QTransform()
+_game_to_map.scale(0.491, -0.457)
+_game_to_map.translate(907.8 / 0.491, 828.6 / -0.457)
 
 
 def _scale_from_game_coordinates(game_x: float, game_z: float) -> QPointF:
-    transform = QTransform()
-    transform.scale(0.491, -0.457)
-    transform.translate(907.8 / 0.491, 828.6 / -0.457)
-
     game_coord = QPointF(game_x, game_z)
 
-    return transform.map(game_coord)
+    return _game_to_map.map(game_coord)
+
+
+def _scale_to_game_coordinates(pos: QPointF) -> tuple[float, float]:
+    game_coord = _game_to_map.inverted()[0].map(pos)
+
+    return game_coord.x(), game_coord.y()
 
 
 _marker_colors = cycle(
@@ -51,15 +74,371 @@ _marker_colors = cycle(
 )
 
 
+def _visible_rect(painter: QPainter, option: QStyleOptionGraphicsItem) -> QRectF:
+    """
+    The exposed part of an item that is on the device, exposedRect can be the whole
+    item.
+    """
+    device_rect = painter.worldTransform().inverted()[0].mapRect(
+        QRectF(painter.viewport())
+    )
+    return option.exposedRect.intersected(device_rect)
+
+
+class TileLayer(QGraphicsItem):
+    """
+    Draws the map background from a TilePyramid.
+
+    Only the tiles in view are drawn, from the level with the least detail that is
+    still at least as detailed as the screen. When the tiles cannot be generated the
+    whole image is drawn instead.
+    """
+
+    # The image, only loaded when the tiles could not be generated
+    _image: QPixmap | None = None
+
+    def __init__(self, pyramid: TilePyramid, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self.pyramid = pyramid
+        self.cache = TileCache(pyramid)
+        self.ready = pyramid.is_generated
+        self._bounds = QRectF(0, 0, pyramid.width, pyramid.height)
+
+    def boundingRect(self) -> QRectF:
+        return self._bounds
+
+    def set_ready(self):
+        """
+        Start drawing, after the tiles were generated.
+        """
+        self.ready = True
+        self.update()
+
+    def set_failed(self, exception: Exception):
+        """
+        Draw the whole image, after generating the tiles failed.
+        """
+        self._image = QPixmap(str(self.pyramid.source))
+        if self._image.isNull():
+            logger.warning("Can't read map image '%s'", self.pyramid.source)
+        self.update()
+
+    def paint(self, painter: QPainter | None, option, widget=None):
+        if painter is None:
+            return
+        if self._image is not None:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawPixmap(self._bounds, self._image, QRectF(self._image.rect()))
+            return
+        if not self.ready:
+            return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform()
+        )
+        level = max(0, min(floor(log2(1 / lod)), self.pyramid.levels - 1))
+        scale = 2**level
+        size = self.pyramid.TILE_SIZE * scale
+        rect = _visible_rect(painter, option).intersected(self._bounds)
+        if rect.isEmpty():
+            return
+        columns, rows = self.pyramid.tile_count(level)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for column in range(
+            int(rect.left() // size), min(int(rect.right() // size) + 1, columns)
+        ):
+            for row in range(
+                int(rect.top() // size), min(int(rect.bottom() // size) + 1, rows)
+            ):
+                pixmap = self.cache.tile(level, column, row)
+                if pixmap is None:
+                    continue
+                target = QRectF(
+                    column * size,
+                    row * size,
+                    pixmap.width() * scale,
+                    pixmap.height() * scale,
+                )
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+
+class MarkersLayer(QGraphicsItem):
+    """
+    Draws the markers of the selected transforms as a single scene item, a box and
+    the tag per marker.
+
+    Markers are added and removed in batches, every batch is a single update of the
+    scene. Only the markers in view are drawn.
+    """
+
+    BOX_SIZE = 5.0
+    # Offset of the labels from the marker position
+    LABEL_MARGIN = 4.0
+    CELL_SIZE = 64.0
+
+    markers: dict[str, tuple[QPointF, QColor]]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self.markers = {}
+        self.index = GridIndex(self.CELL_SIZE)
+        self._font_metrics = QFontMetricsF(QFont())
+        # Largest label, to find the labels that reach into the exposed area
+        self._label_size = QSizeF(0, 0)
+        self._bounds = QRectF()
+
+    def boundingRect(self) -> QRectF:
+        return self._bounds
+
+    def _label_rect(self, tag: str, pos: QPointF) -> QRectF:
+        return QRectF(
+            pos.x(),
+            pos.y(),
+            self._font_metrics.horizontalAdvance(tag) + 2 * self.LABEL_MARGIN,
+            self._font_metrics.height() + 2 * self.LABEL_MARGIN,
+        )
+
+    def add(self, markers: dict[str, tuple[QPointF, QColor]]):
+        if not markers:
+            return
+        bounds = QRectF(self._bounds)
+        label_size = QSizeF(self._label_size)
+        for tag, (pos, color) in markers.items():
+            self.markers[tag] = (pos, color)
+            self.index.insert(tag, pos.x(), pos.y())
+            rect = self._label_rect(tag, pos)
+            bounds = bounds.united(rect)
+            label_size = label_size.expandedTo(rect.size())
+        self._label_size = label_size
+        if bounds != self._bounds:
+            self.prepareGeometryChange()
+            self._bounds = bounds
+        self.update()
+
+    def remove(self, tags: Iterable[str]):
+        removed = False
+        for tag in tags:
+            if self.markers.pop(tag, None) is not None:
+                self.index.remove(tag)
+                removed = True
+        if removed:
+            self.update()
+
+    def paint(self, painter: QPainter | None, option, widget=None):
+        if painter is None or not self.markers:
+            return
+        rect = _visible_rect(painter, option)
+        ascent = QFontMetricsF(painter.font()).ascent()
+        for tag, x, y in self.index.query_rect(
+            rect.left() - self._label_size.width(),
+            rect.top() - self._label_size.height(),
+            rect.right(),
+            rect.bottom(),
+        ):
+            color = self.markers[tag][1]
+            painter.setPen(color)
+            painter.setBrush(color)
+            painter.drawRect(QRectF(x, y, self.BOX_SIZE, self.BOX_SIZE))
+            painter.drawText(
+                QPointF(x + self.LABEL_MARGIN, y + self.LABEL_MARGIN + ascent), tag
+            )
+
+
+class ObjectsLayer(QGraphicsItem):
+    """
+    Draws many objects as a single scene item, with level-of-detail culling.
+
+    Zoomed out, objects are merged into clusters of which only the visible cells are
+    drawn. Zoomed in, the objects in view are drawn as dots and, closer still, with
+    their tag as label.
+    """
+
+    # Size of the scene cells of the most detailed cluster level.
+    BASE_CELL_SIZE = 8.0
+    # Clusters are about this many pixels apart on screen.
+    CLUSTER_PIXELS = 24
+    # Zoom at which objects are drawn one by one, and at which they get labels.
+    POINTS_LOD = 2.0
+    LABELS_LOD = 6.0
+    # More objects in view than this are drawn as clusters at any zoom.
+    MAX_POINTS = 2000
+
+    color = QColor(220, 0, 120)
+
+    def __init__(self, points: dict[str, QPointF], parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self.index = GridIndex(
+            self.BASE_CELL_SIZE * 2,
+            ((tag, point.x(), point.y()) for tag, point in points.items()),
+        )
+        self._levels = self._build_levels()
+        self._bounds = QRectF()
+        if points:
+            xs = [point.x() for point in points.values()]
+            ys = [point.y() for point in points.values()]
+            self._bounds = QRectF(
+                QPointF(min(xs), min(ys)), QPointF(max(xs), max(ys))
+            ).adjusted(-10, -10, 10, 10)
+
+    def _build_levels(self) -> list[dict[tuple[int, int], list[float]]]:
+        """
+        Cluster cells per level as [count, sum of x, sum of y], each level has cells
+        twice as large as the one before.
+        """
+        level: dict[tuple[int, int], list[float]] = {}
+        size = self.BASE_CELL_SIZE
+        for x, y in self.index.points.values():
+            cell = level.setdefault((int(x // size), int(y // size)), [0, 0.0, 0.0])
+            cell[0] += 1
+            cell[1] += x
+            cell[2] += y
+        levels = [level]
+        while len(level) > 1:
+            level = _parent_level(level)
+            levels.append(level)
+        return levels
+
+    def update_points(self, points: dict[str, QPointF | None]):
+        """
+        Move or add objects, or remove them when None, without building the layer
+        again.
+        """
+        for tag, point in points.items():
+            if tag in self.index:
+                self._add_to_levels(*self.index.points[tag], -1)
+                self.index.remove(tag)
+            if point is None:
+                continue
+            self.index.insert(tag, point.x(), point.y())
+            self._add_to_levels(point.x(), point.y(), 1)
+            if not self._bounds.contains(point):
+                self.prepareGeometryChange()
+                self._bounds = self._bounds.united(
+                    QRectF(point, point).adjusted(-10, -10, 10, 10)
+                )
+        while len(self._levels[-1]) > 1:
+            self._levels.append(_parent_level(self._levels[-1]))
+        self.update()
+
+    def _add_to_levels(self, x: float, y: float, count: int):
+        """
+        Add a point to the cluster cells of every level, or remove it with count -1.
+        """
+        i, j = int(x // self.BASE_CELL_SIZE), int(y // self.BASE_CELL_SIZE)
+        for level in self._levels:
+            cell = level.setdefault((i, j), [0, 0.0, 0.0])
+            cell[0] += count
+            cell[1] += count * x
+            cell[2] += count * y
+            if cell[0] <= 0:
+                del level[(i, j)]
+            i, j = i >> 1, j >> 1
+
+    def boundingRect(self) -> QRectF:
+        return self._bounds
+
+    def paint(self, painter: QPainter | None, option, widget=None):
+        if painter is None:
+            return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform()
+        )
+        rect = _visible_rect(painter, option)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.color)
+
+        if lod >= self.POINTS_LOD:
+            points = list(
+                self.index.query_rect(
+                    rect.left(), rect.top(), rect.right(), rect.bottom()
+                )
+            )
+            if len(points) <= self.MAX_POINTS:
+                self._paint_points(painter, points, lod)
+                return
+        self._paint_clusters(painter, rect, lod)
+
+    def _paint_points(self, painter: QPainter, points: list, lod: float):
+        radius = 3 / lod
+        for _, x, y in points:
+            painter.drawEllipse(QPointF(x, y), radius, radius)
+        if lod < self.LABELS_LOD:
+            return
+        # Labels have the same size at any zoom
+        painter.setPen(self.color)
+        for tag, x, y in points:
+            painter.save()
+            painter.translate(x, y)
+            painter.scale(1 / lod, 1 / lod)
+            painter.drawText(QPointF(5, -5), tag)
+            painter.restore()
+
+    def _paint_clusters(self, painter: QPainter, rect: QRectF, lod: float):
+        cell_size = self.CLUSTER_PIXELS / lod
+        level = max(0, ceil(log2(cell_size / self.BASE_CELL_SIZE)))
+        level = min(level, len(self._levels) - 1)
+        size = self.BASE_CELL_SIZE * 2**level
+        i0, i1 = int(rect.left() // size), int(rect.right() // size)
+        j0, j1 = int(rect.top() // size), int(rect.bottom() // size)
+        cells = self._levels[level]
+        if (i1 - i0 + 1) * (j1 - j0 + 1) <= len(cells):
+            visible = (
+                cells[(i, j)]
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+                if (i, j) in cells
+            )
+        else:
+            visible = (
+                cell
+                for (i, j), cell in cells.items()
+                if i0 <= i <= i1 and j0 <= j <= j1
+            )
+        for count, sum_x, sum_y in visible:
+            radius = (2 + 1.5 * log2(count)) / lod
+            painter.drawEllipse(QPointF(sum_x / count, sum_y / count), radius, radius)
+
+
+def _parent_level(
+    level: dict[tuple[int, int], list[float]],
+) -> dict[tuple[int, int], list[float]]:
+    """
+    The cluster cells of the next level of an ObjectsLayer, twice as large.
+    """
+    parent_level: dict[tuple[int, int], list[float]] = {}
+    for (i, j), (count, sum_x, sum_y) in level.items():
+        cell = parent_level.setdefault((i >> 1, j >> 1), [0, 0.0, 0.0])
+        cell[0] += count
+        cell[1] += sum_x
+        cell[2] += sum_y
+    return parent_level
+
+
 class MapWidget(QWidget):
+    # Game x, z of a click on the map
+    position_clicked = pyqtSignal(float, float)
+    # Tag double clicked in the list of nearby objects
+    nearby_tag_activated = pyqtSignal(str)
+
     _scene: QGraphicsScene
     _view: QGraphicsView
-    _background: QPixmap
+    _background: TileLayer
+    _nearby_list: QListWidget
 
-    markers: dict[str, list]
+    markers: MarkersLayer
+    objects_layer: ObjectsLayer | None = None
 
     class GraphicsView(QGraphicsView):
         factor = 1.5
+        # A release further than this from the press is a drag, not a click
+        click_distance = 4
+
+        clicked = pyqtSignal(QPointF)  # scene position
 
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
@@ -68,6 +447,23 @@ class MapWidget(QWidget):
             self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
             self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
             self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+            self._press_pos = None
+
+        def mousePressEvent(self, event: QMouseEvent | None) -> None:
+            if event and event.button() == Qt.MouseButton.LeftButton:
+                self._press_pos = event.position()
+            super().mousePressEvent(event)
+
+        def mouseReleaseEvent(self, event: QMouseEvent | None) -> None:
+            super().mouseReleaseEvent(event)
+            if not event or event.button() != Qt.MouseButton.LeftButton:
+                return
+            press_pos, self._press_pos = self._press_pos, None
+            if press_pos is None:
+                return
+            moved = event.position() - press_pos
+            if moved.manhattanLength() <= self.click_distance:
+                self.clicked.emit(self.mapToScene(event.position().toPoint()))
 
         def wheelEvent(self, event: QWheelEvent | None) -> None:
             if not event:
@@ -86,12 +482,18 @@ class MapWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self.markers = {}
-
         self._scene = QGraphicsScene(self)
 
-        self._background = QPixmap("gui/perjarvi_road_map.png")
-        self._scene_map_widget = self._scene.addPixmap(self._background)
+        self._background = TileLayer(TilePyramid(Path("gui/perjarvi_road_map.png")))
+        self._scene.addItem(self._background)
+        self.markers = MarkersLayer()
+        self.markers.setZValue(1)
+        self._scene.addItem(self.markers)
+        if not self._background.ready:
+            self._tile_generator = TileGenerator(self._background.pyramid)
+            self._tile_generator.signals.finished.connect(self._background.set_ready)
+            self._tile_generator.signals.failed.connect(self._background.set_failed)
+            QThreadPool.globalInstance().start(self._tile_generator)
 
         self._view = MapWidget.GraphicsView(self._scene)
         self._view.fitInView(
@@ -104,35 +506,103 @@ class MapWidget(QWidget):
         layout = verticalLayout
         layout.insertWidget(1, self._view)
 
-    def add_marker(self, tag: str, item: Transform):
-        if tag in self.markers:
-            return
-        position = item.position
+        self._nearby_list = QListWidget()
+        self._nearby_list.setMaximumHeight(120)
+        self._nearby_list.setVisible(False)
+        self._nearby_list.itemDoubleClicked.connect(self._nearby_item_activated)
+        layout.addWidget(self._nearby_list)
 
-        pos = _scale_from_game_coordinates(position.x, position.z)
+        self._view.clicked.connect(self._view_clicked)
 
-        if not QRectF(self._background.rect()).contains(pos):
-            logger.warning(
-                "Not adding marker because out of bounds '%s' @ '%s", tag, pos
-            )
-            return
+    def _view_clicked(self, pos: QPointF):
+        self.position_clicked.emit(*_scale_to_game_coordinates(pos))
 
-        color = next(_marker_colors)
-        text = self._scene.addText(tag)
-        box = self._scene.addRect(QRectF(0, 0, 5, 5), color, color)
-        assert text is not None
-        assert box is not None
-        text.setDefaultTextColor(color)
-        text.setPos(pos)
-        box.setPos(pos)
+    def _nearby_item_activated(self, item: QListWidgetItem):
+        self.nearby_tag_activated.emit(item.data(Qt.ItemDataRole.UserRole))
 
-        self.markers[tag] = [text, box]
+    def show_nearby(self, nearby: list[tuple[str, float]] | None):
+        """
+        Show the objects nearest to a clicked position with their distance, or hide
+        the list when None.
+        """
+        self._nearby_list.clear()
+        if nearby is None:
+            self._nearby_list.setVisible(False)
+            return
+        for tag, distance in nearby:
+            item = QListWidgetItem(f"{tag} ({distance:.1f} m)")
+            item.setData(Qt.ItemDataRole.UserRole, tag)
+            self._nearby_list.addItem(item)
+        self._nearby_list.setVisible(True)
 
-    def remove_marker(self, tag: str):
-        if tag not in self.markers:
+    def add_marker(self, tag: str, item: Transform):
+        self.add_markers({tag: item})
+
+    def add_markers(self, items: dict[str, Transform]):
+        """
+        Add a marker for every transform that is not on the map yet, in one update.
+        """
+        bounds = self._background.boundingRect()
+        markers = {}
+        for tag, item in items.items():
+            if tag in self.markers.markers or tag in markers:
+                continue
+            position = item.position
+            pos = _scale_from_game_coordinates(position.x, position.z)
+            if not bounds.contains(pos):
+                logger.warning(
+                    "Not adding marker because out of bounds '%s' @ '%s", tag, pos
+                )
+                continue
+            markers[tag] = (pos, QColor(next(_marker_colors)))
+        self.markers.add(markers)
+
+    def set_objects(self, objects: dict[str, Transform] | None):
+        """
+        Show all objects at once as an ObjectsLayer, or remove the layer when None.
+        """
+        if self.objects_layer is not None:
+            self._scene.removeItem(self.objects_layer)
+            self.objects_layer = None
+        if objects is None:
             return
 
-        for item in self.markers[tag]:
-            self._scene.removeItem(item)
+        points = self._object_points(objects)
+        self.objects_layer = ObjectsLayer(
+            {tag: point for tag, point in points.items() if point is not None}
+        )
+        # Above the background, below the markers
+        self.objects_layer.setZValue(0.5)
+        self._scene.addItem(self.objects_layer)
+
+    def update_objects(self, objects: dict[str, Transform | None]):
+        """
+        Move, add or remove (None) objects of the ObjectsLayer, when it is shown.
+        """
+        if self.objects_layer is not None:
+            self.objects_layer.update_points(self._object_points(objects))
+
+    def _object_points(
+        self, objects: dict[str, Transform | None]
+    ) -> dict[str, QPointF | None]:
+        """
+        The map positions of objects, None for objects outside of the map.
+        """
+        bounds = self._background.boundingRect()
+        points: dict[str, QPointF | None] = {}
+        for tag, transform in objects.items():
+            points[tag] = None
+            if transform is None:
+                continue
+            pos = _scale_from_game_coordinates(
+                transform.position.x, transform.position.z
+            )
+            if bounds.contains(pos):
+                points[tag] = pos
+        return points
+
+    def remove_marker(self, tag: str):
+        self.remove_markers([tag])
 
-        del self.markers[tag]
+    def remove_markers(self, tags: Iterable[str]):
+        self.markers.remove(tags)
@@ -1,8 +1,8 @@
+from functools import partial
 import logging
 from pathlib import Path
-import re
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThreadPool
 from PyQt6.QtWidgets import (
     QDockWidget,
     QWidget,
@@ -11,15 +11,18 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
 
-from msc.es2.enums import ES2ValueType, ES2Key
 from msc.es2.types import ES2Field
-from ..utils import PARTS_DATA, tag_name2, parse_tag, scale_value
+from msc.report import CarReport, ReportRow
+from ..report import ReportBuilder
 
 logger = logging.getLogger(__name__)
 
 
 class ReportDockWidget(QDockWidget):
     _file_name: Path | None
+    _builder: ReportBuilder | None = None
+    # Edits made while the report was building, applied once it is built.
+    _pending_tags: set[str]
     report: "ReportWidget"
 
     def __init__(self, *args, **kwargs):
@@ -33,6 +36,8 @@ class ReportDockWidget(QDockWidget):
 
     def reset(self):
         self._file_name = None
+        self._builder = None
+        self._pending_tags = set()
 
     def add_file_data(self, filename: Path, data: dict[str, ES2Field]):
         if "VIN1010AID" not in data:
@@ -42,16 +47,56 @@ class ReportDockWidget(QDockWidget):
             return
         logger.info("Setting file data '%s'", filename)
         self._file_name = filename
-        self.report.set_data(data)
+        # Built on a worker thread, large saves would block the UI.
+        self._builder = ReportBuilder(data)
+        self._builder.signals.finished.connect(
+            partial(self._report_built, self._builder)
+        )
+        QThreadPool.globalInstance().start(self._builder)
+
+    def _report_built(self, builder: ReportBuilder, car_report: CarReport):
+        if builder is not self._builder:
+            # Another file was set or this one was removed while building.
+            return
+        self._builder = None
+        self.report.set_report(car_report)
+        if self._pending_tags:
+            self.report.update_tags(list(self._pending_tags))
+            self._pending_tags.clear()
+
+    def update_file_data(self, filename: Path, tags: list[str]):
+        """
+        Update the rows fed by tags after their values were edited.
+        """
+        if self._file_name != filename:
+            return
+        if self._builder is not None:
+            self._pending_tags.update(tags)
+            return
+        self.report.update_tags(tags)
+
+    def reload_file_data(self, filename: Path, data: dict[str, ES2Field]):
+        """
+        Build the report again from the newly read data of the file it shows.
+        """
+        if self._file_name != filename:
+            return
+        self.remove_file_data(filename)
+        self.add_file_data(filename, data)
 
     def remove_file_data(self, filename: Path):
         if self._file_name == filename:
             self.report.clear_data()
-            self._file_name = None
+            self.reset()
 
 
 class ReportWidget(QWidget):
     model: QStandardItemModel
+    car_report: CarReport | None = None
+    # The rows of every part with their items, to update them in place.
+    _rows_by_part: dict[str, list[tuple[ReportRow, list[QStandardItem]]]]
+    # Whether the user sorted the table, new rows are then sorted in.
+    _sorted: bool = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -61,6 +106,9 @@ class ReportWidget(QWidget):
 
         self.table_widget = QTableView()
         self.table_widget.setSortingEnabled(True)
+        self.table_widget.horizontalHeader().sortIndicatorChanged.connect(
+            self._sort_indicator_changed
+        )
         self.model = QStandardItemModel()
         self.clear_data()
         self.table_widget.setModel(self.model)
@@ -69,114 +117,72 @@ class ReportWidget(QWidget):
     def clear_data(self):
         self.model.clear()
         self.model.setHorizontalHeaderLabels(["Part", "Item", "Condition"])
+        self.car_report = None
+        self._rows_by_part = {}
 
-    def set_data(self, data: dict[str, ES2Field]):
-        sorted_data: dict[str, ES2Field] = {k: data[k] for k in sorted(data.keys())}
-
-        aid_names: list[str] = [
-            tag for tag in sorted_data.keys() if tag.endswith("AID")
-        ]
-
-        installed_aids = {
-            tag: item
-            for tag, item in sorted_data.items()
-            if tag.endswith("AID")
-            and item.header.collection_type == ES2Key.Null
-            and item.header.value_type == ES2ValueType.int32
-            and item.value > 0
-        }
-
-        installed_parts: dict[str, dict] = {}
-        for tag in sorted(aid_names):
-            part_prefix = tag.removesuffix("AID")
-            all_values_for_part: list[str] = [
-                tag.removeprefix(part_prefix)
-                for tag in data.keys()
-                if tag.startswith(part_prefix)
-                and not re.match(r"^\d", tag.removeprefix(part_prefix))
-            ]
-            if tag not in installed_aids:
-                continue
-            part_tags: list[str] = [
-                f"{part_prefix}{value}" for value in all_values_for_part
-            ]
-
-            installed_parts[part_prefix] = {
-                tag.removeprefix(part_prefix): data[tag].value for tag in part_tags
-            }
-            installed_parts[part_prefix]["name"] = parse_tag(part_prefix)
-
-        parts_list = []
-
-        skip_wear = set()
-
-        for part_name, part_data in PARTS_DATA.items():
-            found_parts = [
-                tag
-                for tag in installed_parts.keys()
-                if tag.lower().startswith(part_name.lower())
-            ]
-            if not found_parts:
-                continue
-            for row in found_parts:
-                installed_part = installed_parts[row]
-                for val_name, val_data in part_data.items():
-                    if not val_data:
-                        continue
-                    if val_name in installed_part:
-                        score = None
-                        if "range" in val_data:
-                            score = scale_value(
-                                installed_part[val_name],
-                                val_data["range"]["min"],
-                                val_data["range"]["max"],
-                                0,
-                                100,
-                            )
-                        parts_list.append(
-                            {
-                                "name": tag_name2(installed_part["name"]),
-                                "key": val_data["name"],
-                                "value": installed_part[val_name],
-                                "score": score,
-                            }
-                        )
-                        if val_name == "WEA":
-                            skip_wear.add(row)
-                        # print(val_name, installed_part[val_name], val_data)
-
-        for part_prefix, installed_part in installed_parts.items():
-            if part_prefix in skip_wear:
-                continue
-            if "WEA" in installed_part:
-                parts_list.append(
-                    {
-                        "name": tag_name2(installed_part["name"]),
-                        "key": "wear",
-                        "value": installed_part["WEA"],
-                        "score": installed_part["WEA"],
-                    }
-                )
+    def _sort_indicator_changed(self, *args):
+        self._sorted = True
+
+    def _sort(self):
+        if self._sorted:
+            header = self.table_widget.horizontalHeader()
+            self.model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
 
+    def set_report(self, car_report: CarReport):
         self.clear_data()
-        for row_data in parts_list:
-            items = []
-            for col in ["name", "key", "value"]:
-                col_data = row_data[col]
-                item = QStandardItem(str(col_data))
-                if (
-                    col == "value"
-                    and "score" in row_data
-                    and row_data["score"] is not None
-                ):
-                    score = row_data["score"]
-                    color = Qt.GlobalColor.yellow
-                    if score > 75:
-                        color = Qt.GlobalColor.green
-                    elif score < 25:
-                        color = Qt.GlobalColor.red
-                    item.setBackground(color)
-                items.append(item)
-            self.model.appendRow(items)
-
-        # print(parts_list)
+        self.car_report = car_report
+        for row in car_report.rows:
+            self._append_row(row)
+        self._sort()
+
+    def update_tags(self, tags: list[str]):
+        """
+        Recompute only the rows of the parts fed by tags, the other rows stay as is.
+        """
+        if self.car_report is None:
+            return
+        rows_added = False
+        for part_prefix in self.car_report.affected_parts(tags):
+            rows = self.car_report.update_part(part_prefix)
+            old_rows = self._rows_by_part.pop(part_prefix, [])
+            if [(row.key, row.tag) for row, _ in old_rows] == [
+                (row.key, row.tag) for row in rows
+            ]:
+                for (_, items), row in zip(old_rows, rows):
+                    _set_row_items(items, row)
+                if rows:
+                    self._rows_by_part[part_prefix] = list(
+                        zip(rows, (items for _, items in old_rows))
+                    )
+                continue
+
+            # The part was installed or removed
+            for row_index in sorted(
+                (items[0].row() for _, items in old_rows), reverse=True
+            ):
+                self.model.removeRow(row_index)
+            for row in rows:
+                self._append_row(row)
+            rows_added = rows_added or bool(rows)
+        if rows_added:
+            self._sort()
+
+    def _append_row(self, row: ReportRow):
+        items = [QStandardItem() for _ in range(3)]
+        _set_row_items(items, row)
+        self.model.appendRow(items)
+        self._rows_by_part.setdefault(row.part, []).append((row, items))
+
+
+def _set_row_items(items: list[QStandardItem], row: ReportRow):
+    for item, col_data in zip(items, (row.name, row.key, row.value)):
+        item.setText(str(col_data))
+    if row.score is None:
+        items[2].setData(None, Qt.ItemDataRole.BackgroundRole)
+        return
+    color = Qt.GlobalColor.yellow
+    if row.score > 75:
+        color = Qt.GlobalColor.green
+    elif row.score < 25:
+        color = Qt.GlobalColor.red
+    items[2].setBackground(color)
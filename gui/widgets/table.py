@@ -1,15 +1,16 @@
 from functools import partial
 import logging
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
 from PyQt6.QtCore import (
     Qt,
     QModelIndex,
-    QSortFilterProxyModel,
     pyqtSignal,
     QItemSelection,
     QPoint,
+    QThreadPool,
+    QTimer,
 )
 from PyQt6.QtGui import (
     QGuiApplication,
@@ -24,11 +25,16 @@ from PyQt6.QtWidgets import (
     QMenu,
 )
 
-from msc.es2.enums import ES2ValueType
+from msc.bolts import BoltChecker
 from msc.es2.types import ES2Field
+from msc.history import EditHistory, EditStep
+from msc.journal import EditJournal
+from msc.query import QueryError, ValueIndex, is_query
+from msc.spatial import TransformIndex
 
 from ..dialogs import EditDialog
-from ..models import TreeModel, TreeItemIndex, TableItem
+from ..models import TagFilterProxyModel, TreeModel, TreeItemIndex, TableItem
+from ..search import SearchIndex, SearchIndexBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -42,23 +48,59 @@ class TreeView(QTreeView):
 
 
 class TableWidget(QWidget):
-    datamodel: QSortFilterProxyModel
+    datamodel: TagFilterProxyModel
     tree_view: TreeView
     context_menu: QMenu
 
     filename: Path
     file_data: dict[str, ES2Field]
+    # Raw bytes of every tag as last read from disk, used for incremental reloads.
+    raw_chunks: dict[str, bytes]
+    edited_tags: set[str]
+    # Positions of the transforms, shared with the search index.
+    transforms: TransformIndex
+    # Unsaved edits, to recover them after a crash
+    journal: EditJournal
+    history: EditHistory
     changed: bool = False
+    # Incremented on every change of file_data, for caches of derived data.
+    data_version: int = 0
+    search_index: SearchIndex | None = None
+    # The filter that should be shown and the one that currently is, filtering
+    # only happens for the visible tab, see apply_filter.
+    _filter: tuple[str, bool] = ("", False)
+    _applied_filter: tuple[str, bool] = ("", False)
+    _index_builder: SearchIndexBuilder | None = None
+    # Tags edited while the search index was building, updated once it is built
+    _pending_index_tags: set[str]
+    _bolt_checker: tuple[int, BoltChecker] | None = None
+    # Selection changes not sent with tags_selected_changed yet
+    _selected_tags: set[str]
+    _deselected_tags: set[str]
 
     data_changed = pyqtSignal(bool)
     tag_selected = pyqtSignal(str)
     tags_selected_changed = pyqtSignal(dict, list)
+    tags_edited = pyqtSignal(list)
+    history_changed = pyqtSignal()
 
-    def __init__(self, parent=None, *, filename: Path, data: dict[str, ES2Field]):
+    def __init__(
+        self,
+        parent=None,
+        *,
+        filename: Path,
+        data: dict[str, ES2Field],
+        raw_chunks: dict[str, bytes] | None = None,
+    ):
         super().__init__(parent)
 
         self.filename = filename
         self.file_data = data
+        self.raw_chunks = raw_chunks or {}
+        self.transforms = TransformIndex(data)
+        self.journal = EditJournal(filename)
+        self.history = EditHistory()
+        self.edited_tags = set()
         self.changed = False
 
         layout = QVBoxLayout()
@@ -66,7 +108,7 @@ class TableWidget(QWidget):
         layout.addWidget(self.tree_view)
         self.setLayout(layout)
 
-        self.datamodel = QSortFilterProxyModel()
+        self.datamodel = TagFilterProxyModel()
         self.datamodel.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.datamodel.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.datamodel.setRecursiveFilteringEnabled(True)
@@ -88,48 +130,185 @@ class TableWidget(QWidget):
             self.treeview_contextmenu_requested
         )
         self.tree_view.selection_changed.connect(self.treeview_selection_changed)
+        self._selected_tags = set()
+        self._deselected_tags = set()
+        self._selection_timer = QTimer(self)
+        self._selection_timer.setSingleShot(True)
+        self._selection_timer.setInterval(0)
+        self._selection_timer.timeout.connect(self._emit_selection_changed)
 
         self.context_menu = QMenu(self.tree_view)
 
-    def reload(self, data: dict[str, ES2Field]):
+        self._build_search_index()
+
+    def _build_search_index(self):
+        self.search_index = None
+        self._pending_index_tags = set()
+        builder = SearchIndexBuilder(self.file_data, self.transforms)
+        builder.signals.finished.connect(partial(self._search_index_built, builder))
+        self._index_builder = builder
+        QThreadPool.globalInstance().start(builder)
+
+    def _search_index_built(
+        self, builder: SearchIndexBuilder, search_index: SearchIndex
+    ):
+        if builder is not self._index_builder:
+            return  # reloaded while building, a new index is on its way
+        self._index_builder = None
+        self.search_index = search_index
+        for tag in self._pending_index_tags:
+            search_index.update(tag, self.file_data.get(tag))
+        self._pending_index_tags.clear()
+        # Re-run the wildcard fallback on the index.
+        self._reapply_filter()
+
+    def _reapply_filter(self):
+        """
+        Filter again on the current filter, after the index or the values changed.
+        """
+        if self._applied_filter[0]:
+            self._applied_filter = ("", False)
+            if self.isVisible():
+                self.apply_filter()
+
+    def set_filter(self, text: str, case_sensitive: bool, *, apply: bool = True):
+        """
+        Set the search filter, it is only applied right away when apply is set.
+        """
+        self._filter = (text, case_sensitive)
+        if apply:
+            self.apply_filter()
+
+    def apply_filter(self):
+        """
+        Filter the rows on the last filter set with set_filter, if it changed.
+        """
+        if self._filter == self._applied_filter:
+            return
+        self._applied_filter = text, case_sensitive = self._filter
+
+        if text:
+            # Rows that have not been fetched yet cannot be matched by the filter.
+            cast(TreeModel, self.datamodel.sourceModel()).fetch_all()
+
+        if not text:
+            self.datamodel.set_matching_tags(None)
+            self.datamodel.setFilterWildcard("")
+        elif self.search_index is not None and is_query(text):
+            try:
+                tags = self.search_index.values.query(text)
+            except QueryError as e:
+                logger.info("Invalid query '%s': %s", text, e)
+                tags = set()
+            self.datamodel.set_matching_tags(tags)
+        elif self.search_index is not None:
+            self.datamodel.set_matching_tags(
+                self.search_index.search(text, case_sensitive)
+            )
+        else:
+            # Index is still being built, match the tag column only.
+            self.datamodel.setFilterCaseSensitivity(
+                Qt.CaseSensitivity.CaseSensitive
+                if case_sensitive
+                else Qt.CaseSensitivity.CaseInsensitive
+            )
+            self.datamodel.setFilterWildcard(text)
+
+    def reload(self, data: dict[str, ES2Field], raw_chunks: dict[str, bytes]):
+        """
+        Switch to a newly read version of the file, keeping the expanded and selected rows.
+
+        Fields that did not change on disk should be the same objects as before,
+        see unedited_data.
+        """
+        self.changed = False
         self.data_changed.emit(False)
         self.file_data = data
-        self.datamodel.setSourceModel(TreeModel(data))
+        self.raw_chunks = raw_chunks
+        self.transforms = TransformIndex(data)
+        self.edited_tags.clear()
+        self.journal.clear()
+        self.history.clear()
+        self.history_changed.emit()
+        self.data_version += 1
+        cast(TreeModel, self.datamodel.sourceModel()).update_data(data)
+        self._build_search_index()
+
+    def bolt_checker(self) -> BoltChecker:
+        """
+        The BoltChecker of file_data, cached until the data changes.
+        """
+        if self._bolt_checker is None or self._bolt_checker[0] != self.data_version:
+            self._bolt_checker = (self.data_version, BoltChecker(self.file_data))
+        return self._bolt_checker[1]
+
+    def value_index(self) -> ValueIndex:
+        """
+        The ValueIndex of file_data, built here when the search index is not ready.
+        """
+        if self.search_index is not None:
+            return self.search_index.values
+        return ValueIndex(self.file_data, self.transforms)
+
+    def unedited_data(self) -> dict[str, ES2Field]:
+        """
+        The fields that still match raw_chunks, these can be reused on reload.
+        """
+        return {
+            tag: field
+            for tag, field in self.file_data.items()
+            if tag not in self.edited_tags
+        }
 
     def treeview_selection_changed(
         self, selected: QItemSelection, deselected: QItemSelection
     ):
-        def _selection_to_tags(selection: QItemSelection) -> list[str]:
-            indexes = selection.indexes()
+        """
+        Slot that gets triggered when the selection of the tree_view changed.
 
-            tags = []
+        Changes are collected and sent as one tags_selected_changed per event loop
+        iteration, see _emit_selection_changed.
+        """
+        for tag in self._selection_to_tags(deselected):
+            self._selected_tags.discard(tag)
+            self._deselected_tags.add(tag)
+        for tag in self._selection_to_tags(selected):
+            self._deselected_tags.discard(tag)
+            self._selected_tags.add(tag)
+        self._selection_timer.start()
 
-            for index in indexes:
+    def _selection_to_tags(self, selection: QItemSelection) -> set[str]:
+        """
+        Tags of the selected rows and the transforms directly below them.
+        """
+        tags = set()
+        column = TreeItemIndex.TAG.value
+        for selection_range in selection:
+            if not selection_range.left() <= column <= selection_range.right():
+                continue
+            parent = selection_range.parent()
+            for row in range(selection_range.top(), selection_range.bottom() + 1):
                 table_item = cast(
                     TableItem,
-                    cast(QSortFilterProxyModel, index.model())
-                    .mapToSource(index)
-                    .internalPointer(),
+                    self.datamodel.mapToSource(
+                        self.datamodel.index(row, column, parent)
+                    ).internalPointer(),
                 )
-                if table_item.tag not in tags:
-                    tags.append(table_item.tag)
-                if table_item.childCount() > 0:
-                    for child in cast(list[TableItem], table_item.child_items):
-                        data = self.file_data[child.tag]
-                        if data.header.value_type == ES2ValueType.transform:
-                            if child.tag not in tags:
-                                tags.append(child.tag)
-
-            return tags
-
-        def _selected_tags_to_dict(selection: list[str]) -> dict[str, ES2Field]:
-            return {
-                tag: self.file_data[tag] for tag in selection if tag in self.file_data
-            }
+                tags.add(table_item.tag)
+                if table_item.hasChildren():
+                    tags.update(
+                        child_tag
+                        for child_tag in table_item.child_tags()
+                        if child_tag in self.transforms
+                    )
+        return tags
 
+    def _emit_selection_changed(self):
+        selected, self._selected_tags = self._selected_tags, set()
+        deselected, self._deselected_tags = self._deselected_tags, set()
         self.tags_selected_changed.emit(
-            _selected_tags_to_dict(_selection_to_tags(selected)),
-            _selection_to_tags(deselected),
+            {tag: self.file_data[tag] for tag in selected if tag in self.file_data},
+            list(deselected),
         )
 
     def treeView_doubleClicked(self, index: QModelIndex):
@@ -166,17 +345,74 @@ class TableWidget(QWidget):
         tag: str = cast(str, tag_index.data(Qt.ItemDataRole.UserRole))
         display_tag = cast(str, tag_index.data(Qt.ItemDataRole.DisplayRole))
 
-        if tag not in self.file_data:
+        if tag not in self.file_data or self.file_data[tag].is_raw:
             return
 
         dialog = EditDialog(display_tag, self.file_data[tag], self)
         result = dialog.exec()
         if result == QDialog.DialogCode.Accepted:
-            dialog_result = dialog.get_value()
-            if self.file_data[tag].value == dialog_result:
-                return
-            self.changed = True
-            self.data_changed.emit(True)
-            self.file_data[tag].value = dialog_result
-            value_index: QModelIndex = index.siblingAtColumn(TreeItemIndex.VALUE.value)
-            self.datamodel.setData(value_index, dialog_result)
+            self.set_values({tag: dialog.get_value()}, f"Edit {display_tag}")
+
+    def set_values(self, values: dict[str, Any], description: str):
+        """
+        Change the values of several tags as one undoable step.
+        """
+        changes = {
+            tag: (self.file_data[tag].value, value)
+            for tag, value in values.items()
+            if self.file_data[tag].value != value
+        }
+        if not changes:
+            return
+        self._apply_values({tag: new for tag, (_, new) in changes.items()})
+        self.history.record(EditStep(description, changes))
+        self._history_changed()
+
+    def undo(self, count: int = 1):
+        self._apply_values(self.history.undo(count))
+        self._history_changed()
+
+    def redo(self, count: int = 1):
+        self._apply_values(self.history.redo(count))
+        self._history_changed()
+
+    def _apply_values(self, values: dict[str, Any]):
+        if not values:
+            return
+        try:
+            self.journal.extend(
+                (
+                    tag,
+                    ES2Field(self.file_data[tag].header, self.file_data[tag].value),
+                    ES2Field(self.file_data[tag].header, value),
+                )
+                for tag, value in values.items()
+            )
+        except OSError:
+            logger.exception("Cannot journal the edits of '%s'", self.filename)
+        for tag, value in values.items():
+            field = self.file_data[tag]
+            field.value = value
+            self.transforms.update(tag, field)
+            if self.search_index is not None:
+                self.search_index.update(tag, field)
+            else:
+                self._pending_index_tags.add(tag)
+        self.edited_tags.update(values)
+        self.data_version += 1
+        cast(TreeModel, self.datamodel.sourceModel()).update_values(values)
+        # Rows can start or stop matching the filter
+        self._reapply_filter()
+        self.tags_edited.emit(list(values))
+
+    def _history_changed(self):
+        """
+        Update the dirty state after the history moved, undoing to the saved state
+        makes the file unchanged again.
+        """
+        self.changed = not self.history.is_clean
+        if not self.changed:
+            self.edited_tags.clear()
+            self.journal.clear()
+        self.data_changed.emit(self.changed)
+        self.history_changed.emit()
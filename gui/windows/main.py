@@ -2,55 +2,66 @@ from functools import partial
 import logging
 import os
 from pathlib import Path
-import shutil
-import tempfile
-from typing import cast
+from typing import Iterable, cast
 
 from PyQt6.QtCore import (
     Qt,
+    QThreadPool,
+    QTimer,
     pyqtSignal,
 )
 from PyQt6.QtWidgets import (
     QMainWindow,
     QApplication,
+    QDialog,
     QFileDialog,
+    QMessageBox,
+    QProgressBar,
     QTabWidget,
 )
 from PyQt6.uic.load_ui import loadUi
 
-from msc.es2 import ES2Reader, ES2Writer
-from msc.es2.enums import ES2ValueType
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.backups import RetentionPolicy
 from msc.es2.types import ES2Field
+from msc.journal import EditJournal
+from msc.query import is_query
+from msc.save import SaveResult
 
 from ..config import ConfigLoader, Config
-from ..dialogs import BoltCheckerDialog, ErrorDialog
+from ..dialogs import BoltCheckerDialog, BulkEditDialog, ErrorDialog
+from ..loader import FileLoader, FolderLoader, LoadedFile
+from ..saver import FileSaver
+from ..utils import tag_names
 from ..widgets.map import MapDockWidget
 from ..widgets.report import ReportDockWidget
 from ..widgets.table import TableWidget
 
 logger = logging.getLogger(__name__)
 
-
-def _copy_file(src, dst):
-    shutil.copyfile(src, dst)
-    try:
-        shutil.copystat(src, dst)
-    except OSError:
-        logger.exception("Cannot copy stat")
-    try:
-        shutil.copymode(src, dst)
-    except OSError:
-        logger.exception("Cannot copy mode")
+# Wait this long after the last keystroke before searching.
+SEARCH_DEBOUNCE_MS = 200
+# Objects listed when clicking on the map
+NEARBY_COUNT = 10
+# Steps listed in the undo history menu
+UNDO_HISTORY_COUNT = 30
 
 
 class MainWindow(QMainWindow):
     config: Config
     open_files: set[Path]
+    _loaders: dict[Path, FileLoader | FolderLoader]
+    _savers: dict[Path, FileSaver]
+    _load_progress: dict[Path, tuple[int, int, int]]
+    _progress_bar: QProgressBar
     _map_dock_widget: MapDockWidget
     _report_dock_widget: ReportDockWidget
 
     file_loaded = pyqtSignal(Path, dict)
+    # A reload replaced the data of an open file
+    file_reloaded = pyqtSignal(Path, dict)
     file_unloaded = pyqtSignal(Path)
+    file_tags_edited = pyqtSignal(Path, list)
 
     def __init__(self):
         super().__init__()
@@ -58,6 +69,9 @@ class MainWindow(QMainWindow):
         self.config = ConfigLoader().load()
 
         self.open_files = set()
+        self._loaders = {}
+        self._savers = {}
+        self._load_progress = {}
 
         self.ui = loadUi("gui/MainWindow.ui", self)
         assert self.ui
@@ -65,12 +79,18 @@ class MainWindow(QMainWindow):
         self.ui.action_Open.triggered.connect(self.menu_open)
         self.ui.action_Reopen.triggered.connect(self.menu_reopen)
         self.ui.actionOpen_folder.triggered.connect(self.menu_open_folder)
+        self.ui.action_CancelLoading.triggered.connect(self.menu_cancel_loading)
         self.ui.action_Save.triggered.connect(self.menu_save)
         self.ui.action_Close.triggered.connect(self.menu_close)
         self.ui.action_Exit.triggered.connect(QApplication.quit)
         self.ui.action_CaseSensitive.triggered.connect(self.menu_search_mode)
+        self.ui.action_Undo.triggered.connect(self.menu_undo)
+        self.ui.action_Redo.triggered.connect(self.menu_redo)
+        self.ui.menuUndo_history.aboutToShow.connect(self.menu_undo_history_show)
+        self.ui.action_BulkEdit.triggered.connect(self.menu_bulk_edit)
 
         self.ui.action_ShowMap.triggered.connect(self.show_map)
+        self.ui.action_ShowAllObjects.triggered.connect(self.menu_show_all_objects)
         self.ui.action_show_report.triggered.connect(self.show_report)
         self.ui.action_BoltChecker.triggered.connect(self.show_boltchecker)
 
@@ -80,11 +100,28 @@ class MainWindow(QMainWindow):
         tab_widget.tabCloseRequested.connect(self.tab_close_requested)
 
         self.ui.searchField.textChanged.connect(self.searchField_textChanged)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._apply_search)
+
+        self._progress_bar = QProgressBar()
+        self._progress_bar.setMaximumWidth(200)
+        self._progress_bar.setVisible(False)
+        self.ui.statusbar.addPermanentWidget(self._progress_bar)
 
         self._map_dock_widget = MapDockWidget(self)
+        self._map_dock_widget._map_widget.position_clicked.connect(
+            self.map_position_clicked
+        )
+        self._map_dock_widget._map_widget.nearby_tag_activated.connect(
+            self.ui.searchField.setText
+        )
         self._report_dock_widget = ReportDockWidget(self)
         self.file_loaded.connect(self._report_dock_widget.add_file_data)
+        self.file_reloaded.connect(self._report_dock_widget.reload_file_data)
         self.file_unloaded.connect(self._report_dock_widget.remove_file_data)
+        self.file_tags_edited.connect(self._report_dock_widget.update_file_data)
 
         if self.config.open_files:
             for file in self.config.open_files:
@@ -110,9 +147,7 @@ class MainWindow(QMainWindow):
         tab = self._current_tab()
         if tab is None:
             return
-        filename = tab.filename
-        file_data = self.open_file(filename, reload=True)
-        tab.reload(file_data)
+        self.open_file(tab.filename, reload=True)
 
     def menu_open_folder(self):
         """
@@ -122,49 +157,237 @@ class MainWindow(QMainWindow):
             self, "Open folder", str(self.config.open_file_dir)
         )
         if folder:
-            path = Path(folder)
-            txt_files = path.glob("*.txt")
-            for filename in txt_files:
-                self.open_file(filename)
+            path = Path(folder).resolve()
+            self.open_files_parallel(sorted(path.glob("*.txt")))
+
+    def menu_cancel_loading(self):
+        """
+        Slot that gets triggered by the "Cancel loading" menu item.
+        """
+        for loader in set(self._loaders.values()):
+            loader.cancel()
 
     def open_file(self, filename: Path, reload: bool = False):
+        """
+        Start loading a file in the background, the tab gets opened by file_load_finished.
+        """
         if filename in self.open_files and not reload:
             return
+        if filename in self._loaders:
+            return
 
         self.config.open_file_dir = str(filename.parent)
         ConfigLoader().save(self.config)
-        try:
-            with open(filename, "rb") as f:
-                reader = ES2Reader(f)
-                file_data = reader.read_all()
-        except Exception as e:
-            logger.exception("Failed to load file")
-            return self.show_error(e)
-
-        if not reload:
-            self.open_files.add(filename)
-            self._save_open_files_to_config()
-            self.open_new_tab(filename, file_data)
-            self.file_loaded.emit(filename, file_data)
-        return file_data
 
-    def open_new_tab(self, filename: Path, file_data: dict[str, ES2Field]):
+        tab = self._tab_by_filename(filename) if reload else None
+        if tab is not None:
+            loader = FileLoader(
+                filename,
+                reload=True,
+                previous_data=tab.unedited_data(),
+                previous_chunks=tab.raw_chunks,
+            )
+        else:
+            loader = FileLoader(filename, reload=reload)
+        loader.signals.progress.connect(self.file_load_progress)
+        loader.signals.loaded.connect(self.file_load_finished)
+        loader.signals.failed.connect(self.file_load_failed)
+        loader.signals.cancelled.connect(self._file_load_done)
+        self._loaders[filename] = loader
+        self._load_progress[filename] = (0, 0, 0)
+        self._update_load_progress()
+        QThreadPool.globalInstance().start(loader)
+
+    def open_files_parallel(self, filenames: list[Path]):
+        """
+        Load several files at once on a process pool, a tab is opened as each file finishes.
+        """
+        filenames = [
+            filename
+            for filename in filenames
+            if filename not in self.open_files and filename not in self._loaders
+        ]
+        if len(filenames) <= 1:
+            for filename in filenames:
+                self.open_file(filename)
+            return
+
+        self.config.open_file_dir = str(filenames[0].parent)
+        ConfigLoader().save(self.config)
+
+        loader = FolderLoader(filenames, self)
+        loader.loaded.connect(self.file_load_finished)
+        loader.failed.connect(self.file_load_failed)
+        loader.cancelled.connect(self._file_load_done)
+        for filename in filenames:
+            self._loaders[filename] = loader
+            self._load_progress[filename] = (0, filename.stat().st_size, 0)
+        self._update_load_progress()
+        loader.start()
+
+    def file_load_progress(
+        self, filename: Path, bytes_read: int, total_bytes: int, tags_read: int
+    ):
+        """
+        Slot that gets triggered by the progress signal of a FileLoader.
+        """
+        if filename not in self._load_progress:
+            return
+        self._load_progress[filename] = (bytes_read, total_bytes, tags_read)
+        self._update_load_progress()
+
+    def file_load_finished(self, loaded_file: LoadedFile):
+        """
+        Slot that gets triggered when a FileLoader has parsed a file.
+        """
+        filename = loaded_file.filename
+        self._file_load_done(filename)
+        if loaded_file.damaged_tags:
+            logger.warning(
+                "Could not read %d tags of '%s': %s",
+                len(loaded_file.damaged_tags),
+                filename,
+                ", ".join(loaded_file.damaged_tags),
+            )
+            self.ui.statusbar.showMessage(
+                f"{filename.name}: {len(loaded_file.damaged_tags)} damaged tag(s) "
+                "are kept unchanged and cannot be edited",
+                10000,
+            )
+        # Names resolved by a loader process are not in this process' cache yet.
+        tag_names.add_names(loaded_file.tag_names)
+        if loaded_file.reload:
+            tab = self._tab_by_filename(filename)
+            if tab is not None:
+                previous_data = tab.file_data
+                tab.reload(loaded_file.data, loaded_file.raw_chunks)
+                # Fields that did not change on disk are the same objects
+                self._update_objects(
+                    filename,
+                    [
+                        tag
+                        for tag in previous_data.keys() | loaded_file.data.keys()
+                        if previous_data.get(tag) is not loaded_file.data.get(tag)
+                    ],
+                )
+                self.file_reloaded.emit(filename, loaded_file.data)
+            return
+        if filename in self.open_files:
+            return
+        self.open_files.add(filename)
+        self._save_open_files_to_config()
+        recovered = self._recover_edits(filename, loaded_file.data)
+        self.open_new_tab(filename, loaded_file.data, loaded_file.raw_chunks)
+        if recovered:
+            tab = self._tab_by_filename(filename)
+            if tab is not None:
+                tab.edited_tags.update(recovered)
+                tab.history.mark_dirty()
+                tab.changed = True
+                tab.data_changed.emit(True)
+        self.file_loaded.emit(filename, loaded_file.data)
+
+    def _recover_edits(self, filename: Path, data: dict[str, ES2Field]) -> list[str]:
+        """
+        Offer to apply the unsaved edits of the last session, returns the edited tags.
+        """
+        journal = EditJournal(filename)
+        if not journal.exists():
+            return []
+        tags = {entry.tag for entry in journal.entries()}
+        if not tags:
+            journal.clear()
+            return []
+        answer = QMessageBox.question(
+            self,
+            "Recover edits",
+            f"{filename.name} has {len(tags)} unsaved edited tag(s) from the last "
+            "session. Recover them?",
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            journal.clear()
+            return []
+        result = journal.replay(data)
+        logger.info(
+            "Recovered edits of '%s', %d applied, %d unchanged, %d conflicts",
+            filename,
+            len(result.applied),
+            len(result.unchanged),
+            len(result.conflicts),
+        )
+        if result.conflicts:
+            QMessageBox.warning(
+                self,
+                "Recover edits",
+                f"{len(result.conflicts)} tag(s) changed on disk since they were "
+                "edited and were not recovered:\n" + "\n".join(result.conflicts[:20]),
+            )
+        if not result.applied:
+            journal.clear()
+        return result.applied
+
+    def file_load_failed(self, filename: Path, exception: Exception):
+        """
+        Slot that gets triggered when a FileLoader failed to parse a file.
+        """
+        self._file_load_done(filename)
+        self.show_error(exception)
+
+    def _file_load_done(self, filename: Path):
+        loader = self._loaders.pop(filename, None)
+        self._load_progress.pop(filename, None)
+        if isinstance(loader, FolderLoader) and all(
+            other is not loader for other in self._loaders.values()
+        ):
+            # Its last file is done, loaded, failed or cancelled
+            loader.deleteLater()
+        self._update_load_progress()
+
+    def _update_load_progress(self):
+        self.ui.action_CancelLoading.setEnabled(bool(self._loaders))
+        if not self._load_progress:
+            self._progress_bar.setVisible(False)
+            self.ui.statusbar.clearMessage()
+            return
+
+        bytes_read = sum(p[0] for p in self._load_progress.values())
+        total_bytes = sum(p[1] for p in self._load_progress.values())
+        tags_read = sum(p[2] for p in self._load_progress.values())
+        self._progress_bar.setVisible(True)
+        # QProgressBar works with ints, keep the range in KiB to avoid overflows.
+        self._progress_bar.setRange(0, max(total_bytes // 1024, 1))
+        self._progress_bar.setValue(bytes_read // 1024)
+        self.ui.statusbar.showMessage(
+            f"Loading {len(self._load_progress)} file(s): {tags_read} tags, "
+            f"{bytes_read // 1024}/{total_bytes // 1024} KiB"
+        )
+
+    def open_new_tab(
+        self,
+        filename: Path,
+        file_data: dict[str, ES2Field],
+        raw_chunks: dict[str, bytes] | None = None,
+    ):
         tab_widget = cast(QTabWidget, self.ui.tabWidget)
-        table_widget = TableWidget(filename=filename, data=file_data)
+        table_widget = TableWidget(
+            filename=filename, data=file_data, raw_chunks=raw_chunks
+        )
         index = tab_widget.addTab(table_widget, os.path.basename(filename))
         table_widget.data_changed.connect(
             partial(self.set_data_changed, filename=filename, tab_index=index)
         )
-        table_widget.datamodel.setFilterWildcard(self.ui.searchField.text())
-        table_widget.datamodel.setFilterCaseSensitivity(
-            Qt.CaseSensitivity.CaseSensitive
-            if self.ui.action_CaseSensitive.isChecked()
-            else Qt.CaseSensitivity.CaseInsensitive
+        table_widget.set_filter(
+            self.ui.searchField.text(),
+            self.ui.action_CaseSensitive.isChecked(),
+            apply=False,
         )
         table_widget.tags_selected_changed.connect(
             partial(self.tags_selected_changed, filename=filename, tab_index=index)
         )
+        table_widget.tags_edited.connect(partial(self.tags_edited, filename=filename))
+        table_widget.history_changed.connect(self._update_undo_actions)
         tab_widget.setCurrentIndex(index)
+        table_widget.apply_filter()
 
     def tags_selected_changed(
         self,
@@ -175,27 +398,44 @@ class MainWindow(QMainWindow):
         tab_index: int,
     ):
         logger.debug(
-            "Selection changed %s %s %s %d", selected, deselected, filename, tab_index
+            "Selection changed, %d selected %d deselected %s %d",
+            len(selected),
+            len(deselected),
+            filename,
+            tab_index,
         )
 
         if self._map_dock_widget:
-            for tag, item in selected.items():
-                if item.header.value_type == ES2ValueType.transform:
-                    self._map_dock_widget._map_widget.add_marker(tag, item.value)
-            for tag in deselected:
-                self._map_dock_widget._map_widget.remove_marker(tag)
+            map_widget = self._map_dock_widget._map_widget
+            map_widget.remove_markers(deselected)
+            map_widget.add_markers(
+                {
+                    tag: item.value
+                    for tag, item in selected.items()
+                    if item.header.value_type == ES2ValueType.transform
+                    and item.value is not None
+                }
+            )
+
+    def closeEvent(self, event):
+        self.menu_cancel_loading()
+        super().closeEvent(event)
 
     def current_tab_changed(self, index: int):
         """
         Slot that gets triggered when the tabWidget changed tabs.
         """
         tab = cast(TableWidget | None, self.ui.tabWidget.widget(index))
+        self._update_objects_layer()
         if tab:
-            self.ui.action_Save.setEnabled(tab.changed)
+            tab.apply_filter()
+            self._update_save_action()
+            self._update_undo_actions()
             self.ui.action_Close.setEnabled(True)
         else:
             self.ui.action_Save.setEnabled(False)
             self.ui.action_Close.setEnabled(False)
+            self._update_undo_actions()
 
     def tab_close_requested(self, index: int):
         """
@@ -203,6 +443,13 @@ class MainWindow(QMainWindow):
         """
         self._close_tab_by_index(index)
 
+    def tags_edited(self, tags: list[str], *, filename: Path):
+        """
+        Slot that gets triggered when values were edited in a TableWidget.
+        """
+        self.file_tags_edited.emit(filename, tags)
+        self._update_objects(filename, tags)
+
     def set_data_changed(self, changed: bool = True, *, filename: Path, tab_index: int):
         """
         Slot that gets triggered when the data_changed signal on a TableWidget gets triggered.
@@ -215,33 +462,155 @@ class MainWindow(QMainWindow):
 
     def menu_save(self):
         """
-        Slot that gets triggered by the "Save" menu item.
+        Slot that gets triggered by the "Save" menu item, saves on a worker thread.
         """
-        index = self._current_tab_index()
         tab = self._current_tab()
+        if tab is None or tab.filename in self._savers:
+            return
+        # Edits replace the value of a field, a copy of the fields is a snapshot.
+        snapshot = {
+            tag: ES2Field(field.header, field.value)
+            for tag, field in tab.file_data.items()
+        }
+        saver = FileSaver(
+            tab.filename,
+            snapshot,
+            tab.data_version,
+            tab.history.state(),
+            RetentionPolicy(
+                self.config.backup_versions, self.config.backup_max_age_days
+            ),
+        )
+        saver.signals.progress.connect(self.file_save_progress)
+        saver.signals.saved.connect(self.file_save_finished)
+        saver.signals.failed.connect(self.file_save_failed)
+        self._savers[tab.filename] = saver
+        self.ui.action_Save.setEnabled(False)
+        self.ui.statusbar.showMessage(f"Saving {tab.filename.name}")
+        QThreadPool.globalInstance().start(saver)
+
+    def file_save_progress(self, filename: Path, tags_written: int, total_tags: int):
+        """
+        Slot that gets triggered by the progress signal of a FileSaver.
+        """
+        if self._load_progress:
+            return  # the progress bar shows the loading files
+        self._progress_bar.setVisible(True)
+        self._progress_bar.setRange(0, max(total_tags, 1))
+        self._progress_bar.setValue(tags_written)
+        self.ui.statusbar.showMessage(
+            f"Saving {filename.name}: {tags_written}/{total_tags} tags"
+        )
+
+    def file_save_finished(self, result: SaveResult):
+        """
+        Slot that gets triggered when a FileSaver has written and verified a file.
+        """
+        saver = self._savers.pop(result.filename)
+        self._update_load_progress()
+        self.ui.statusbar.showMessage(f"Saved {result.filename.name}", 5000)
+        tab = self._tab_by_filename(result.filename)
         if tab is None:
             return
-        assert tab.filename
-        assert tab.file_data
-        for i in range(100):
-            backup_filename = tab.filename.with_suffix(f"{tab.filename.suffix}.{i}")
-            if not backup_filename.exists():
-                _copy_file(tab.filename, backup_filename)
-                break
-        else:
-            raise Exception("Too many backups!")
+        tab.raw_chunks = result.raw_chunks
+        if tab.data_version != saver.data_version:
+            # Edited while saving, the new edits are not saved yet but undoing them
+            # gets back to the saved state.
+            tab.history.mark_clean(saver.history_state)
+            self._update_save_action()
+            return
+        tab.edited_tags.clear()
+        tab.journal.clear()
+        tab.history.mark_clean()
+        tab.changed = False
+        tab_widget = cast(QTabWidget, self.ui.tabWidget)
+        self.set_data_changed(
+            False, filename=tab.filename, tab_index=tab_widget.indexOf(tab)
+        )
+        self._update_save_action()
 
-        with tempfile.NamedTemporaryFile("wb", delete_on_close=False) as f:
-            writer = ES2Writer(f.file)
-            for k, v in tab.file_data.items():
-                writer.save(k, v)
-            writer.save_all()
+    def file_save_failed(self, filename: Path, exception: Exception):
+        """
+        Slot that gets triggered when a FileSaver failed, the file was not changed.
+        """
+        self._savers.pop(filename, None)
+        self._update_load_progress()
+        self._update_save_action()
+        self.show_error(exception)
 
-            f.close()
+    def _update_save_action(self):
+        tab = self._current_tab()
+        self.ui.action_Save.setEnabled(
+            tab is not None and tab.changed and tab.filename not in self._savers
+        )
 
-            _copy_file(f.name, tab.filename)
+    def menu_undo(self, checked: bool = False, *, count: int = 1):
+        """
+        Slot that gets triggered by the "Undo" menu item and the undo history menu.
+        """
+        tab = self._current_tab()
+        if tab is not None:
+            tab.undo(count)
 
-        self.set_data_changed(False, filename=tab.filename, tab_index=index)
+    def menu_redo(self):
+        """
+        Slot that gets triggered by the "Redo" menu item.
+        """
+        tab = self._current_tab()
+        if tab is not None:
+            tab.redo()
+
+    def menu_undo_history_show(self):
+        """
+        Slot that gets triggered when the undo history menu is about to show, lists
+        the most recent steps, choosing one undoes it and all steps after it.
+        """
+        menu = self.ui.menuUndo_history
+        menu.clear()
+        tab = self._current_tab()
+        if tab is None:
+            return
+        steps = tab.history.undo_steps()[:UNDO_HISTORY_COUNT]
+        for count, step in enumerate(steps, 1):
+            action = menu.addAction(step.description.replace("&", "&&"))
+            action.triggered.connect(partial(self.menu_undo, count=count))
+
+    def menu_bulk_edit(self):
+        """
+        Slot that gets triggered by the "Bulk edit" menu item, starts with the search
+        query when there is one.
+        """
+        tab = self._current_tab()
+        if tab is None:
+            return
+        search = self.ui.searchField.text()
+        dialog = BulkEditDialog(
+            tab.file_data,
+            tab.value_index(),
+            search if is_query(search) else "",
+            self,
+        )
+        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.values:
+            tab.set_values(dialog.values, f"Bulk edit {dialog.query()}")
+
+    def _update_undo_actions(self):
+        tab = self._current_tab()
+        undo_steps = tab.history.undo_steps() if tab else []
+        redo_steps = tab.history.redo_steps() if tab else []
+        self.ui.action_Undo.setEnabled(bool(undo_steps))
+        self.ui.action_Redo.setEnabled(bool(redo_steps))
+        self.ui.action_BulkEdit.setEnabled(tab is not None)
+        self.ui.menuUndo_history.setEnabled(bool(undo_steps))
+        self.ui.action_Undo.setText(
+            f"&Undo {undo_steps[0].description.replace('&', '&&')}"
+            if undo_steps
+            else "&Undo"
+        )
+        self.ui.action_Redo.setText(
+            f"&Redo {redo_steps[0].description.replace('&', '&&')}"
+            if redo_steps
+            else "&Redo"
+        )
 
     def menu_close(self):
         """
@@ -254,6 +623,8 @@ class MainWindow(QMainWindow):
         tab_widget = cast(QTabWidget, self.ui.tabWidget)
         tab = cast(TableWidget | None, tab_widget.widget(index))
         if tab:
+            # Kept, the edits are offered again when the file is opened.
+            tab.journal.close()
             self.open_files.remove(tab.filename)
             self.file_unloaded.emit(tab.filename)
             self._save_open_files_to_config()
@@ -263,19 +634,24 @@ class MainWindow(QMainWindow):
         """
         Slot that gets triggered by the action_CaseSensitivity action in the menuSearch_mode menu item.
         """
-        for tab in self._all_tabs():
-            tab.datamodel.setFilterCaseSensitivity(
-                Qt.CaseSensitivity.CaseSensitive
-                if action
-                else Qt.CaseSensitivity.CaseInsensitive
-            )
+        self._apply_search()
 
     def searchField_textChanged(self, text: str):
         """
         Slot that gets triggered by the textChanged signal of searchField.
         """
+        self._search_timer.start()
+
+    def _apply_search(self):
+        """
+        Filter the visible tab, the other tabs get filtered when they are shown.
+        """
+        self._search_timer.stop()
+        text = self.ui.searchField.text()
+        case_sensitive = self.ui.action_CaseSensitive.isChecked()
+        current_tab = self._current_tab()
         for tab in self._all_tabs():
-            tab.datamodel.setFilterWildcard(text)
+            tab.set_filter(text, case_sensitive, apply=tab is current_tab)
 
     def show_map(self):
         """
@@ -285,6 +661,57 @@ class MainWindow(QMainWindow):
         self._map_dock_widget.setFloating(False)
         self._map_dock_widget.show()
 
+    def menu_show_all_objects(self, checked: bool):
+        """
+        Slot that gets triggered by the "Show all objects on map" menu item.
+        """
+        if checked:
+            self.show_map()
+        self._update_objects_layer()
+
+    def _update_objects_layer(self):
+        tab = self._current_tab()
+        if not self.ui.action_ShowAllObjects.isChecked() or tab is None:
+            self._map_dock_widget._map_widget.set_objects(None)
+            return
+        self._map_dock_widget._map_widget.set_objects(
+            {
+                tag: field.value
+                for tag, field in tab.file_data.items()
+                if _is_object(field)
+            }
+        )
+
+    def _update_objects(self, filename: Path, tags: Iterable[str]):
+        """
+        Update the changed tags of the current tab on the objects layer, instead of
+        building the layer again.
+        """
+        tab = self._current_tab()
+        if (
+            not self.ui.action_ShowAllObjects.isChecked()
+            or tab is None
+            or tab.filename != filename
+        ):
+            return
+        objects = {}
+        for tag in tags:
+            field = tab.file_data.get(tag)
+            objects[tag] = field.value if field and _is_object(field) else None
+        self._map_dock_widget._map_widget.update_objects(objects)
+
+    def map_position_clicked(self, x: float, z: float):
+        """
+        Slot that gets triggered by a click on the map, lists the nearest objects.
+        """
+        tab = self._current_tab()
+        if tab is None:
+            self._map_dock_widget._map_widget.show_nearby(None)
+            return
+        self._map_dock_widget._map_widget.show_nearby(
+            tab.transforms.nearest(x, z, NEARBY_COUNT)
+        )
+
     def show_report(self):
         self.addDockWidget(
             Qt.DockWidgetArea.RightDockWidgetArea, self._report_dock_widget
@@ -298,7 +725,7 @@ class MainWindow(QMainWindow):
         """
         tab = self._current_tab()
         if tab:
-            dialog = BoltCheckerDialog(tab.file_data, self)
+            dialog = BoltCheckerDialog(tab.bolt_checker(), self)
             dialog.exec()
 
     def show_error(self, exception: Exception):
@@ -332,6 +759,26 @@ class MainWindow(QMainWindow):
             tabs.append(tab_widget.widget(index))
         return tabs
 
+    def _tab_by_filename(self, filename: Path) -> TableWidget | None:
+        """
+        Helper to get the TableWidget that has filename open, or None.
+        """
+        for tab in self._all_tabs():
+            if tab.filename == filename:
+                return tab
+        return None
+
     def _save_open_files_to_config(self):
         self.config.open_files = [str(f) for f in self.open_files]
         ConfigLoader().save(self.config)
+
+
+def _is_object(field: ES2Field) -> bool:
+    """
+    A field that is shown on the objects layer of the map.
+    """
+    return (
+        field.header.collection_type == ES2Key.Null
+        and field.header.value_type == ES2ValueType.transform
+        and field.value is not None
+    )
@@ -1,5 +1,259 @@
+import argparse
+import csv
+from datetime import datetime
+from pathlib import Path
 import sys
+
+from .audit import AUDIT_COLUMNS, audit_files, find_saves
+from .backups import BackupError, BackupStore
+from .bulk import BulkEditError, bulk_edit
+from .es2.fsck import check_files
+from .es2.reader import read_file
 from .mscfile import MSCFile
+from .query import QueryError, ValueIndex
+from .report import PartsMatcher
+from .save import save_file
+from .spatial import TransformIndex
+
+
+def command_query(args: argparse.Namespace) -> int:
+    for filename in args.files:
+        data = read_file(filename)
+        try:
+            tags = ValueIndex(data).query(args.query)
+        except QueryError as e:
+            print(e, file=sys.stderr)
+            return 1
+        for tag in sorted(tags):
+            print(f"{filename}\t{tag}\t{data[tag].value}")
+    return 0
+
+
+def command_audit(args: argparse.Namespace) -> int:
+    from ruamel.yaml import YAML
+
+    with open(args.parts) as f:
+        parts_yaml = YAML().load(f)
+
+    writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+    writer.writerow(AUDIT_COLUMNS)
+    for row in audit_files(
+        find_saves(args.paths),
+        PartsMatcher(parts_yaml["parts"]),
+        dict(parts_yaml["vin"]),
+        args.jobs,
+    ):
+        if args.problems and not row.problem:
+            continue
+        writer.writerow(row.to_list())
+    return 0
+
+
+def command_near(args: argparse.Namespace) -> int:
+    data = read_file(args.file)
+    index = TransformIndex(data)
+    if args.bbox:
+        x0, z0, x1, z1 = args.bbox
+        rect = min(x0, x1), min(z0, z1), max(x0, x1), max(z0, z1)
+        for tag, x, z in sorted(index.query_rect(*rect)):
+            print(f"{tag}\t\t{x}\t{z}")
+        return 0
+
+    if args.tag:
+        if args.tag not in index:
+            print(f"No transform '{args.tag}'", file=sys.stderr)
+            return 1
+        x, z = index.points[args.tag]
+    elif args.at:
+        x, z = args.at
+    else:
+        print("Supply --tag, --at or --bbox", file=sys.stderr)
+        return 1
+
+    if args.radius is not None:
+        nearby = index.within_radius(x, z, args.radius)
+    else:
+        # One more, the tag itself is the nearest
+        nearby = index.nearest(x, z, args.count + bool(args.tag))
+    nearby = [(tag, distance) for tag, distance in nearby if tag != args.tag]
+    for tag, distance in nearby[: args.count if args.radius is None else None]:
+        px, pz = index.points[tag]
+        print(f"{tag}\t{distance:.2f}\t{px}\t{pz}")
+    return 0
+
+
+def command_backups(args: argparse.Namespace) -> int:
+    store = BackupStore(Path(args.file))
+    if args.restore is None:
+        print("version\ttime\tsize\ttags\tchanged")
+        for version in store.versions:
+            time = datetime.fromtimestamp(version.time).isoformat(" ", "seconds")
+            print(
+                f"{version.number}\t{time}\t{version.size}\t{version.tags}\t"
+                f"{version.changed}"
+            )
+        return 0
+    try:
+        target = store.restore(args.restore, Path(args.output) if args.output else None)
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Restored version {args.restore} to {target}")
+    return 0
+
+
+def command_bulk(args: argparse.Namespace) -> int:
+    # Damaged tags are written back unchanged
+    data = read_file(args.file, tolerant=True)
+    try:
+        values = bulk_edit(data, args.query, args.expression)
+    except (QueryError, BulkEditError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    for tag, value in values.items():
+        print(f"{tag}\t{data[tag].value}\t{value}")
+    if args.dry_run or not values:
+        return 0
+    for tag, value in values.items():
+        data[tag].value = value
+    result = save_file(Path(args.file), data)
+    print(f"Changed {len(values)} tags")
+    if result.backup is not None:
+        print(f"Backup version {result.backup.number}")
+    return 0
+
+
+def command_fsck(args: argparse.Namespace) -> int:
+    files = broken = 0
+    for result in check_files(find_saves(args.paths), args.jobs):
+        files += 1
+        broken += not result.ok
+        for problem in result.problems:
+            print(
+                f"{result.filename}\t{problem.offset}\t{problem.tag or ''}\t"
+                f"{problem.message}"
+            )
+        if args.verbose and result.ok:
+            print(f"{result.filename}\tOK, {result.tags} tags", file=sys.stderr)
+    print(f"{files} files checked, {broken} with problems", file=sys.stderr)
+    return 1 if broken else 0
+
+
+def _coordinates(text: str) -> list[float]:
+    try:
+        return [float(value) for value in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid coordinates '{text}'")
+
+
+def _point(text: str) -> list[float]:
+    point = _coordinates(text)
+    if len(point) != 2:
+        raise argparse.ArgumentTypeError(f"expected X,Z, got '{text}'")
+    return point
+
+
+def _bbox(text: str) -> list[float]:
+    bbox = _coordinates(text)
+    if len(bbox) != 4:
+        raise argparse.ArgumentTypeError(f"expected X0,Z0,X1,Z1, got '{text}'")
+    return bbox
+
+
+COMMANDS = ["query", "audit", "near", "backups", "bulk", "fsck"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m msc")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser(
+        "query", help="Find tags by value, e.g. 'type:float value<10 tag:*WEA'"
+    )
+    query.add_argument("query")
+    query.add_argument("files", nargs="+")
+    query.set_defaults(func=command_query)
+
+    audit = commands.add_parser(
+        "audit",
+        help="Check the bolts and the condition of the parts of saves, prints a tab "
+        "separated table",
+    )
+    audit.add_argument("paths", nargs="+", help="save files or directories with saves")
+    audit.add_argument(
+        "--problems", action="store_true", help="only print rows with a problem"
+    )
+    audit.add_argument(
+        "--parts", default="gui/vin.yaml", help="yaml file with the parts to report"
+    )
+    audit.add_argument("-j", "--jobs", type=int, help="number of worker processes")
+    audit.set_defaults(func=command_audit)
+
+    near = commands.add_parser(
+        "near",
+        help="Find the transforms near a tag or a position, prints a tab separated "
+        "table of tag, distance, x and z",
+    )
+    near.add_argument("file")
+    position = near.add_mutually_exclusive_group()
+    position.add_argument("--tag", help="search around the position of this tag")
+    position.add_argument("--at", type=_point, metavar="X,Z", help="game position")
+    near.add_argument(
+        "-n", "--count", type=int, default=10, help="number of transforms to print"
+    )
+    near.add_argument(
+        "-r", "--radius", type=float, help="all transforms within this distance"
+    )
+    near.add_argument(
+        "--bbox",
+        type=_bbox,
+        metavar="X0,Z0,X1,Z1",
+        help="all transforms inside this rectangle, without distances",
+    )
+    near.set_defaults(func=command_near)
+
+    backups = commands.add_parser(
+        "backups", help="List the backup versions of a save, or restore one"
+    )
+    backups.add_argument("file")
+    backups.add_argument(
+        "--restore", type=int, metavar="VERSION", help="version to restore"
+    )
+    backups.add_argument(
+        "-o",
+        "--output",
+        help="write the restored version here instead of over the save, which "
+        "is backed up first",
+    )
+    backups.set_defaults(func=command_backups)
+
+    bulk = commands.add_parser(
+        "bulk",
+        help="Set the value of every scalar tag matching a query to an expression of "
+        "value and tag, e.g. 'tag:*WEA type:float' '100'. Prints tag, old and new "
+        "value and saves with a backup",
+    )
+    bulk.add_argument("file")
+    bulk.add_argument("query")
+    bulk.add_argument("expression")
+    bulk.add_argument(
+        "-n", "--dry-run", action="store_true", help="only print the changes"
+    )
+    bulk.set_defaults(func=command_bulk)
+
+    fsck = commands.add_parser(
+        "fsck",
+        help="Check the structure of saves without decoding them, prints a tab "
+        "separated table of file, offset, tag and problem",
+    )
+    fsck.add_argument("paths", nargs="+", help="save files or directories with saves")
+    fsck.add_argument("-j", "--jobs", type=int, help="number of worker processes")
+    fsck.add_argument(
+        "-v", "--verbose", action="store_true", help="also list the files that are OK"
+    )
+    fsck.set_defaults(func=command_fsck)
+
+    return parser
 
 
 if __name__ == "__main__":
@@ -9,4 +263,9 @@ if __name__ == "__main__":
         print("Supply filename!")
         sys.exit(1)
 
-    MSCFile(sys.argv[1])
+    if sys.argv[1] not in COMMANDS and not sys.argv[1].startswith("-"):
+        MSCFile(sys.argv[1])
+        sys.exit(0)
+
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
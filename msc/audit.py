@@ -0,0 +1,156 @@
+"""
+Audit the bolts and the condition of the parts of many saves at once.
+
+Only the tags the checks need are decoded, the other chunks are skipped. Files are
+audited in parallel on a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+import logging
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .bolts import BOLT_SUFFIXES, BoltChecker
+from .es2.reader import read_file
+from .report import CarReport, PartsMatcher
+
+logger = logging.getLogger(__name__)
+
+# Condition scores below this are reported as a problem, like the red rows of the
+# car report.
+WORN_SCORE = 25
+
+AUDIT_COLUMNS = ["file", "check", "part", "name", "item", "value", "score", "problem"]
+
+
+@dataclass
+class AuditRow:
+    file: str
+    check: str  # "bolts", "condition" or "error"
+    part: str
+    name: str
+    item: str
+    value: Any
+    score: float | None
+    # Empty when there is nothing wrong
+    problem: str
+
+    def to_list(self) -> list:
+        return [getattr(self, column) for column in AUDIT_COLUMNS]
+
+
+def audit_suffixes(matcher: PartsMatcher) -> tuple[str, ...]:
+    """
+    Suffixes of all tags the checks read.
+    """
+    suffixes = set(BOLT_SUFFIXES) | {"AID", "WEA"}
+    for rule in matcher.rules:
+        suffixes.update(rule.values.keys())
+    return tuple(sorted(suffixes))
+
+
+def audit_file(
+    filename: str | os.PathLike,
+    matcher: PartsMatcher,
+    vin_data: dict[str, str] | None = None,
+) -> list[AuditRow]:
+    """
+    Check the bolts and the condition of the parts of a single save.
+
+    vin_data maps VIN numbers to part names, like the `vin` section of gui/vin.yaml.
+    A tag that cannot be decoded gets a row with check "error" and is not checked.
+    """
+    data = read_file(filename, audit_suffixes(matcher), tolerant=True)
+    file = str(filename)
+    rows = [
+        AuditRow(file, "error", "", "", tag, "", None, field.value.error)
+        for tag, field in data.items()
+        if field.is_raw
+    ]
+
+    for part in BoltChecker(data).parts:
+        if not part.installed:
+            continue
+        rows.append(
+            AuditRow(
+                file,
+                "bolts",
+                part.name,
+                part.name,
+                "bolts",
+                f"{part.tight_bolts}/{len(part.bolt_values)}",
+                None,
+                ", ".join(part.problems()),
+            )
+        )
+
+    report = CarReport(data, matcher, partial(_part_name, vin_data=vin_data or {}))
+    for row in report.rows:
+        worn = row.score is not None and row.score < WORN_SCORE
+        rows.append(
+            AuditRow(
+                file,
+                "condition",
+                row.part,
+                row.name,
+                row.key,
+                row.value,
+                row.score,
+                "worn" if worn else "",
+            )
+        )
+    return rows
+
+
+def audit_files(
+    filenames: Iterable[str | os.PathLike],
+    matcher: PartsMatcher,
+    vin_data: dict[str, str] | None = None,
+    max_workers: int | None = None,
+) -> Iterator[AuditRow]:
+    """
+    Audit many saves in parallel, yields the rows of every file in the given order.
+
+    A file that fails to read gets a single row with check "error".
+    """
+    filenames = list(filenames)
+    if not filenames:
+        return
+    with ProcessPoolExecutor(
+        max_workers=min(len(filenames), max_workers or os.cpu_count() or 1)
+    ) as executor:
+        task = partial(_audit_file_or_error, matcher=matcher, vin_data=vin_data)
+        for rows in executor.map(task, filenames):
+            yield from rows
+
+
+def _audit_file_or_error(
+    filename: str | os.PathLike, matcher: PartsMatcher, vin_data: dict[str, str] | None
+) -> list[AuditRow]:
+    try:
+        return audit_file(filename, matcher, vin_data)
+    except Exception as e:
+        logger.exception("Failed to audit '%s'", filename)
+        return [AuditRow(str(filename), "error", "", "", "", "", None, str(e))]
+
+
+def _part_name(part_prefix: str, vin_data: dict[str, str]) -> str:
+    if part_prefix[:3].lower() == "vin":
+        return vin_data.get(part_prefix[3:6], part_prefix)
+    return part_prefix
+
+
+def find_saves(paths: Iterable[str | os.PathLike]) -> list[Path]:
+    """
+    The files to audit, directories are searched for `*.txt` saves.
+    """
+    filenames = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            filenames.extend(sorted(path.glob("*.txt")))
+        else:
+            filenames.append(path)
+    return filenames
@@ -0,0 +1,309 @@
+"""
+Backups of a save file as one base snapshot plus a delta per later version.
+
+A version is the list of tags of the file with the raw bytes of their chunks, see
+ES2Reader.iter_raw. A delta only holds the chunks that differ from the version
+before it, plus the list of tags when tags were added, removed or moved. The base
+holds all chunks of the oldest kept version. Both are stored in the same compressed
+record format, the base is a delta against an empty file.
+
+The backups of `{name}` live in the directory `{name}.backups`:
+
+- `index.json`, the kept versions and the number of the base version
+- `base-{number}.bin`, the base snapshot
+- `delta-{number}.bin`, the deltas of the later versions
+
+Every file is written to a temporary file first and moved into place, the index is
+updated last so an interrupted write never leaves a version that cannot be read.
+"""
+
+from dataclasses import asdict, dataclass
+from io import BytesIO
+import json
+import logging
+import os
+from pathlib import Path
+import struct
+import tempfile
+import time
+import zlib
+
+from .es2.reader import ES2Reader
+from .es2.writer import ES2Writer
+
+logger = logging.getLogger(__name__)
+
+# Start of every record file, followed by the zlib compressed records.
+RECORD_MAGIC = b"MSCBAK1\n"
+
+# Tag count of a delta with the same tags as the version before it.
+SAME_TAGS = 0xFFFFFFFF
+
+# Raw chunks of a file by tag, in the order of the file.
+Chunks = dict[str, bytes]
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Which versions to keep, the newest version is always kept.
+    """
+
+    max_versions: int = 50
+    # Versions older than this many days are removed, None keeps them.
+    max_age_days: float | None = None
+
+
+@dataclass
+class BackupVersion:
+    number: int
+    # Seconds since the epoch
+    time: float
+    size: int
+    tags: int
+    # Chunks stored in the delta, or in the base for the base version
+    changed: int
+
+
+def encode_records(tags: list[str] | None, chunks: Chunks) -> bytes:
+    """
+    The tags of a version in order, with the chunks for the tags in chunks.
+
+    When tags is None the version has the same tags as the version before it and
+    only the chunks are stored.
+    """
+    stream = BytesIO()
+    if tags is None:
+        stream.write(struct.pack("<I", SAME_TAGS))
+        tags = list(chunks)
+    stream.write(struct.pack("<I", len(tags)))
+    for tag in tags:
+        name = tag.encode("utf8")
+        chunk = chunks.get(tag)
+        stream.write(struct.pack("<HB", len(name), chunk is not None))
+        stream.write(name)
+        if chunk is not None:
+            stream.write(struct.pack("<I", len(chunk)))
+            stream.write(chunk)
+    return RECORD_MAGIC + zlib.compress(stream.getvalue())
+
+
+def decode_records(data: bytes) -> tuple[list[str] | None, Chunks]:
+    if not data.startswith(RECORD_MAGIC):
+        raise BackupError("Not a backup record file")
+    buffer = memoryview(zlib.decompress(data[len(RECORD_MAGIC) :]))
+    (count,) = struct.unpack_from("<I", buffer)
+    position = 4
+    same_tags = count == SAME_TAGS
+    if same_tags:
+        (count,) = struct.unpack_from("<I", buffer, position)
+        position += 4
+    tags = []
+    chunks = {}
+    for _ in range(count):
+        name_length, has_chunk = struct.unpack_from("<HB", buffer, position)
+        position += 3
+        tag = bytes(buffer[position : position + name_length]).decode("utf8")
+        position += name_length
+        tags.append(tag)
+        if has_chunk:
+            (length,) = struct.unpack_from("<I", buffer, position)
+            position += 4
+            chunks[tag] = bytes(buffer[position : position + length])
+            position += length
+    return None if same_tags else tags, chunks
+
+
+def file_chunks(data: bytes) -> Chunks:
+    return dict(ES2Reader(BytesIO(data)).iter_raw())
+
+
+def chunks_to_bytes(chunks: Chunks) -> bytes:
+    """
+    The content of a file with the given chunks.
+    """
+    stream = BytesIO()
+    writer = ES2Writer(stream)
+    for tag, chunk in chunks.items():
+        writer.write_chunk(tag, chunk)
+    return stream.getvalue()
+
+
+def _write_atomic(filename: Path, data: bytes):
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{filename.name}.", suffix=".tmp", dir=filename.parent
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, filename)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class BackupStore:
+    """
+    The delta backups of a single save file.
+    """
+
+    filename: Path
+    directory: Path
+    policy: RetentionPolicy
+    versions: list[BackupVersion]
+    base: int | None
+
+    def __init__(self, filename: Path, policy: RetentionPolicy | None = None):
+        self.filename = filename
+        self.directory = filename.with_name(f"{filename.name}.backups")
+        self.policy = policy or RetentionPolicy()
+        self.versions = []
+        self.base = None
+        self._load_index()
+
+    def _load_index(self):
+        index_path = self.directory / "index.json"
+        if not index_path.exists():
+            return
+        with index_path.open() as f:
+            index = json.load(f)
+        self.base = index["base"]
+        self.versions = [BackupVersion(**version) for version in index["versions"]]
+
+    def _save_index(self):
+        index = {
+            "base": self.base,
+            "versions": [asdict(version) for version in self.versions],
+        }
+        _write_atomic(self.directory / "index.json", json.dumps(index).encode())
+
+    def _base_path(self, number: int) -> Path:
+        return self.directory / f"base-{number}.bin"
+
+    def _delta_path(self, number: int) -> Path:
+        return self.directory / f"delta-{number}.bin"
+
+    def version(self, number: int) -> BackupVersion:
+        for version in self.versions:
+            if version.number == number:
+                return version
+        raise BackupError(f"No backup version {number} of '{self.filename}'")
+
+    def read_version(self, number: int) -> Chunks:
+        """
+        The chunks of a version, rebuilt from the base and the deltas up to it.
+        """
+        self.version(number)
+        assert self.base is not None
+        _, chunks = decode_records(self._base_path(self.base).read_bytes())
+        for version in self.versions:
+            if version.number == self.base:
+                continue
+            if version.number > number:
+                break
+            tags, changed = decode_records(
+                self._delta_path(version.number).read_bytes()
+            )
+            if tags is None:
+                chunks = chunks | changed
+            else:
+                chunks = {
+                    tag: changed[tag] if tag in changed else chunks[tag]
+                    for tag in tags
+                }
+        return chunks
+
+    def add(self, data: bytes, timestamp: float | None = None) -> BackupVersion:
+        """
+        Add the content of the file as the newest version, then apply the policy.
+        """
+        chunks = file_chunks(data)
+        self.directory.mkdir(exist_ok=True)
+        number = self.versions[-1].number + 1 if self.versions else 0
+        tags: list[str] | None = list(chunks)
+        if self.base is None:
+            changed = chunks
+            path = self._base_path(number)
+            self.base = number
+        else:
+            previous = self.read_version(self.versions[-1].number)
+            changed = {
+                tag: chunk
+                for tag, chunk in chunks.items()
+                if previous.get(tag) != chunk
+            }
+            if tags == list(previous):
+                tags = None
+            path = self._delta_path(number)
+        _write_atomic(path, encode_records(tags, changed))
+        version = BackupVersion(
+            number,
+            time.time() if timestamp is None else timestamp,
+            len(data),
+            len(chunks),
+            len(changed),
+        )
+        self.versions.append(version)
+        self._save_index()
+        self.prune()
+        logger.info(
+            "Backup %d of '%s', %d of %d tags changed",
+            number,
+            self.filename,
+            len(changed),
+            len(chunks),
+        )
+        return version
+
+    def prune(self, now: float | None = None):
+        """
+        Remove the versions the policy does not keep, by folding the oldest deltas
+        into the base.
+        """
+        now = time.time() if now is None else now
+        keep = self.versions[-max(self.policy.max_versions, 1) :]
+        if self.policy.max_age_days is not None:
+            oldest = now - self.policy.max_age_days * 24 * 60 * 60
+            keep = [version for version in keep[:-1] if version.time >= oldest]
+            keep.append(self.versions[-1])
+        if len(keep) == len(self.versions):
+            return
+
+        old_base = self.base
+        removed = self.versions[: len(self.versions) - len(keep)]
+        new_base = keep[0].number
+        chunks = self.read_version(new_base)
+        _write_atomic(self._base_path(new_base), encode_records(list(chunks), chunks))
+        self.base = new_base
+        self.versions = keep
+        keep[0].changed = len(chunks)
+        self._save_index()
+
+        assert old_base is not None
+        self._base_path(old_base).unlink(missing_ok=True)
+        for version in removed:
+            self._delta_path(version.number).unlink(missing_ok=True)
+        self._delta_path(new_base).unlink(missing_ok=True)
+
+    def restore(self, number: int, target: Path | None = None) -> Path:
+        """
+        Write a version to target, the save file itself by default.
+
+        When restoring over the save file, its current content is added as a new
+        version first.
+        """
+        target = target or self.filename
+        data = chunks_to_bytes(self.read_version(number))
+        if target == self.filename and target.exists():
+            self.add(target.read_bytes())
+        _write_atomic(target, data)
+        return target
@@ -0,0 +1,252 @@
+"""
+Finds the boltable parts of a save and checks whether their bolts are tightened.
+
+A boltable part is a `{part}Bolts` tag with matching `Bolted`, `Tightness` and
+`Installed` tags. Those tags often use another name for the part, like `Valvecover`
+and `rocker coverBolted`, see alternate_names.
+"""
+
+from dataclasses import dataclass
+from functools import cache
+import re
+from typing import Any, Iterable
+
+from .es2.types import ES2Field
+
+BOLT_SUFFIXES = ("Bolted", "Bolts", "Tightness", "Installed")
+
+# Value of a bolt that is tightened all the way.
+BOLT_TIGHT = 8
+
+ALTERNATE_NAMES: dict[str, list[str]] = {
+    # engine bay parts
+    "Valvecover": ["rocker cover"],
+    "ValvecoverGT": ["rocker cover gt"],
+    "Crankwheel": ["crankshaft pulley"],
+    "WiringBatteryPlus": ["battery_terminal_plus"],
+    "WiringBatteryMinus": ["battery_terminal_minus"],
+    # interior parts
+    "SteeringWheel": ["stock steering wheel"],
+    "SportWheel": ["sport steering wheel"],
+    "Rally Wheel": ["rally steering wheel"],
+    "SteeringWheelGT": ["gt steering wheel"],
+    "Extinguisher Holder": ["fire extinguisher holder"],
+}
+
+_bolt_value_regex = re.compile(r"^int\((-?\d+)\)$")
+
+
+@cache
+def alternate_names(part: str) -> tuple[str, ...]:
+    """
+    All names the tags of a part can use, lowercase, the part itself first.
+    """
+    part_names: list[str] = list(ALTERNATE_NAMES.get(part, []))
+    if not part_names:
+        if part.startswith("Gauge"):
+            part_names = [f"{part[5:]} {part[:5]}"]
+        elif part.startswith("CrankBearing"):
+            part_names = [f"main bearing{part[-1]}"]
+        elif part.startswith("Sparkplug"):
+            part_names = [f"spark plug(clone){part[-1]}"]
+        elif part.startswith("Shock_"):
+            position = part.split("_")[1].lower()
+            if position in ["rl", "rr"]:
+                part_names = [f"shock absorber({position}xxx)"]
+            else:
+                part_names = [f"strut {position}(xxxxx)"]
+        elif part.startswith("Discbrake"):
+            position = part.split("_")[1].lower()
+            part_names = [f"discbrake({position}xxx)"]
+        elif part.startswith("Wishbone"):
+            part_names = [f"IK_{part}"]
+        elif part.startswith("Headlight"):
+            position = re.sub(r"^headlight(.+)[12]$", r"\1", part.lower())
+            part_names = [f"headlight {position}"]
+
+    part_names.insert(0, part)
+    suffixes = ["(clone)", "(xxxxx)"]
+    for suffix in suffixes:
+        for name in part_names[:]:
+            if suffix in name.lower():
+                continue
+            part_names.append(f"{name}{suffix}")
+            if "_" in name or " " in name:
+                part_names.append(f"{_normalize(name)}{suffix}")
+
+    return tuple(name.lower() for name in part_names)
+
+
+def _normalize(name: str) -> str:
+    return name.replace("_", "").replace(" ", "")
+
+
+class BoltIndex:
+    """
+    The tags with a bolt suffix by lowercase part name, one dict per suffix.
+
+    Tags are also indexed by their name without underscores and spaces. When
+    several tags have the same name the first one in sorted order wins.
+    """
+
+    def __init__(self, tags: Iterable[str]):
+        tags_by_suffix: dict[str, list[str]] = {
+            suffix: [] for suffix in BOLT_SUFFIXES
+        }
+        for tag in tags:
+            for suffix in BOLT_SUFFIXES:
+                if tag.endswith(suffix):
+                    tags_by_suffix[suffix].append(tag)
+                    break
+
+        self._tags: dict[str, dict[str, str]] = {}
+        self._sorted_tags: dict[str, list[str]] = {}
+        for suffix, suffix_tags in tags_by_suffix.items():
+            suffix_tags.sort()
+            self._sorted_tags[suffix] = suffix_tags
+            names: dict[str, str] = {}
+            for tag in suffix_tags:
+                name = tag.removesuffix(suffix).lower()
+                names.setdefault(name, tag)
+                names.setdefault(_normalize(name), tag)
+            self._tags[suffix] = names
+
+    def find(self, part_names: Iterable[str], suffix: str) -> str | None:
+        """
+        The first tag with suffix for any of the lowercase part names.
+        """
+        names = self._tags[suffix]
+        found = [names[name] for name in part_names if name in names]
+        return min(found) if found else None
+
+    def tags(self, suffix: str) -> list[str]:
+        """
+        All tags with suffix, sorted.
+        """
+        return self._sorted_tags[suffix]
+
+
+@dataclass
+class BoltablePart:
+    name: str
+    bolted: Any
+    bolts: Any
+    tightness: Any
+    installed: Any
+
+    def to_dict(self):
+        return {
+            k: getattr(self, k)
+            for k in ["name", "bolted", "bolts", "tightness", "installed"]
+        }
+
+    @property
+    def bolt_values(self) -> list[int | None]:
+        return [bolt_value(bolt) for bolt in self.bolts or []]
+
+    @property
+    def loose_bolts(self) -> list[int]:
+        """
+        Indexes of the bolts that are in, but not tightened all the way.
+        """
+        return [
+            i
+            for i, value in enumerate(self.bolt_values)
+            if value is not None and 0 < value < BOLT_TIGHT
+        ]
+
+    @property
+    def missing_bolts(self) -> list[int]:
+        """
+        Indexes of the bolts that are not screwed in at all.
+        """
+        return [i for i, value in enumerate(self.bolt_values) if value == 0]
+
+    def problems(self) -> list[str]:
+        """
+        Short descriptions of what is wrong with the bolts, like `2 loose`.
+        """
+        if not self.installed:
+            return []
+        problems = []
+        if not self.bolted:
+            problems.append("not bolted")
+        if loose_bolts := self.loose_bolts:
+            problems.append(f"{len(loose_bolts)} loose")
+        if missing_bolts := self.missing_bolts:
+            problems.append(f"{len(missing_bolts)} missing")
+        return problems
+
+    @property
+    def tight_bolts(self) -> int:
+        return len(self.bolt_values) - len(self.loose_bolts) - len(self.missing_bolts)
+
+    @property
+    def has_problems(self) -> bool:
+        return bool(self.problems())
+
+
+def bolt_value(bolt: Any) -> int | None:
+    """
+    Tightness of a single bolt, bolts are saved as strings like `int(8)`.
+    """
+    if isinstance(bolt, int):
+        return bolt
+    if isinstance(bolt, str) and (m := _bolt_value_regex.match(bolt)):
+        return int(m.group(1))
+    return None
+
+
+class BoltChecker:
+    """
+    The boltable parts of a document, found with a BoltIndex in one pass over the tags.
+    """
+
+    data: dict[str, ES2Field]
+    index: BoltIndex
+    parts: list[BoltablePart]
+    # Parts with a Bolts tag of which some other tags were not found.
+    not_found: list[dict[str, str | None]]
+
+    def __init__(self, data: dict[str, ES2Field]):
+        self.data = data
+        self.index = BoltIndex(data.keys())
+        self.parts = []
+        self.not_found = []
+        for tag in self.index.tags("Bolts"):
+            self._add_part(tag.removesuffix("Bolts"))
+        self.parts.sort(key=lambda part: part.name)
+
+    def _add_part(self, part_name: str):
+        part_names = alternate_names(part_name)
+        tags = {suffix: self._find(part_names, suffix) for suffix in BOLT_SUFFIXES}
+        if all(tags.values()):
+            self.parts.append(
+                BoltablePart(
+                    name=part_name,
+                    bolted=self.data[tags["Bolted"]].value,
+                    bolts=self.data[tags["Bolts"]].value,
+                    tightness=self.data[tags["Tightness"]].value,
+                    installed=self.data[tags["Installed"]].value,
+                )
+            )
+        else:
+            self.not_found.append(
+                {"name": part_name}
+                | {suffix.lower(): tag for suffix, tag in tags.items()}
+            )
+
+    def _find(self, part_names: tuple[str, ...], suffix: str) -> str | None:
+        """
+        The tag of a part, a tag that could not be decoded counts as not found.
+        """
+        tag = self.index.find(part_names, suffix)
+        if tag is None or self.data[tag].is_raw:
+            return None
+        return tag
+
+    def check_bolts(self) -> list[BoltablePart]:
+        """
+        The installed parts that are not bolted or have loose or missing bolts.
+        """
+        return [part for part in self.parts if part.has_problems]
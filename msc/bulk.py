@@ -0,0 +1,230 @@
+"""
+Bulk edits: give every tag that matches a query a new value computed by an
+expression, like `tag:*WEA type:float` with `0`, or `tag:*FluidLevel` with
+`max(value, 10)`.
+
+Only scalar fields (numbers, booleans and strings) are edited. The expression is a
+Python expression over `value` and `tag` with arithmetic, comparisons, `x if c else y`
+and the functions in EXPRESSION_FUNCTIONS, `*` and `%` only take numbers. It is
+checked and compiled once and then evaluated for every matching tag in a single pass.
+"""
+
+import ast
+import math
+import struct
+from typing import Any, Callable
+
+from .es2.enums import ES2Key, ES2ValueType
+from .es2.types import ES2Field, ES2Header
+from .query import ValueIndex
+
+
+class BulkEditError(ValueError):
+    pass
+
+
+EXPRESSION_FUNCTIONS: dict[str, Callable] = {
+    "abs": abs,
+    "bool": bool,
+    "float": float,
+    "int": int,
+    "max": max,
+    "min": min,
+    "round": round,
+    "str": str,
+}
+
+EXPRESSION_NAMES = {"value", "tag"}
+
+# No ast.Pow, a large power would hang the editor.
+_allowed_nodes = (
+    ast.Expression,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.UnaryOp,
+    ast.UAdd,
+    ast.USub,
+    ast.Not,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.IfExp,
+    ast.Call,
+)
+
+_int_ranges = {
+    ES2ValueType.byte: (0, 255),
+    ES2ValueType.int32: (-(2**31), 2**31 - 1),
+}
+
+Expression = Callable[[Any, str], Any]
+
+
+def _multiply(a: Any, b: Any) -> Any:
+    # A string times a large number would allocate gigabytes in the live preview
+    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        raise BulkEditError(f"Only numbers can be multiplied, got {a!r} * {b!r}")
+    return a * b
+
+
+def _modulo(a: Any, b: Any) -> Any:
+    # String formatting like '%02000000000d' % 0 would allocate gigabytes
+    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        raise BulkEditError(f"Only numbers have a remainder, got {a!r} % {b!r}")
+    return a % b
+
+
+# Operators that are rewritten to a call of a function that checks the operands
+_checked_operators = {ast.Mult: "_multiply", ast.Mod: "_modulo"}
+
+
+class _CheckedOperators(ast.NodeTransformer):
+    """
+    Rewrites `a * b` to `_multiply(a, b)` and `a % b` to `_modulo(a, b)`.
+    """
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        function = _checked_operators.get(type(node.op))
+        if function is None:
+            return node
+        return ast.Call(ast.Name(function, ast.Load()), [node.left, node.right], [])
+
+
+def compile_expression(text: str) -> Expression:
+    """
+    Check an expression and compile it to a function of value and tag.
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise BulkEditError(f"Invalid expression '{text}': {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _allowed_nodes):
+            raise BulkEditError(
+                f"'{type(node).__name__}' is not allowed in an expression"
+            )
+        if isinstance(node, ast.Name) and (
+            node.id not in EXPRESSION_NAMES and node.id not in EXPRESSION_FUNCTIONS
+        ):
+            raise BulkEditError(f"Unknown name '{node.id}' in expression")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name)
+            or node.func.id not in EXPRESSION_FUNCTIONS
+            or node.keywords
+        ):
+            raise BulkEditError("Only the functions " + ", ".join(EXPRESSION_FUNCTIONS))
+
+    lambda_tree = ast.Expression(
+        ast.Lambda(
+            ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg("value"), ast.arg("tag")],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            _CheckedOperators().visit(tree.body),
+        )
+    )
+    ast.fix_missing_locations(lambda_tree)
+    code = compile(lambda_tree, "<expression>", "eval")
+    return eval(
+        code,
+        {
+            "__builtins__": {},
+            **EXPRESSION_FUNCTIONS,
+            "_multiply": _multiply,
+            "_modulo": _modulo,
+        },
+    )
+
+
+def is_scalar(header: ES2Header) -> bool:
+    return header.collection_type == ES2Key.Null and (
+        header.value_type in _int_ranges
+        or header.value_type
+        in (ES2ValueType.float, ES2ValueType.bool, ES2ValueType.string)
+    )
+
+
+def coerce(value: Any, header: ES2Header) -> Any:
+    """
+    Convert the result of an expression to the value type of a field.
+    """
+    value_type = header.value_type
+    if value_type == ES2ValueType.bool:
+        if not isinstance(value, bool):
+            raise BulkEditError(f"Expected a bool, got {value!r}")
+        return value
+    if value_type == ES2ValueType.string:
+        if not isinstance(value, str):
+            raise BulkEditError(f"Expected a string, got {value!r}")
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise BulkEditError(f"Expected a number, got {value!r}")
+    if value_type == ES2ValueType.float:
+        try:
+            value = float(value)
+            struct.pack("<f", value)
+        except OverflowError:
+            raise BulkEditError(f"{value} is out of range for float")
+        if not math.isfinite(value):
+            raise BulkEditError(f"Expected a finite number, got {value!r}")
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise BulkEditError(f"Expected a whole number, got {value!r}")
+        value = int(value)
+    low, high = _int_ranges[value_type]
+    if not low <= value <= high:
+        raise BulkEditError(f"{value} is out of range for {value_type.name}")
+    return value
+
+
+def bulk_edit(
+    data: dict[str, ES2Field],
+    query: str,
+    expression: str,
+    index: ValueIndex | None = None,
+) -> dict[str, Any]:
+    """
+    The new value of every scalar tag that matches the query, the data is not
+    changed. Tags that would keep their value are left out.
+
+    Raises QueryError for an invalid query and BulkEditError when the expression is
+    invalid or gives a value of the wrong type.
+    """
+    function = compile_expression(expression)
+    tags = (index if index is not None else ValueIndex(data)).query(query)
+    values = {}
+    for tag in sorted(tags):
+        field = data[tag]
+        if field.value is None or not is_scalar(field.header):
+            continue
+        try:
+            value = coerce(function(field.value, tag), field.header)
+        except BulkEditError as e:
+            raise BulkEditError(f"{tag}: {e}")
+        except Exception as e:
+            raise BulkEditError(f"{tag}: {type(e).__name__}: {e}")
+        if value != field.value:
+            values[tag] = value
+    return values
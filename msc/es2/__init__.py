@@ -1,3 +1,3 @@
-from .reader import ES2Reader
+from .reader import ES2Reader, read_chunk, read_file
 from .writer import ES2Writer
 from .enums import ES2Key, ES2ValueType
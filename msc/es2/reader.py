@@ -1,5 +1,7 @@
+from io import BytesIO
+import os
 import struct
-from typing import Any, BinaryIO
+from typing import Any, BinaryIO, Callable, Iterator
 import logging
 
 from .exceptions import ES2InvalidDataException
@@ -20,11 +22,34 @@ from .unity import (
     Vector3,
 )
 
+logger = logging.getLogger(__name__)
+
+# Errors of a tag that cannot be decoded, a tolerant reader keeps such a tag raw.
+DECODE_ERRORS = (
+    ES2InvalidDataException,
+    NotImplementedError,
+    ValueError,
+    EOFError,
+    struct.error,
+)
+
 
 class ES2Reader:
-    def __init__(self, stream: BinaryIO):
+    """
+    Reads the tags of an ES2 stream.
+
+    A tolerant reader keeps a tag that cannot be decoded as an ES2Field with a
+    RawValue and continues with the next tag, using the length prefix of the tag.
+    Only a broken chain of tags still raises.
+    """
+
+    tolerant: bool
+
+    def __init__(self, stream: BinaryIO, tolerant: bool = False):
         self.stream = stream
         self.current_tag = ES2Tag()
+        self.tolerant = tolerant
+        self._decode = self._read_field_tolerant if tolerant else self.read_field
 
     def next(self) -> bool:
         self.stream.seek(self.current_tag.next_tag_position)
@@ -47,30 +72,83 @@ class ES2Reader:
         self.current_tag = ES2Tag()
 
     def read_all(self) -> dict[str, ES2Field]:
-        data = {}
+        return dict(self.iter_all())
+
+    def iter_all(self) -> Iterator[tuple[str, ES2Field]]:
+        """
+        Read the stream tag by tag, yielding every tag together with its field.
+
+        Useful when the caller wants to report progress or stop reading halfway.
+        """
         self.reset()
         while self.next():
-            header = self.read_header()
-            if header.settings.encrypt:
-                raise NotImplementedError("Cannot deal with encryption sorry.")
-            match header.collection_type:
-                case ES2Key.NativeArray:
-                    data[self.current_tag.tag] = self._read_array(header.value_type)
-                case ES2Key.List:
-                    data[self.current_tag.tag] = self._read_list(header.value_type)
-                case ES2Key.Dictionary:
-                    data[self.current_tag.tag] = self._read_dict(header.key_type, header.value_type)
-                case ES2Key.Null:
-                    data[self.current_tag.tag] = self._read_type(header.value_type)
-                case _:
-                    logging.warning(
-                        f"Failed to read header collection type {header.collection_type}"
-                    )
-
-            data[self.current_tag.tag] = ES2Field(
-                header, data.get(self.current_tag.tag, None)
-            )
-        return data
+            yield self.current_tag.tag, self._decode()
+
+    def iter_matching(
+        self, predicate: Callable[[str], bool]
+    ) -> Iterator[tuple[str, ES2Field]]:
+        """
+        Like iter_all, but only decode the tags for which predicate returns True.
+
+        The chunks of the other tags are skipped using their length prefix.
+        """
+        self.reset()
+        while self.next():
+            if predicate(self.current_tag.tag):
+                yield self.current_tag.tag, self._decode()
+
+    def iter_raw(self) -> Iterator[tuple[str, bytes]]:
+        """
+        Yield every tag with the raw bytes of its chunk (header, value and terminator).
+
+        Only the length prefixes are used, nothing gets decoded.
+        """
+        self.reset()
+        while self.next():
+            length = self.current_tag.next_tag_position - self.current_tag.settings_position
+            yield self.current_tag.tag, self.stream.read(length)
+
+    def read_field(self) -> ES2Field:
+        """
+        Read the header and value at the current position of the stream.
+        """
+        header = self.read_header()
+        if header.settings.encrypt:
+            raise NotImplementedError("Cannot deal with encryption sorry.")
+        value = None
+        match header.collection_type:
+            case ES2Key.NativeArray:
+                value = self._read_array(header.value_type)
+            case ES2Key.List:
+                value = self._read_list(header.value_type)
+            case ES2Key.Dictionary:
+                value = self._read_dict(header.key_type, header.value_type)
+            case ES2Key.Null:
+                value = self._read_type(header.value_type)
+            case _ if self.tolerant:
+                raise NotImplementedError(
+                    f"Collection type {header.collection_type.name} not implemented"
+                )
+            case _:
+                logging.warning(
+                    f"Failed to read header collection type {header.collection_type}"
+                )
+        return ES2Field(header, value)
+
+    def _read_field_tolerant(self) -> ES2Field:
+        tag = self.current_tag
+        try:
+            field = self.read_field()
+            if self.stream.tell() != tag.next_tag_position - 1:
+                raise ES2InvalidDataException(
+                    "Value does not end at the terminator of the tag"
+                )
+        except DECODE_ERRORS as e:
+            logger.warning("Keeping tag '%s' raw, cannot read it: %s", tag.tag, e)
+            self.stream.seek(tag.settings_position)
+            chunk = self.stream.read(tag.next_tag_position - tag.settings_position)
+            return ES2Field.raw(chunk, str(e) or type(e).__name__)
+        return field
 
     def read_string(self) -> str:
         strlen = self._read_7bit_encoded_int()
@@ -288,3 +366,31 @@ class ES2Reader:
                     # value_type = hash???
                     raise NotImplementedError("Get type from key not implemented")
         raise ES2InvalidDataException("Encountered invalid data when reading header.")
+
+
+def read_file(
+    filename: str | os.PathLike,
+    suffixes: tuple[str, ...] | None = None,
+    tolerant: bool = False,
+) -> dict[str, ES2Field]:
+    """
+    Read a whole ES2 file, or only the tags that end with one of suffixes.
+
+    Module level so it can be used as a ProcessPoolExecutor task.
+    """
+    with open(filename, "rb") as f:
+        reader = ES2Reader(BytesIO(f.read()), tolerant)
+    if suffixes is None:
+        return reader.read_all()
+    return dict(reader.iter_matching(lambda tag: tag.endswith(suffixes)))
+
+
+def read_chunk(chunk: bytes, tolerant: bool = False) -> ES2Field:
+    """
+    Decode the raw bytes of a single tag, as returned by ES2Reader.iter_raw.
+    """
+    reader = ES2Reader(BytesIO(chunk), tolerant)
+    if not tolerant:
+        return reader.read_field()
+    reader.current_tag.next_tag_position = len(chunk)
+    return reader._read_field_tolerant()
@@ -17,6 +17,32 @@ class ES2Header:
     value_type: ES2ValueType = ES2ValueType.Null
     settings: ES2HeaderSettings = field(default_factory=ES2HeaderSettings)
 
+    def __reduce__(self):
+        # Pickle as plain ints, this is a lot smaller and faster to unpickle
+        # than the enums and nested dataclass.
+        return _unpickle_header, (
+            self.collection_type.value,
+            self.key_type.value,
+            self.value_type.value,
+            self.settings.encrypt,
+            self.settings.debug,
+        )
+
+
+_keys_by_value = {key.value: key for key in ES2Key}
+_value_types_by_value = {value_type.value: value_type for value_type in ES2ValueType}
+
+
+def _unpickle_header(
+    collection_type: int, key_type: int, value_type: int, encrypt: bool, debug: bool
+) -> ES2Header:
+    return ES2Header(
+        _keys_by_value[collection_type],
+        _value_types_by_value[key_type],
+        _value_types_by_value[value_type],
+        ES2HeaderSettings(encrypt, debug),
+    )
+
 
 @dataclass
 class ES2Tag:
@@ -27,11 +53,36 @@ class ES2Tag:
 
 
 
+@dataclass
+class RawValue:
+    """
+    The value of a tag that could not be decoded, kept as the raw bytes of its chunk
+    (header, value and terminator) and written back unchanged.
+    """
+
+    chunk: bytes
+    error: str = ""
+
+    def __str__(self) -> str:
+        return f"<{len(self.chunk)} unreadable bytes: {self.error}>"
+
+
 @dataclass
 class ES2Field:
     header: ES2Header
     value: Any
 
+    def __reduce__(self):
+        return ES2Field, (self.header, self.value)
+
     @classmethod
     def from_value_type(cls, value_type: ES2ValueType, value: Any):
         return cls(ES2Header(value_type=value_type), value)
+
+    @classmethod
+    def raw(cls, chunk: bytes, error: str = ""):
+        return cls(ES2Header(), RawValue(chunk, error))
+
+    @property
+    def is_raw(self) -> bool:
+        return isinstance(self.value, RawValue)
@@ -12,6 +12,9 @@ class Color:
     def as_list(self):
         return [self.r, self.g, self.b, self.a]
 
+    def __reduce__(self):
+        return Color, (self.r, self.g, self.b, self.a)
+
     def to_css(self):
         return f"rgb({(int(self.r * 255))},{(int(self.g * 255))},{(int(self.b * 255))})"
 
@@ -69,6 +72,9 @@ class Mesh:
     def get_triangles(self, submesh_id: int):
         return self.submeshes[submesh_id]
 
+    def __str__(self):
+        return f"Mesh({len(self.vertices)} verts)"
+
 
 @dataclass
 class Quaternion:
@@ -80,6 +86,9 @@ class Quaternion:
     def as_list(self):
         return [self.x, self.y, self.z, self.w]
 
+    def __reduce__(self):
+        return Quaternion, (self.x, self.y, self.z, self.w)
+
 @dataclass
 class Texture2D:
     image: bytes
@@ -101,6 +110,9 @@ class Vector3:
     def as_list(self):
         return [self.x, self.y, self.z]
 
+    def __reduce__(self):
+        return Vector3, (self.x, self.y, self.z)
+
 
 @dataclass
 class Transform:
@@ -108,3 +120,6 @@ class Transform:
     rotation: Quaternion = field(default_factory=Quaternion)
     scale: Vector3 = field(default_factory=Vector3)
     layer: str = ""
+
+    def __reduce__(self):
+        return Transform, (self.position, self.rotation, self.scale, self.layer)
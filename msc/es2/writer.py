@@ -1,3 +1,4 @@
+from io import BytesIO
 import struct
 from typing import Any, BinaryIO, IO
 
@@ -5,6 +6,7 @@ from typing import Any, BinaryIO, IO
 from .enums import ES2Key, ES2ValueType
 from .types import (
     ES2Field,
+    RawValue,
 )
 from .unity import (
     Color,
@@ -20,6 +22,7 @@ class ES2Writer:
     def __init__(self, stream: BinaryIO | IO[bytes]):
         self.stream = stream
         self.data: dict[str, ES2Field] = {}
+        self.debug = False
 
     def write_bool(self, param: bool):
         self.write("?", param)
@@ -40,7 +43,8 @@ class ES2Writer:
         self.write("i", param)
 
     def write_float(self, param: float):
-        self.write("f", param)
+        # Standard size, native "f" turns floats out of the float32 range into inf
+        self.write("<f", param)
 
     def write_str(self, param: str):
         self.write_string(param)
@@ -62,7 +66,7 @@ class ES2Writer:
         self.write_byte(param)
 
     def write_color(self, param: Color):
-        self.write("ffff", param.r, param.g, param.b, param.a)
+        self.write("<ffff", param.r, param.g, param.b, param.a)
 
     def write_transform(self, param: Transform):
         self.write_byte(4)
@@ -72,16 +76,16 @@ class ES2Writer:
         self.write_string(param.layer)
 
     def write_vector2(self, param: tuple[float, float]):
-        self.write("ff", *param)
+        self.write("<ff", *param)
 
     def write_vector3(self, param: Vector3):
-        self.write("fff", param.x, param.y, param.z)
+        self.write("<fff", param.x, param.y, param.z)
 
     def write_vector4(self, param: tuple[float, float, float, float]):
-        self.write("ffff", *param)
+        self.write("<ffff", *param)
 
     def write_quaternion(self, param: Quaternion):
-        self.write("ffff", param.x, param.y, param.z, param.w)
+        self.write("<ffff", param.x, param.y, param.z, param.w)
 
     def write_mesh(self, param: Mesh):
         assert param.settings is not None
@@ -186,32 +190,59 @@ class ES2Writer:
 
     def save_all(self):
         for tag, field in self.data.items():
-            header, value = field.header, field.value
-            self.debug = header.settings.debug
-            if self.debug:
-                print(type(value).__name__, tag)
-
-            collection_type = header.collection_type
-            value_type = header.value_type
-            key_type = header.key_type
-            length_position = self._write_header(
-                tag, collection_type, value_type, key_type
-            )
-
-            match collection_type:
-                case ES2Key.NativeArray:
-                    self._write_array(header.value_type, value)
-                case ES2Key.List:
-                    self._write_list(header.value_type, value)
-                case ES2Key.Dictionary:
-                    self._write_dict(header.key_type, header.value_type, value)
-                case ES2Key.Null:
-                    self._write_type(value_type, value)
-                case _:
-                    print(tag)
-                    raise NotImplementedError(
-                        f"Collection type not implemented: {collection_type.name}"
-                    )
-
-            self._write_terminator()
-            self._write_length(length_position)
+            self.write_field(tag, field)
+
+    def write_chunk(self, tag: str, chunk: bytes):
+        """
+        Write a tag with the raw bytes of its chunk, as returned by ES2Reader.iter_raw.
+        """
+        self.write_byte(ES2Key.Tag.value)
+        self.write_string(tag)
+        self.write_int32(len(chunk))
+        self.write(chunk)
+
+    def write_field(self, tag: str, field: ES2Field):
+        """
+        Write a single tag with its header and value at the current position.
+        """
+        header, value = field.header, field.value
+        if isinstance(value, RawValue):
+            self.write_chunk(tag, value.chunk)
+            return
+        self.debug = header.settings.debug
+        if self.debug:
+            print(type(value).__name__, tag)
+
+        collection_type = header.collection_type
+        value_type = header.value_type
+        key_type = header.key_type
+        length_position = self._write_header(tag, collection_type, value_type, key_type)
+
+        match collection_type:
+            case ES2Key.NativeArray:
+                self._write_array(header.value_type, value)
+            case ES2Key.List:
+                self._write_list(header.value_type, value)
+            case ES2Key.Dictionary:
+                self._write_dict(header.key_type, header.value_type, value)
+            case ES2Key.Null:
+                self._write_type(value_type, value)
+            case _:
+                print(tag)
+                raise NotImplementedError(
+                    f"Collection type not implemented: {collection_type.name}"
+                )
+
+        self._write_terminator()
+        self._write_length(length_position)
+
+
+def check_field(field: ES2Field):
+    """
+    Raise a ValueError when the value of field cannot be written with its header,
+    like 300 for a byte or 1e39 for a float.
+    """
+    try:
+        ES2Writer(BytesIO()).write_field("", field)
+    except (struct.error, OverflowError) as e:
+        raise ValueError(f"Invalid value {field.value!r}: {e}") from e
@@ -0,0 +1,138 @@
+"""
+Undo and redo of edits, as a list of reversible steps.
+
+Edits replace the value of a field instead of changing the value, so a step only
+keeps references to the old and the new values of the tags it changed. The memory of
+the history grows with the edited values, not with the size of the file. Undoing or
+redoing several steps at once merges them into one value per tag.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+# Steps kept, the oldest steps are dropped after this.
+MAX_STEPS = 1000
+
+
+@dataclass
+class EditStep:
+    description: str
+    # Old and new value by tag
+    changes: dict[str, tuple[Any, Any]]
+
+
+class EditHistory:
+    steps: list[EditStep]
+    # Number of steps that are applied, steps[position:] can be redone.
+    position: int
+    # Position that matches the file on disk, None when it cannot be reached.
+    clean_position: int | None
+    max_steps: int
+    # Identifies the state before steps[0], see state()
+    _start: object
+
+    def __init__(self, max_steps: int = MAX_STEPS):
+        self.steps = []
+        self.position = 0
+        self.clean_position = 0
+        self.max_steps = max_steps
+        self._start = object()
+
+    @property
+    def is_clean(self) -> bool:
+        return self.position == self.clean_position
+
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    def can_redo(self) -> bool:
+        return self.position < len(self.steps)
+
+    def undo_steps(self) -> list[EditStep]:
+        """
+        The steps that can be undone, the most recent first.
+        """
+        return self.steps[self.position - 1 :: -1] if self.position else []
+
+    def redo_steps(self) -> list[EditStep]:
+        return self.steps[self.position :]
+
+    def record(self, step: EditStep):
+        """
+        Add a step that was just applied, the steps that could be redone are lost.
+        """
+        del self.steps[self.position :]
+        if self.clean_position is not None and self.clean_position > self.position:
+            self.clean_position = None
+        self.steps.append(step)
+        self.position += 1
+
+        dropped = len(self.steps) - self.max_steps
+        if dropped > 0:
+            # The last dropped step now identifies the state before steps[0]
+            self._start = self.steps[dropped - 1]
+            del self.steps[:dropped]
+            self.position -= dropped
+            if self.clean_position is not None:
+                self.clean_position -= dropped
+                if self.clean_position < 0:
+                    self.clean_position = None
+
+    def undo(self, count: int = 1) -> dict[str, Any]:
+        """
+        Undo up to count steps, returns the value every changed tag should get.
+        """
+        count = min(count, self.position)
+        values = {}
+        # Newest first, so the oldest step sets the final value of a tag.
+        for step in self.steps[self.position - count : self.position][::-1]:
+            for tag, (old, _) in step.changes.items():
+                values[tag] = old
+        self.position -= count
+        return values
+
+    def redo(self, count: int = 1) -> dict[str, Any]:
+        """
+        Redo up to count steps, returns the value every changed tag should get.
+        """
+        count = min(count, len(self.steps) - self.position)
+        values = {}
+        for step in self.steps[self.position : self.position + count]:
+            for tag, (_, new) in step.changes.items():
+                values[tag] = new
+        self.position += count
+        return values
+
+    def state(self) -> object:
+        """
+        A token of the current state, it stays valid while steps are recorded or
+        dropped, see mark_clean.
+        """
+        return self.steps[self.position - 1] if self.position else self._start
+
+    def mark_clean(self, state: object | None = None):
+        """
+        The current state was saved, or the earlier state of a token from state().
+        The file cannot be made clean by undo or redo when that state is lost.
+        """
+        if state is None:
+            self.clean_position = self.position
+        elif state is self._start:
+            self.clean_position = 0
+        else:
+            self.clean_position = next(
+                (i + 1 for i, step in enumerate(self.steps) if step is state), None
+            )
+
+    def mark_dirty(self):
+        """
+        The current state differs from the file on disk, without a step for it.
+        """
+        if self.is_clean:
+            self.clean_position = None
+
+    def clear(self):
+        self.steps.clear()
+        self.position = 0
+        self.clean_position = 0
+        self._start = object()
@@ -0,0 +1,178 @@
+"""
+An append-only journal of the unsaved edits of a save file, to recover them after a
+crash.
+
+Every edit is a record with the time, the old and the new field of a tag, both
+encoded like in a save file with ES2Writer. A record starts with its length and a
+CRC32 of its payload, replay stops at a record that was only partly written.
+
+The journal of `{name}` is `{name}.journal`, it is removed once the edits are saved
+or discarded.
+"""
+
+from dataclasses import dataclass, field
+from io import BytesIO
+import logging
+from pathlib import Path
+import struct
+import time
+from typing import BinaryIO, Iterable, Iterator
+import zlib
+
+from .es2.reader import ES2Reader
+from .es2.types import ES2Field
+from .es2.writer import ES2Writer
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAGIC = b"MSCJRNL1\n"
+
+# Payload length and CRC32 of the payload
+_record_header = struct.Struct("<II")
+_timestamp = struct.Struct("<d")
+
+
+@dataclass
+class JournalEntry:
+    timestamp: float
+    tag: str
+    old: ES2Field
+    new: ES2Field
+
+
+@dataclass
+class ReplayResult:
+    # Tags set to their journaled value
+    applied: list[str] = field(default_factory=list)
+    # Tags that already had their journaled value
+    unchanged: list[str] = field(default_factory=list)
+    # Tags changed on disk since the edit, or gone, these are not touched
+    conflicts: list[str] = field(default_factory=list)
+
+
+def encode_entry(entry: JournalEntry) -> bytes:
+    stream = BytesIO()
+    stream.write(_timestamp.pack(entry.timestamp))
+    writer = ES2Writer(stream)
+    writer.write_field(entry.tag, entry.old)
+    writer.write_field(entry.tag, entry.new)
+    payload = stream.getvalue()
+    return _record_header.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_entry(payload: bytes) -> JournalEntry:
+    (timestamp,) = _timestamp.unpack_from(payload)
+    reader = ES2Reader(BytesIO(payload[_timestamp.size :]))
+    (tag, old), (_, new) = reader.iter_all()
+    return JournalEntry(timestamp, tag, old, new)
+
+
+class EditJournal:
+    """
+    The journal of a single save file.
+    """
+
+    filename: Path
+    path: Path
+    _file: BinaryIO | None = None
+
+    def __init__(self, filename: Path):
+        self.filename = filename
+        self.path = filename.with_name(f"{filename.name}.journal")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def append(
+        self, tag: str, old: ES2Field, new: ES2Field, timestamp: float | None = None
+    ):
+        """
+        Record an edit, the file stays open for the next edits.
+
+        The record is flushed to the operating system, so it survives a crash of the
+        editor, but not synced to disk.
+        """
+        self.extend([(tag, old, new)], timestamp)
+
+    def extend(
+        self,
+        edits: Iterable[tuple[str, ES2Field, ES2Field]],
+        timestamp: float | None = None,
+    ):
+        """
+        Record several edits of (tag, old, new) with a single write.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        records = b"".join(
+            encode_entry(JournalEntry(timestamp, tag, old, new))
+            for tag, old, new in edits
+        )
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            if self._file.tell() == 0:
+                self._file.write(JOURNAL_MAGIC)
+        self._file.write(records)
+        self._file.flush()
+
+    def entries(self) -> Iterator[JournalEntry]:
+        """
+        All complete records, in the order they were written.
+        """
+        if not self.exists():
+            return
+        data = self.path.read_bytes()
+        if not data.startswith(JOURNAL_MAGIC):
+            logger.warning("Not an edit journal '%s'", self.path)
+            return
+        position = len(JOURNAL_MAGIC)
+        while position + _record_header.size <= len(data):
+            length, crc = _record_header.unpack_from(data, position)
+            position += _record_header.size
+            payload = data[position : position + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                logger.warning(
+                    "Incomplete record in '%s', ignoring the rest", self.path
+                )
+                return
+            position += length
+            yield decode_entry(payload)
+
+    def replay(self, data: dict[str, ES2Field]) -> ReplayResult:
+        """
+        Apply the journaled edits to freshly read data.
+
+        Only the first old and the last new value of every tag matter. A tag is set to
+        the new value when it still has the old value.
+        """
+        first_old: dict[str, ES2Field] = {}
+        last_new: dict[str, ES2Field] = {}
+        for entry in self.entries():
+            first_old.setdefault(entry.tag, entry.old)
+            last_new[entry.tag] = entry.new
+
+        result = ReplayResult()
+        for tag, new in last_new.items():
+            current = data.get(tag)
+            if current is not None and current.header == new.header:
+                if current.value == new.value:
+                    result.unchanged.append(tag)
+                    continue
+                if current.value == first_old[tag].value:
+                    current.value = new.value
+                    result.applied.append(tag)
+                    continue
+            result.conflicts.append(tag)
+        return result
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """
+        Remove the journal, after the edits were saved or discarded.
+        """
+        self.close()
+        self.path.unlink(missing_ok=True)
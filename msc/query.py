@@ -0,0 +1,270 @@
+"""
+Typed queries over the values of a document, like `type:float value<10 tag:*WEA`.
+
+Terms are separated by spaces and all of them have to match:
+
+    type:NAME       value type (float, int32, string, transform, ...) or collection
+                    type (List, NativeArray, Dictionary)
+    tag:WILDCARD    tag matches the wildcard, case insensitive
+    value<N         scalar value compared with N, also <=, >, >=, = and !=
+                    N is a number, true/false or a (quoted) string
+    near:X,Z,R      transforms within R meters of game position X, Z
+    near:TAG,R      transforms within R meters of the transform TAG
+    WORD            tag contains WORD, case insensitive
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+import re
+from typing import Any
+
+from .es2.enums import ES2Key, ES2ValueType
+from .es2.types import ES2Field, ES2Header
+from .spatial import TransformIndex
+
+
+class QueryError(ValueError):
+    pass
+
+
+NUMERIC_TYPES = (ES2ValueType.byte, ES2ValueType.int32, ES2ValueType.float)
+
+_comparison_regex = re.compile(r"^value(?P<op><=|>=|!=|<|>|=)(?P<literal>.+)$")
+
+
+@dataclass
+class Term:
+    kind: str  # "type", "tag", "value", "near" or "word"
+    argument: Any
+    operator: str = ""
+
+
+def is_query(text: str) -> bool:
+    """
+    Whether the text looks like a query instead of a plain wildcard search.
+    """
+    return any(
+        term.startswith(("type:", "tag:", "near:")) or _comparison_regex.match(term)
+        for term in text.split()
+    )
+
+
+def parse_query(text: str) -> list[Term]:
+    terms = []
+    for term in text.split():
+        if term.startswith("type:"):
+            terms.append(Term("type", term[5:].lower()))
+        elif term.startswith("tag:"):
+            terms.append(Term("tag", term[4:].lower()))
+        elif term.startswith("near:"):
+            terms.append(Term("near", _parse_near(term[5:])))
+        elif m := _comparison_regex.match(term):
+            terms.append(
+                Term("value", _parse_literal(m.group("literal")), m.group("op"))
+            )
+        else:
+            terms.append(Term("word", term.lower()))
+    if not terms:
+        raise QueryError("Empty query")
+    return terms
+
+
+def _parse_literal(literal: str) -> bool | float | str:
+    if literal.lower() in ("true", "false"):
+        return literal.lower() == "true"
+    if len(literal) >= 2 and literal[0] == literal[-1] and literal[0] in "\"'":
+        return literal[1:-1]
+    try:
+        return float(literal)
+    except ValueError:
+        return literal
+
+
+def _parse_near(argument: str) -> tuple[str | float, ...]:
+    parts = argument.split(",")
+    try:
+        match parts:
+            case [x, z, radius]:
+                return float(x), float(z), float(radius)
+            case [tag, radius]:
+                return tag, float(radius)
+    except ValueError:
+        pass
+    raise QueryError(f"Invalid near: '{argument}', expected near:X,Z,R or near:TAG,R")
+
+
+class Column:
+    """
+    Sorted values of one value type, for range lookups with bisect.
+
+    NaN floats cannot be sorted, their tags are kept apart and only match `!=`.
+    """
+
+    def __init__(self, values: dict[str, Any]):
+        self.nan_tags = {tag for tag, value in values.items() if _is_nan(value)}
+        pairs = sorted(
+            (value, tag) for tag, value in values.items() if tag not in self.nan_tags
+        )
+        self.keys = [value for value, _ in pairs]
+        self.tags = [tag for _, tag in pairs]
+        self.values = values
+
+    def add(self, tag: str, value: Any):
+        self.values[tag] = value
+        if _is_nan(value):
+            self.nan_tags.add(tag)
+            return
+        i = bisect_right(self.keys, value)
+        self.keys.insert(i, value)
+        self.tags.insert(i, tag)
+
+    def remove(self, tag: str):
+        value = self.values.pop(tag)
+        if tag in self.nan_tags:
+            self.nan_tags.remove(tag)
+            return
+        i = bisect_left(self.keys, value)
+        while self.tags[i] != tag:
+            i += 1
+        del self.keys[i]
+        del self.tags[i]
+
+    def select(self, operator: str, value: Any) -> set[str]:
+        keys, tags = self.keys, self.tags
+        if _is_nan(value) and operator in ("<", "<=", ">", ">=", "="):
+            # Nothing is equal to, less or greater than NaN
+            return set()
+        match operator:
+            case "<":
+                return set(tags[: bisect_left(keys, value)])
+            case "<=":
+                return set(tags[: bisect_right(keys, value)])
+            case ">":
+                return set(tags[bisect_right(keys, value) :])
+            case ">=":
+                return set(tags[bisect_left(keys, value) :])
+            case "=":
+                return set(tags[bisect_left(keys, value) : bisect_right(keys, value)])
+            case "!=":
+                return (set(tags) | self.nan_tags) - self.select("=", value)
+        raise QueryError(f"Unknown operator '{operator}'")
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, float) and value != value
+
+
+class ValueIndex:
+    """
+    Columnar index of the scalar values of a document, grouped by ES2ValueType.
+    """
+
+    headers: dict[str, ES2Header]
+    columns: dict[ES2ValueType, Column]
+    # Game x, z position of every transform.
+    positions: TransformIndex
+
+    def __init__(
+        self, data: dict[str, ES2Field], positions: TransformIndex | None = None
+    ):
+        self.headers = {}
+        self.positions = positions if positions is not None else TransformIndex(data)
+        values: dict[ES2ValueType, dict[str, Any]] = {}
+        for tag, field in data.items():
+            self.headers[tag] = field.header
+            for value_type, value in self._scalars(tag, field):
+                values.setdefault(value_type, {})[tag] = value
+        self.columns = {
+            value_type: Column(column) for value_type, column in values.items()
+        }
+
+    def _scalars(self, tag: str, field: ES2Field):
+        header = field.header
+        if header.collection_type != ES2Key.Null or field.value is None:
+            return
+        if header.value_type in NUMERIC_TYPES or header.value_type in (
+            ES2ValueType.bool,
+            ES2ValueType.string,
+        ):
+            yield header.value_type, field.value
+
+    def update(self, tag: str, field: ES2Field | None):
+        """
+        Update a single tag after an edit, or remove it when field is None.
+        """
+        for column in self.columns.values():
+            if tag in column.values:
+                column.remove(tag)
+        self.positions.update(tag, field)
+        self.headers.pop(tag, None)
+        if field is None:
+            return
+        self.headers[tag] = field.header
+        for value_type, value in self._scalars(tag, field):
+            if value_type not in self.columns:
+                self.columns[value_type] = Column({})
+            self.columns[value_type].add(tag, value)
+
+    def query(self, text: str) -> set[str]:
+        """
+        All tags that match every term of the query.
+        """
+        result: set[str] | None = None
+        for term in parse_query(text):
+            matches = self._match(term, result if result is not None else self.headers)
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result or set()
+
+    def _match(self, term: Term, candidates) -> set[str]:
+        match term.kind:
+            case "type":
+                return {
+                    tag
+                    for tag in candidates
+                    if _type_matches(self.headers[tag], term.argument)
+                }
+            case "tag":
+                return {
+                    tag for tag in candidates if fnmatchcase(tag.lower(), term.argument)
+                }
+            case "word":
+                return {tag for tag in candidates if term.argument in tag.lower()}
+            case "value":
+                return self._match_value(term.operator, term.argument)
+            case "near":
+                return self._match_near(term.argument)
+        raise QueryError(f"Unknown term '{term.kind}'")
+
+    def _match_value(self, operator: str, literal: bool | float | str) -> set[str]:
+        if isinstance(literal, bool):
+            value_types: tuple[ES2ValueType, ...] = (ES2ValueType.bool,)
+        elif isinstance(literal, float):
+            value_types = NUMERIC_TYPES
+        else:
+            value_types = (ES2ValueType.string,)
+        matches: set[str] = set()
+        for value_type in value_types:
+            if value_type in self.columns:
+                matches |= self.columns[value_type].select(operator, literal)
+        return matches
+
+    def _match_near(self, argument: tuple) -> set[str]:
+        if len(argument) == 2:
+            tag, radius = argument
+            if tag not in self.positions:
+                raise QueryError(f"No transform with tag '{tag}'")
+            x, z = self.positions.points[tag]
+        else:
+            x, z, radius = argument
+        return {tag for tag, _ in self.positions.within_radius(x, z, radius)}
+
+
+def _type_matches(header: ES2Header, type_name: str) -> bool:
+    if header.value_type.name.lower() == type_name:
+        return True
+    return header.collection_type != ES2Key.Null and (
+        header.collection_type.name.lower() == type_name
+    )
@@ -0,0 +1,245 @@
+"""
+The car report: the condition of every installed part, like wear and battery charge.
+
+Which values are shown for which parts is configured by the `parts` section of
+gui/vin.yaml, see PartsMatcher.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from .es2.enums import ES2Key, ES2ValueType
+from .es2.types import ES2Field
+
+
+@dataclass
+class ReportRow:
+    name: str
+    key: str
+    value: Any
+    score: float | None
+    # Tag the value comes from.
+    tag: str
+    # Prefix of the part, the AID tag of the part also feeds the row.
+    part: str
+
+
+@dataclass
+class PartRule:
+    """
+    The values of a part that are shown in the report, from PARTS_DATA.
+    """
+
+    name: str
+    values: dict[str, dict]
+
+
+class PartsMatcher:
+    """
+    Finds the PARTS_DATA rules of a part.
+
+    A rule matches every part that starts with its name, case insensitive. Instead of
+    a startswith per rule, the rules are looked up by the start of the part with a
+    dict lookup per distinct name length.
+    """
+
+    rules: list[PartRule]
+
+    def __init__(self, parts_data: dict[str, dict]):
+        self.rules = [
+            PartRule(name, {key: value for key, value in values.items() if value})
+            for name, values in parts_data.items()
+        ]
+        self._rules_by_name: dict[str, list[int]] = {}
+        for i, rule in enumerate(self.rules):
+            self._rules_by_name.setdefault(rule.name.lower(), []).append(i)
+        self._lengths = sorted({len(name) for name in self._rules_by_name})
+
+    def match(self, part: str) -> list[int]:
+        """
+        Indexes of all rules that match part.
+        """
+        part = part.lower()
+        matches = []
+        for length in self._lengths:
+            if length > len(part):
+                break
+            matches.extend(self._rules_by_name.get(part[:length], ()))
+        return matches
+
+
+def tags_with_prefix(sorted_tags: list[str], prefix: str) -> Iterator[str]:
+    """
+    All tags that start with prefix, found with a bisect in the sorted tags.
+    """
+    for i in range(bisect_left(sorted_tags, prefix), len(sorted_tags)):
+        tag = sorted_tags[i]
+        if not tag.startswith(prefix):
+            return
+        yield tag
+
+
+def part_values(
+    data: dict[str, ES2Field], sorted_tags: list[str], part_prefix: str
+) -> dict[str, Any] | None:
+    """
+    The values of a part by tag suffix, like `{"WEA": 90.0}` for `VIN1010`.
+
+    None when the part is not installed, a part is installed when its AID tag is a
+    positive int32. Tags that could not be decoded are left out.
+    """
+    field = data.get(f"{part_prefix}AID")
+    if (
+        field is None
+        or field.is_raw
+        or field.header.collection_type != ES2Key.Null
+        or field.header.value_type != ES2ValueType.int32
+        or not field.value > 0
+    ):
+        return None
+    return {
+        part_tag[len(part_prefix) :]: data[part_tag].value
+        for part_tag in tags_with_prefix(sorted_tags, part_prefix)
+        # VIN10101AID is another part than VIN1010
+        if not part_tag[len(part_prefix) : len(part_prefix) + 1].isdecimal()
+        and not data[part_tag].is_raw
+    }
+
+
+def installed_parts(
+    data: dict[str, ES2Field], sorted_tags: list[str]
+) -> dict[str, dict[str, Any]]:
+    """
+    The values of every installed part by part prefix.
+    """
+    parts: dict[str, dict[str, Any]] = {}
+    for tag in sorted_tags:
+        if not tag.endswith("AID"):
+            continue
+        part_prefix = tag.removesuffix("AID")
+        values = part_values(data, sorted_tags, part_prefix)
+        if values is not None:
+            parts[part_prefix] = values
+    return parts
+
+
+def scale_value(
+    old_value: float, old_min: float, old_max: float, new_min: float, new_max: float
+) -> float:
+    return ((new_max - new_min) * (old_value - old_min) / (old_max - old_min)) + new_min
+
+
+def report_rows(
+    parts: dict[str, dict[str, Any]],
+    matcher: PartsMatcher,
+    part_name: Callable[[str], str] = str,
+) -> list[ReportRow]:
+    parts_by_rule: list[list[str]] = [[] for _ in matcher.rules]
+    for part_prefix in parts:
+        for i in matcher.match(part_prefix):
+            parts_by_rule[i].append(part_prefix)
+
+    rows: list[ReportRow] = []
+    skip_wear = set()
+    for rule, part_prefixes in zip(matcher.rules, parts_by_rule):
+        for part_prefix in part_prefixes:
+            part = parts[part_prefix]
+            for val_name, val_data in rule.values.items():
+                if val_name not in part:
+                    continue
+                score = None
+                if "range" in val_data:
+                    score = scale_value(
+                        part[val_name],
+                        val_data["range"]["min"],
+                        val_data["range"]["max"],
+                        0,
+                        100,
+                    )
+                rows.append(
+                    ReportRow(
+                        part_name(part_prefix),
+                        val_data["name"],
+                        part[val_name],
+                        score,
+                        f"{part_prefix}{val_name}",
+                        part_prefix,
+                    )
+                )
+                if val_name == "WEA":
+                    skip_wear.add(part_prefix)
+
+    for part_prefix, part in parts.items():
+        if part_prefix in skip_wear or "WEA" not in part:
+            continue
+        rows.append(
+            ReportRow(
+                part_name(part_prefix),
+                "wear",
+                part["WEA"],
+                part["WEA"],
+                f"{part_prefix}WEA",
+                part_prefix,
+            )
+        )
+    return rows
+
+
+class CarReport:
+    """
+    The car report of a document.
+
+    Every row is fed by its value tag and the AID tag of its part, so after an edit
+    only the rows of the affected parts have to be recomputed.
+    """
+
+    data: dict[str, ES2Field]
+    sorted_tags: list[str]
+    parts: dict[str, dict[str, Any]]
+    rows: list[ReportRow]
+
+    def __init__(
+        self,
+        data: dict[str, ES2Field],
+        matcher: PartsMatcher,
+        part_name: Callable[[str], str] = str,
+    ):
+        self.data = data
+        self.matcher = matcher
+        self.part_name = part_name
+        self.sorted_tags = sorted(data.keys())
+        self.parts = installed_parts(data, self.sorted_tags)
+        self.rows = report_rows(self.parts, matcher, part_name)
+        # Tags that feed rows -> the parts of those rows
+        self._parts_by_tag: dict[str, set[str]] = {}
+        self._add_feeds(self.rows)
+
+    def _add_feeds(self, rows: list[ReportRow]):
+        for row in rows:
+            self._parts_by_tag.setdefault(row.tag, set()).add(row.part)
+
+    def affected_parts(self, tags: list[str]) -> set[str]:
+        """
+        The parts whose rows can change when the values of tags change.
+        """
+        parts = set()
+        for tag in tags:
+            parts.update(self._parts_by_tag.get(tag, ()))
+            if tag.endswith("AID"):
+                # Also parts that were not installed before
+                parts.add(tag.removesuffix("AID"))
+        return parts
+
+    def update_part(self, part_prefix: str) -> list[ReportRow]:
+        """
+        Recompute the values of a part from the data, returns its new rows.
+        """
+        values = part_values(self.data, self.sorted_tags, part_prefix)
+        if values is None:
+            self.parts.pop(part_prefix, None)
+            return []
+        self.parts[part_prefix] = values
+        rows = report_rows({part_prefix: values}, self.matcher, self.part_name)
+        self._add_feeds(rows)
+        return rows
@@ -0,0 +1,131 @@
+"""
+Save a document safely: encode it, write a temporary file next to the original,
+verify the temporary file and then atomically replace the original with it.
+
+The original is only touched after the new file was read back and matched, it is
+then added to the BackupStore of the file.
+"""
+
+from dataclasses import dataclass
+from hashlib import blake2b
+from io import BytesIO
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Callable, Iterable
+
+from .backups import BackupStore, BackupVersion, RetentionPolicy
+from .es2.reader import ES2Reader
+from .es2.types import ES2Field
+from .es2.writer import ES2Writer
+
+logger = logging.getLogger(__name__)
+
+# Report progress every this many tags.
+PROGRESS_INTERVAL = 100
+
+# Called with the number of tags done and the total number of tags.
+ProgressCallback = Callable[[int, int], None]
+
+
+class SaveError(Exception):
+    pass
+
+
+class VerificationError(SaveError):
+    """
+    The written file does not read back as the encoded data.
+    """
+
+
+@dataclass
+class SaveResult:
+    filename: Path
+    backup: BackupVersion | None
+    # Raw bytes of every tag as now on disk, see ES2Reader.iter_raw.
+    raw_chunks: dict[str, bytes]
+
+
+def encode(
+    data: dict[str, ES2Field], progress: ProgressCallback | None = None
+) -> bytes:
+    stream = BytesIO()
+    writer = ES2Writer(stream)
+    for i, (tag, field) in enumerate(data.items(), 1):
+        writer.write_field(tag, field)
+        if progress and i % PROGRESS_INTERVAL == 0:
+            progress(i, len(data))
+    if progress:
+        progress(len(data), len(data))
+    return stream.getvalue()
+
+
+def chunk_digests(chunks: Iterable[tuple[str, bytes]]) -> dict[str, bytes]:
+    return {tag: blake2b(chunk, digest_size=16).digest() for tag, chunk in chunks}
+
+
+def verify(filename: str | os.PathLike, expected: dict[str, bytes]) -> dict[str, bytes]:
+    """
+    Index a written file and compare its tags with the expected chunk digests.
+
+    Returns the raw chunks of the file, raises VerificationError on a mismatch.
+    """
+    with open(filename, "rb") as f:
+        chunks = dict(ES2Reader(BytesIO(f.read())).iter_raw())
+    if len(chunks) != len(expected):
+        raise VerificationError(
+            f"'{filename}' has {len(chunks)} tags, expected {len(expected)}"
+        )
+    digests = chunk_digests(chunks.items())
+    for tag, digest in expected.items():
+        if digests.get(tag) != digest:
+            raise VerificationError(f"Tag '{tag}' of '{filename}' does not match")
+    return chunks
+
+
+def save_file(
+    filename: Path,
+    data: dict[str, ES2Field],
+    progress: ProgressCallback | None = None,
+    backup: bool = True,
+    retention: RetentionPolicy | None = None,
+) -> SaveResult:
+    """
+    Write data to filename, keeping a backup of the original when it exists.
+    """
+    encoded = encode(data, progress)
+    expected = chunk_digests(ES2Reader(BytesIO(encoded)).iter_raw())
+
+    # In the same directory, os.replace is only atomic on the same file system
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{filename.name}.", suffix=".tmp", dir=filename.parent
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        raw_chunks = verify(temp_name, expected)
+
+        backup_version = None
+        if filename.exists():
+            if backup:
+                backup_version = BackupStore(filename, retention).add(
+                    filename.read_bytes()
+                )
+            try:
+                shutil.copymode(filename, temp_name)
+            except OSError:
+                logger.exception("Cannot copy mode")
+        os.replace(temp_name, filename)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    logger.info("Saved '%s', backup %s", filename, backup_version)
+    return SaveResult(filename, backup_version, raw_chunks)
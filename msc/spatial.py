@@ -0,0 +1,205 @@
+"""
+Spatial indexes over points on a plane, like the x/z positions of transforms.
+"""
+
+from heapq import heappush, heapreplace, nsmallest
+from math import floor, hypot, inf, isfinite
+from typing import Iterable, Iterator
+
+from .es2.enums import ES2Key, ES2ValueType
+from .es2.types import ES2Field
+
+
+class GridIndex:
+    """
+    Points bucketed into square cells, a rectangle query only visits the cells it
+    overlaps.
+    """
+
+    cell_size: float
+    points: dict[str, tuple[float, float]]
+    cells: dict[tuple[int, int], dict[str, tuple[float, float]]]
+
+    def __init__(
+        self, cell_size: float, points: Iterable[tuple[str, float, float]] = ()
+    ):
+        self.cell_size = cell_size
+        self.points = {}
+        self.cells = {}
+        for key, x, y in points:
+            self.insert(key, x, y)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.points
+
+    def cell(self, x: float, y: float) -> tuple[int, int]:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def insert(self, key: str, x: float, y: float):
+        """
+        Add a point, or move it when key is already in the index.
+        """
+        if key in self.points:
+            self.remove(key)
+        self.points[key] = (x, y)
+        self.cells.setdefault(self.cell(x, y), {})[key] = (x, y)
+
+    def remove(self, key: str):
+        if key not in self.points:
+            return
+        cell = self.cell(*self.points.pop(key))
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def query_rect(
+        self, x0: float, y0: float, x1: float, y1: float
+    ) -> Iterator[tuple[str, float, float]]:
+        """
+        All points with x0 <= x <= x1 and y0 <= y <= y1.
+        """
+        (i0, j0), (i1, j1) = self.cell(x0, y0), self.cell(x1, y1)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) <= len(self.cells):
+            cells = (
+                self.cells[(i, j)]
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+                if (i, j) in self.cells
+            )
+        else:
+            # A large rectangle, cheaper to check every cell that has points.
+            cells = (
+                points
+                for (i, j), points in self.cells.items()
+                if i0 <= i <= i1 and j0 <= j <= j1
+            )
+        for points in cells:
+            for key, (x, y) in points.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    yield key, x, y
+
+    def within_radius(
+        self, x: float, y: float, radius: float
+    ) -> list[tuple[str, float]]:
+        """
+        All points within radius of x, y with their distance, nearest first.
+        """
+        found = []
+        for key, px, py in self.query_rect(
+            x - radius, y - radius, x + radius, y + radius
+        ):
+            distance = hypot(px - x, py - y)
+            if distance <= radius:
+                found.append((distance, key))
+        found.sort()
+        return [(key, distance) for distance, key in found]
+
+    def nearest(
+        self, x: float, y: float, count: int = 1, max_distance: float = inf
+    ) -> list[tuple[str, float]]:
+        """
+        The count points nearest to x, y with their distance, nearest first.
+
+        Searches rings of cells around the cell of x, y, until no cell in the next
+        ring can be nearer than the points found so far.
+        """
+        if count <= 0:
+            return []
+        ci, cj = self.cell(x, y)
+        # Max-heap of the best points so far, as (-distance, key)
+        best: list[tuple[float, str]] = []
+        seen = 0
+        ring = 0
+        while seen < len(self.points):
+            ring_distance = (ring - 1) * self.cell_size
+            if ring_distance > max_distance:
+                break
+            if len(best) == count and ring_distance > -best[0][0]:
+                break
+            if 8 * ring > len(self.cells):
+                # Sparse grid, cheaper to check every point once.
+                return self._nearest_of_all(x, y, count, max_distance)
+            for cell in _ring_cells(ci, cj, ring):
+                points = self.cells.get(cell)
+                if not points:
+                    continue
+                seen += len(points)
+                for key, (px, py) in points.items():
+                    distance = hypot(px - x, py - y)
+                    if distance > max_distance:
+                        continue
+                    if len(best) < count:
+                        heappush(best, (-distance, key))
+                    elif distance < -best[0][0]:
+                        heapreplace(best, (-distance, key))
+            ring += 1
+        return [(key, distance) for distance, key in sorted((-d, k) for d, k in best)]
+
+    def _nearest_of_all(
+        self, x: float, y: float, count: int, max_distance: float
+    ) -> list[tuple[str, float]]:
+        distances = (
+            (hypot(px - x, py - y), key) for key, (px, py) in self.points.items()
+        )
+        return [
+            (key, distance)
+            for distance, key in nsmallest(count, distances)
+            if distance <= max_distance
+        ]
+
+
+def _ring_cells(ci: int, cj: int, ring: int) -> Iterator[tuple[int, int]]:
+    """
+    The cells at exactly ring cells from ci, cj.
+    """
+    if ring == 0:
+        yield ci, cj
+        return
+    for i in range(ci - ring, ci + ring + 1):
+        yield i, cj - ring
+        yield i, cj + ring
+    for j in range(cj - ring + 1, cj + ring):
+        yield ci - ring, j
+        yield ci + ring, j
+
+
+def transform_positions(
+    data: dict[str, ES2Field]
+) -> Iterator[tuple[str, float, float]]:
+    """
+    The game x, z position of every transform in the data, positions that are NaN or
+    infinite are left out.
+    """
+    for tag, field in data.items():
+        header = field.header
+        if (
+            header.collection_type == ES2Key.Null
+            and header.value_type == ES2ValueType.transform
+            and field.value is not None
+        ):
+            x, z = field.value.position.x, field.value.position.z
+            if isfinite(x) and isfinite(z):
+                yield tag, x, z
+
+
+class TransformIndex(GridIndex):
+    """
+    The positions of all transforms of a document on the x/z plane, in meters.
+    """
+
+    CELL_SIZE = 50.0
+
+    def __init__(self, data: dict[str, ES2Field] | None = None):
+        super().__init__(self.CELL_SIZE, transform_positions(data or {}))
+
+    def update(self, tag: str, field: ES2Field | None):
+        """
+        Update a single tag after an edit, or remove it when field is None.
+        """
+        self.remove(tag)
+        if field is not None:
+            for _, x, z in transform_positions({tag: field}):
+                self.insert(tag, x, z)
@@ -0,0 +1,69 @@
+from io import BytesIO
+import struct
+
+from ruamel.yaml import YAML
+
+from msc.audit import audit_file, audit_suffixes
+from msc.es2.reader import ES2Reader, read_file
+from msc.report import CarReport, PartsMatcher
+
+
+def _matcher() -> PartsMatcher:
+    with open("gui/vin.yaml") as f:
+        return PartsMatcher(YAML().load(f)["parts"])
+
+
+def _damage_tag(data: bytes, tag: str) -> bytes:
+    """
+    Replace the type hash of a tag with an unknown one.
+    """
+    reader = ES2Reader(BytesIO(data))
+    while reader.next():
+        if reader.current_tag.tag == tag:
+            # 255, then the type hash
+            offset = reader.current_tag.settings_position + 1
+            return data[:offset] + struct.pack("<I", 12345) + data[offset + 4 :]
+    raise KeyError(tag)
+
+
+def test_audit_reads_only_needed_tags():
+    matcher = _matcher()
+    data = read_file("msc/tests/data/carparts.txt")
+    partial_data = read_file("msc/tests/data/carparts.txt", audit_suffixes(matcher))
+
+    assert 0 < len(partial_data) < len(data)
+    assert all(partial_data[tag] == data[tag] for tag in partial_data)
+
+    rows = audit_file("msc/tests/data/carparts.txt", matcher)
+
+    expected = CarReport(data, matcher).rows
+    assert [(row.part, row.item, row.value) for row in rows] == [
+        (row.part, row.key, row.value) for row in expected
+    ]
+    assert {row.problem for row in rows} == {""}
+
+
+def test_damaged_part_tags(tmp_path):
+    matcher = _matcher()
+    with open("msc/tests/data/carparts.txt", "rb") as f:
+        data = f.read()
+    rows = CarReport(read_file("msc/tests/data/carparts.txt"), matcher).rows
+    damaged = _damage_tag(_damage_tag(data, "VIN1031WEA"), "VIN1032AID")
+    filename = tmp_path / "damaged.txt"
+    filename.write_bytes(damaged)
+
+    report = CarReport(read_file(filename, tolerant=True), matcher)
+    assert "VIN1031" in report.parts and "VIN1032" not in report.parts
+    assert [row.tag for row in report.rows] == [
+        row.tag for row in rows if row.tag != "VIN1031WEA" and row.part != "VIN1032"
+    ]
+    assert report.update_part("VIN1031") == [
+        row for row in report.rows if row.part == "VIN1031"
+    ]
+
+    audit_rows = audit_file(filename, matcher)
+    assert {(row.check, row.item) for row in audit_rows[:2]} == {
+        ("error", "VIN1031WEA"),
+        ("error", "VIN1032AID"),
+    }
+    assert [row.item for row in audit_rows[2:]] == [row.key for row in report.rows]
@@ -0,0 +1,57 @@
+from msc.bolts import BoltChecker, alternate_names
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.es2.reader import read_file
+from msc.es2.types import ES2Field, ES2Header
+
+
+def _bolts(*values: int) -> ES2Field:
+    return ES2Field(
+        ES2Header(ES2Key.List, value_type=ES2ValueType.string),
+        [f"int({value})" for value in values],
+    )
+
+
+def _part(data: dict, name: str, bolts: ES2Field, *, bolted=True, installed=True):
+    data[f"{name}Bolts"] = bolts
+    data[f"{name}Bolted"] = ES2Field.from_value_type(ES2ValueType.bool, bolted)
+    data[f"{name}Tightness"] = ES2Field.from_value_type(ES2ValueType.float, 8.0)
+    data[f"{name}Installed"] = ES2Field.from_value_type(ES2ValueType.bool, installed)
+
+
+def test_alternate_names():
+    assert alternate_names("Valvecover")[:2] == ("valvecover", "rocker cover")
+    assert "fan belt(clone)" in alternate_names("Fan belt")
+    assert "fanbelt(clone)" in alternate_names("Fan belt")
+
+
+def test_check_bolts():
+    data = read_file("msc/tests/data/savefile.txt")
+    _part(data, "Alternator", _bolts(8, 8))
+    _part(data, "Oilpan", _bolts(8, 3, 0, 8))
+    _part(data, "Fan belt", _bolts(8), bolted=False)
+    _part(data, "Headers", _bolts(0, 0), installed=False)
+    # Tags of the valve cover use another name
+    data["ValvecoverBolts"] = _bolts(8, 8, 8, 8)
+    _part(data, "rocker cover", _bolts(2, 8, 8, 8))
+    del data["rocker coverBolts"]
+
+    checker = BoltChecker(data)
+    problems = {part.name: part for part in checker.check_bolts()}
+
+    assert {"Alternator", "Valvecover"} <= {part.name for part in checker.parts}
+    assert {"Alternator", "Headers", "Valvecover"} & problems.keys() == set()
+    assert problems["Oilpan"].loose_bolts == [1]
+    assert problems["Oilpan"].missing_bolts == [2]
+    assert not problems["Fan belt"].bolted
+    assert "Hoist" in {part["name"] for part in checker.not_found}
+
+
+def test_damaged_tags_not_checked():
+    data = {}
+    _part(data, "Alternator", _bolts(8, 3))
+    data["AlternatorBolted"] = ES2Field.raw(b"", "damaged")
+
+    checker = BoltChecker(data)
+    assert checker.parts == []
+    assert checker.not_found[0]["bolted"] is None
+    assert checker.not_found[0]["bolts"] == "AlternatorBolts"
@@ -0,0 +1,87 @@
+import glob
+from io import BytesIO
+import struct
+
+import pytest
+
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.es2.fsck import _check_common, check_bytes, check_files
+from msc.es2.reader import ES2Reader, read_file
+from msc.es2.types import ES2Field, ES2Header
+from msc.es2.writer import ES2Writer
+
+
+@pytest.mark.parametrize("filename", sorted(glob.glob("msc/tests/data/*.txt")))
+def test_healthy_files(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    result = check_bytes(data)
+    assert result.problems == []
+    assert result.tags == len(read_file(filename))
+
+
+@pytest.fixture
+def data():
+    with open("msc/tests/data/simple.txt", "rb") as f:
+        return bytearray(f.read())
+
+
+def tag_end(data, tag):
+    """
+    Offset of the terminator of a tag.
+    """
+    reader = ES2Reader(BytesIO(bytes(data)))
+    while reader.next():
+        if reader.current_tag.tag == tag:
+            return reader.current_tag.next_tag_position - 1
+    raise KeyError(tag)
+
+
+def test_bad_terminator(data):
+    offset = tag_end(data, "byte")
+    data[offset] = 0
+    result = check_bytes(bytes(data))
+    assert [(p.offset, p.tag) for p in result.problems] == [(offset, "byte")]
+    assert "terminator" in result.problems[0].message
+    # The walk goes on after the broken tag
+    assert result.tags == 5
+
+
+def test_unknown_type(data):
+    offset = data.index(struct.pack("<I", ES2ValueType.string.value))
+    data[offset : offset + 4] = struct.pack("<I", 12345)
+    result = check_bytes(bytes(data))
+    assert [(p.offset, p.tag) for p in result.problems] == [(offset, "string")]
+    assert "12345" in result.problems[0].message
+
+
+def test_truncated(data):
+    result = check_bytes(bytes(data[:-3]))
+    assert len(result.problems) == 1
+    assert "past the end of the file" in result.problems[0].message
+
+
+def test_bad_marker(data):
+    offset = tag_end(data, "bool") + 1
+    data[offset] = 0
+    result = check_bytes(bytes(data))
+    assert [p.offset for p in result.problems] == [offset]
+    assert result.tags == 1
+
+
+def test_check_files(tmp_path):
+    broken = tmp_path / "broken.txt"
+    broken.write_bytes(b"\x7e\x01a")
+    results = list(
+        check_files(["msc/tests/data/simple.txt", broken, tmp_path / "missing.txt"], 2)
+    )
+    assert [result.ok for result in results] == [True, False, False]
+
+
+def test_fixed_size_array_fast_path():
+    stream = BytesIO()
+    header = ES2Header(ES2Key.NativeArray, value_type=ES2ValueType.float)
+    ES2Writer(stream).write_field("floats", ES2Field(header, [1.0, 2.0, 3.0]))
+    data = stream.getvalue()
+    assert _check_common(data, 0) == len(data)
+    assert check_bytes(data).problems == []
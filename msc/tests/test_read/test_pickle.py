@@ -0,0 +1,14 @@
+import pickle
+
+import pytest
+
+from msc.es2.reader import read_file
+
+
+@pytest.mark.parametrize("filename", ["simple", "carparts", "items2", "savefile", "speedcam", "Mods"])
+def test_pickle_roundtrip(filename: str):
+    data = read_file(f"msc/tests/data/{filename}.txt")
+
+    unpickled = pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    assert unpickled == data
@@ -0,0 +1,77 @@
+import math
+
+import pytest
+
+from msc.es2.reader import read_file
+from msc.query import Column, QueryError, ValueIndex, is_query
+
+
+@pytest.fixture(scope="module")
+def carparts():
+    data = read_file("msc/tests/data/carparts.txt")
+    return data, ValueIndex(data)
+
+
+def test_is_query():
+    assert is_query("type:float")
+    assert is_query("VIN value>=10")
+    assert not is_query("VIN*POS")
+
+
+def test_query_range(carparts):
+    data, index = carparts
+    tags = index.query("type:float value<50 tag:*WEA")
+
+    expected = {
+        tag
+        for tag, field in data.items()
+        if tag.endswith("WEA") and isinstance(field.value, float) and field.value < 50
+    }
+    assert tags == expected
+    assert tags
+
+
+def test_query_near(carparts):
+    data, index = carparts
+    tag = next(iter(index.positions.points))
+    x, z = index.positions.points[tag]
+
+    assert tag in index.query(f"near:{tag},1")
+    assert index.query(f"near:{tag},1") == index.query(f"near:{x},{z},1")
+    for other in index.query(f"type:transform near:{tag},10"):
+        position = data[other].value.position
+        assert math.hypot(position.x - x, position.z - z) <= 10
+
+
+def test_query_update(carparts):
+    data, _ = carparts
+    index = ValueIndex(data)
+    tag = next(iter(index.query("type:float value>=0")))
+
+    index.update(tag, None)
+
+    assert tag not in index.query("type:float value>=0")
+    index.update(tag, data[tag])
+    assert tag in index.query(f"value={data[tag].value}")
+
+
+def test_query_invalid(carparts):
+    _, index = carparts
+    with pytest.raises(QueryError):
+        index.query("near:1,2")
+
+
+def test_column_nan():
+    column = Column({"a": 1.0, "b": math.nan, "c": 0.5, "d": 2.0})
+    assert column.keys == [0.5, 1.0, 2.0]
+    assert column.select("<", 1.5) == {"a", "c"}
+    assert column.select(">=", 0.0) == {"a", "c", "d"}
+    assert column.select("!=", 1.0) == {"b", "c", "d"}
+    assert column.select("=", math.nan) == set()
+    assert column.select("!=", math.nan) == {"a", "b", "c", "d"}
+
+    column.remove("b")
+    column.add("e", math.nan)
+    column.remove("d")
+    assert column.select("!=", 0.5) == {"a", "e"}
+    assert column.keys == [0.5, 1.0]
@@ -1,4 +1,4 @@
-from msc.es2.reader import ES2Reader
+from msc.es2.reader import ES2Reader, read_chunk
 
 from msc.es2.unity import (
     Color,
@@ -37,3 +37,14 @@ def test_read_complex_file():
         assert isinstance(data["vector3"].value, Vector3)
         assert isinstance(data["texture2d"].value, Texture2D)
         assert isinstance(data["transform"].value, Transform)
+
+
+def test_read_raw_chunks():
+    with open("msc/tests/data/carparts.txt", "rb") as f:
+        reader = ES2Reader(f)
+        data = reader.read_all()
+        chunks = dict(reader.iter_raw())
+
+    assert list(chunks.keys()) == list(data.keys())
+    for tag, chunk in chunks.items():
+        assert read_chunk(chunk) == data[tag]
@@ -0,0 +1,83 @@
+import math
+import random
+
+import pytest
+
+from msc.es2.reader import read_file
+from msc.spatial import GridIndex, TransformIndex
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(40)
+    return [
+        (f"p{i}", rng.uniform(-1000, 1000), rng.uniform(-1000, 1000))
+        for i in range(2000)
+    ]
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    return GridIndex(50.0, points)
+
+
+def _distances(points, x, y):
+    return sorted((math.hypot(px - x, py - y), key) for key, px, py in points)
+
+
+@pytest.mark.parametrize("x, y", [(0, 0), (999, -999), (5000, 5000)])
+def test_nearest(points, index, x, y):
+    expected = [(key, d) for d, key in _distances(points, x, y)[:7]]
+    assert index.nearest(x, y, 7) == expected
+
+
+def test_nearest_no_count(index):
+    assert index.nearest(0, 0, 0) == []
+    assert index.nearest(0, 0, -1) == []
+
+
+def test_nearest_max_distance(points, index):
+    expected = [(key, d) for d, key in _distances(points, 10, 20) if d <= 60][:50]
+    assert index.nearest(10, 20, 50, max_distance=60) == expected
+
+
+def test_within_radius(points, index):
+    expected = [(key, d) for d, key in _distances(points, -300, 400) if d <= 120]
+    assert index.within_radius(-300, 400, 120) == expected
+    assert expected
+
+
+def test_query_rect(points, index):
+    expected = {
+        key for key, x, y in points if -100 <= x <= 250 and 30 <= y <= 700
+    }
+    assert {key for key, _, _ in index.query_rect(-100, 30, 250, 700)} == expected
+
+
+def test_transform_index_update():
+    data = read_file("msc/tests/data/carparts.txt")
+    transforms = TransformIndex(data)
+    assert transforms
+    tag = next(iter(transforms.points))
+    field = data[tag]
+
+    field.value.position.x += 100
+    transforms.update(tag, field)
+    assert transforms.points[tag][0] == field.value.position.x
+    assert transforms.nearest(*transforms.points[tag])[0] == (tag, 0.0)
+
+    transforms.update(tag, None)
+    assert tag not in transforms
+
+
+@pytest.mark.parametrize("x", [math.nan, math.inf])
+def test_transform_index_not_finite(x):
+    data = read_file("msc/tests/data/savefile.txt")
+    transforms = TransformIndex(data)
+    tag = next(iter(transforms.points))
+    field = data[tag]
+
+    field.value.position.x = x
+    transforms.update(tag, field)
+    assert tag not in transforms
+    assert tag not in TransformIndex(data)
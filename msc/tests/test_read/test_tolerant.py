@@ -0,0 +1,58 @@
+from io import BytesIO
+import struct
+
+import pytest
+
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.es2.reader import ES2Reader, read_chunk
+from msc.es2.types import RawValue
+from msc.save import encode
+
+
+@pytest.fixture
+def data():
+    with open("msc/tests/data/simple.txt", "rb") as f:
+        return bytearray(f.read())
+
+
+def damage_type(data, value_type):
+    offset = data.index(struct.pack("<I", value_type.value))
+    data[offset : offset + 4] = struct.pack("<I", 12345)
+    return bytes(data)
+
+
+def test_unknown_type(data):
+    damaged = damage_type(data, ES2ValueType.string)
+    with pytest.raises(ValueError):
+        ES2Reader(BytesIO(damaged)).read_all()
+
+    fields = ES2Reader(BytesIO(damaged), tolerant=True).read_all()
+    assert [tag for tag, field in fields.items() if field.is_raw] == ["string"]
+    assert isinstance(fields["string"].value, RawValue)
+    assert fields["int32"].value == 1
+    # Written back unchanged
+    assert encode(fields) == damaged
+
+
+def test_unsupported_collection(data):
+    offset = data.index(struct.pack("<I", ES2ValueType.byte.value)) - 1
+    data[offset:offset] = bytes([ES2Key.HashSet.value])
+    # Keep the length of the tag right
+    reader = ES2Reader(BytesIO(bytes(data)))
+    reader.next()
+    reader.next()
+    length_offset = reader.current_tag.settings_position - 4
+    (length,) = struct.unpack_from("<i", data, length_offset)
+    data[length_offset : length_offset + 4] = struct.pack("<i", length + 1)
+
+    fields = ES2Reader(BytesIO(bytes(data)), tolerant=True).read_all()
+    assert fields["byte"].is_raw
+    assert encode(fields) == bytes(data)
+
+
+def test_read_chunk(data):
+    damaged = damage_type(data, ES2ValueType.float)
+    chunks = dict(ES2Reader(BytesIO(damaged)).iter_raw())
+    field = read_chunk(chunks["float"], tolerant=True)
+    assert field.is_raw and field.value.chunk == chunks["float"]
+    assert read_chunk(chunks["bool"], tolerant=True).value is True
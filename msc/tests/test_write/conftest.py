@@ -0,0 +1,10 @@
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def savefile(tmp_path):
+    filename = tmp_path / "carparts.txt"
+    shutil.copyfile("msc/tests/data/carparts.txt", filename)
+    return filename
@@ -0,0 +1,96 @@
+from io import BytesIO
+
+import pytest
+
+from msc.backups import (
+    BackupError,
+    BackupStore,
+    RetentionPolicy,
+    chunks_to_bytes,
+    decode_records,
+    encode_records,
+    file_chunks,
+)
+from msc.es2.reader import ES2Reader
+from msc.es2.writer import ES2Writer
+
+
+def _versions(filename, count):
+    """
+    The file content with a different float value in every version.
+    """
+    data = dict(ES2Reader(BytesIO(filename.read_bytes())).iter_all())
+    tags = [tag for tag, field in data.items() if isinstance(field.value, float)]
+    versions = []
+    for i in range(count):
+        data[tags[i % len(tags)]].value += 1
+        stream = BytesIO()
+        writer = ES2Writer(stream)
+        for tag, field in data.items():
+            writer.write_field(tag, field)
+        versions.append(stream.getvalue())
+    return versions
+
+
+def test_records_round_trip(savefile):
+    chunks = file_chunks(savefile.read_bytes())
+    tags = list(chunks)
+    some = {tag: chunks[tag] for tag in tags[::3]}
+    assert decode_records(encode_records(tags, some)) == (tags, some)
+    assert chunks_to_bytes(chunks) == savefile.read_bytes()
+
+
+def test_restore_versions(savefile):
+    versions = _versions(savefile, 5)
+    store = BackupStore(savefile)
+    for data in versions:
+        store.add(data)
+
+    store = BackupStore(savefile)
+    assert [version.number for version in store.versions] == [0, 1, 2, 3, 4]
+    assert [version.changed for version in store.versions[1:]] == [1, 1, 1, 1]
+    for number, data in enumerate(versions):
+        assert chunks_to_bytes(store.read_version(number)) == data
+
+
+def test_retention_max_versions(savefile):
+    versions = _versions(savefile, 6)
+    store = BackupStore(savefile, RetentionPolicy(max_versions=3))
+    for data in versions:
+        store.add(data)
+
+    assert store.base == 3
+    assert [version.number for version in store.versions] == [3, 4, 5]
+    for number in [3, 4, 5]:
+        assert chunks_to_bytes(store.read_version(number)) == versions[number]
+    with pytest.raises(BackupError):
+        store.read_version(2)
+    assert sorted(p.name for p in store.directory.iterdir()) == [
+        "base-3.bin",
+        "delta-4.bin",
+        "delta-5.bin",
+        "index.json",
+    ]
+
+
+def test_retention_max_age(savefile):
+    versions = _versions(savefile, 3)
+    store = BackupStore(savefile, RetentionPolicy(max_age_days=1))
+    for i, data in enumerate(versions):
+        store.add(data, timestamp=i * 24 * 60 * 60)
+    store.prune(now=2.5 * 24 * 60 * 60)
+
+    assert [version.number for version in store.versions] == [2]
+    assert chunks_to_bytes(store.read_version(2)) == versions[2]
+
+
+def test_restore_over_save(savefile):
+    versions = _versions(savefile, 2)
+    store = BackupStore(savefile)
+    store.add(versions[0])
+    current = savefile.read_bytes()
+
+    store.restore(0)
+
+    assert savefile.read_bytes() == versions[0]
+    assert chunks_to_bytes(store.read_version(1)) == current
@@ -0,0 +1,68 @@
+import pytest
+
+from msc.bulk import BulkEditError, bulk_edit, compile_expression
+from msc.es2.reader import read_file
+
+
+@pytest.fixture(scope="module")
+def data():
+    return read_file("msc/tests/data/carparts.txt")
+
+
+def test_bulk_edit(data):
+    values = bulk_edit(data, "tag:*WEA type:float value<100", "100")
+    assert values
+    assert all(tag.endswith("WEA") for tag in values)
+    assert all(isinstance(value, float) for value in values.values())
+    assert set(values.values()) == {100.0}
+    # Only the result, the data is not changed
+    assert all(data[tag].value < 100 for tag in values)
+
+
+def test_expression(data):
+    expression = "min(value, 10) if 'WEA' in tag else value"
+    assert bulk_edit(data, "type:float tag:VIN2091*", expression) == {
+        "VIN2091WEA": 10.0
+    }
+    assert compile_expression("min(value * 2, 5)")(4, "x") == 5
+    assert compile_expression("not value")(True, "x") is False
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["__import__('os')", "value.__class__", "9 ** 9 ** 9", "open('x')", "value +"],
+)
+def test_rejected_expressions(expression):
+    with pytest.raises(BulkEditError):
+        compile_expression(expression)
+
+
+def test_wrong_type(data):
+    with pytest.raises(BulkEditError):
+        bulk_edit(data, "type:bool", "1")
+    with pytest.raises(BulkEditError):
+        bulk_edit(data, "type:int32", "value + 0.5")
+
+
+def test_multiply_only_numbers(data):
+    assert compile_expression("value * 2.5")(2, "x") == 5.0
+    with pytest.raises(BulkEditError):
+        compile_expression("str(value) * 10000000000")(1, "x")
+    with pytest.raises(BulkEditError):
+        bulk_edit(data, "type:string", "value * 3")
+
+
+def test_modulo_only_numbers(data):
+    assert compile_expression("value % 3")(7, "x") == 1
+    with pytest.raises(BulkEditError):
+        compile_expression("str(value) + '%0200000000d' % 0")(1, "x")
+    with pytest.raises(BulkEditError):
+        bulk_edit(data, "type:string", "value % 1")
+
+
+@pytest.mark.parametrize(
+    "expression", ["value * 1e38", "1e39", "float('inf')", "float('nan')"]
+)
+def test_float_out_of_range(data, expression):
+    with pytest.raises(BulkEditError):
+        bulk_edit(data, "type:float tag:*WEA", expression)
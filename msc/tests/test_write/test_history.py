@@ -0,0 +1,110 @@
+from msc.history import EditHistory, EditStep
+
+
+def apply(data, values):
+    data.update(values)
+
+
+def record(history, data, description, values):
+    changes = {tag: (data[tag], value) for tag, value in values.items()}
+    history.record(EditStep(description, changes))
+    apply(data, values)
+
+
+def test_undo_redo():
+    data = {"a": 1, "b": 2}
+    history = EditHistory()
+    record(history, data, "a", {"a": 10})
+    record(history, data, "a and b", {"a": 20, "b": 30})
+    assert not history.is_clean
+
+    apply(data, history.undo())
+    assert data == {"a": 10, "b": 2}
+    apply(data, history.redo())
+    assert data == {"a": 20, "b": 30}
+
+    values = history.undo(5)
+    assert values == {"a": 1, "b": 2}
+    apply(data, values)
+    assert history.is_clean
+    assert not history.can_undo()
+
+    apply(data, history.redo(2))
+    assert data == {"a": 20, "b": 30}
+
+
+def test_clean_position():
+    data = {"a": 1}
+    history = EditHistory()
+    record(history, data, "1", {"a": 2})
+    history.mark_clean()
+    apply(data, history.undo())
+    assert not history.is_clean
+
+    # The saved state cannot be redone anymore
+    record(history, data, "2", {"a": 3})
+    apply(data, history.undo())
+    assert not history.is_clean
+    assert history.clean_position is None
+
+
+def test_max_steps():
+    data = {"a": 0}
+    history = EditHistory(max_steps=3)
+    for value in range(1, 6):
+        record(history, data, str(value), {"a": value})
+    assert [step.description for step in history.undo_steps()] == ["5", "4", "3"]
+    assert history.undo(10) == {"a": 2}
+    assert not history.is_clean
+
+
+def test_undo_past_overlapping_save():
+    data = {"a": 0}
+    history = EditHistory()
+    record(history, data, "1", {"a": 1})
+    # The state with a = 1 is saved while the next edits are made
+    state = history.state()
+    record(history, data, "2", {"a": 2})
+    record(history, data, "3", {"a": 3})
+    history.mark_clean(state)
+    assert not history.is_clean
+
+    apply(data, history.undo(2))
+    assert data == {"a": 1}
+    assert history.is_clean
+    apply(data, history.undo())
+    assert not history.is_clean
+
+
+def test_overlapping_save_of_dropped_steps():
+    data = {"a": 0}
+    history = EditHistory(max_steps=2)
+    record(history, data, "1", {"a": 1})
+    state = history.state()
+    for value in range(2, 4):
+        record(history, data, str(value), {"a": value})
+    # Step 1 was dropped, the saved state is the oldest one left
+    history.mark_clean(state)
+    assert history.clean_position == 0
+    apply(data, history.undo(2))
+    assert data == {"a": 1}
+    assert history.is_clean
+
+    record(history, data, "4", {"a": 4})
+    state = history.state()
+    for value in range(5, 8):
+        record(history, data, str(value), {"a": value})
+    history.mark_clean(state)
+    assert history.clean_position is None
+
+
+def test_save_state_lost():
+    data = {"a": 0}
+    history = EditHistory()
+    record(history, data, "1", {"a": 1})
+    state = history.state()
+    apply(data, history.undo())
+    record(history, data, "2", {"a": 2})
+    history.mark_clean(state)
+    assert history.clean_position is None
+    assert not history.is_clean
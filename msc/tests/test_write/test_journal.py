@@ -0,0 +1,66 @@
+from msc.es2.reader import read_file
+from msc.es2.types import ES2Field
+from msc.journal import EditJournal
+
+
+def edit(journal, data, tag, value):
+    field = data[tag]
+    old = ES2Field(field.header, field.value)
+    journal.append(tag, old, ES2Field(field.header, value))
+    field.value = value
+
+
+def float_tags(data):
+    return [tag for tag, field in data.items() if isinstance(field.value, float)]
+
+
+def test_replay(savefile):
+    data = read_file(savefile)
+    first, second = float_tags(data)[:2]
+    journal = EditJournal(savefile)
+    edit(journal, data, first, 1.5)
+    edit(journal, data, first, 2.5)
+    edit(journal, data, second, 3.5)
+    journal.close()
+
+    entries = list(journal.entries())
+    assert [entry.tag for entry in entries] == [first, first, second]
+    assert entries[1].new.value == 2.5
+
+    fresh = read_file(savefile)
+    result = journal.replay(fresh)
+    assert result.applied == [first, second]
+    assert fresh == data
+
+    result = journal.replay(fresh)
+    assert result.unchanged == [first, second]
+
+    journal.clear()
+    assert not journal.exists()
+
+
+def test_torn_record(savefile):
+    data = read_file(savefile)
+    first, second = float_tags(data)[:2]
+    journal = EditJournal(savefile)
+    edit(journal, data, first, 1.5)
+    edit(journal, data, second, 3.5)
+    journal.close()
+
+    content = journal.path.read_bytes()
+    journal.path.write_bytes(content[:-3])
+    assert [entry.tag for entry in journal.entries()] == [first]
+
+
+def test_conflict(savefile):
+    data = read_file(savefile)
+    tag = float_tags(data)[0]
+    journal = EditJournal(savefile)
+    edit(journal, data, tag, 1.5)
+    journal.close()
+
+    fresh = read_file(savefile)
+    fresh[tag].value = 7.5
+    result = journal.replay(fresh)
+    assert result.conflicts == [tag]
+    assert fresh[tag].value == 7.5
@@ -0,0 +1,62 @@
+import pytest
+
+from msc import save
+from msc.backups import BackupStore
+from msc.es2.reader import ES2Reader, read_file
+from msc.save import VerificationError, chunk_digests, save_file, verify
+
+
+def test_save_file(savefile):
+    original = savefile.read_bytes()
+    data = read_file(savefile)
+    tag = next(tag for tag, field in data.items() if isinstance(field.value, float))
+    data[tag].value += 1
+
+    result = save_file(savefile, data)
+
+    assert result.backup is not None and result.backup.number == 0
+    assert BackupStore(savefile).restore(0, savefile.with_name("old.txt"))
+    assert savefile.with_name("old.txt").read_bytes() == original
+    assert read_file(savefile) == data
+    assert result.raw_chunks.keys() == data.keys()
+    assert sorted(p.name for p in savefile.parent.iterdir()) == [
+        "carparts.txt",
+        "carparts.txt.backups",
+        "old.txt",
+    ]
+
+    result = save_file(savefile, data)
+    assert result.backup is not None and result.backup.number == 1
+    assert result.backup.changed == 1
+
+
+def test_save_file_progress(savefile):
+    data = read_file(savefile)
+    progress = []
+    save_file(savefile, data, lambda done, total: progress.append((done, total)))
+    assert progress[-1] == (len(data), len(data))
+
+
+def test_verify_mismatch(savefile):
+    with open(savefile, "rb") as f:
+        expected = chunk_digests(ES2Reader(f).iter_raw())
+    verify(savefile, expected)
+
+    expected[next(iter(expected))] = b"other"
+    with pytest.raises(VerificationError):
+        verify(savefile, expected)
+
+
+def test_failed_save_keeps_original(savefile, monkeypatch):
+    original = savefile.read_bytes()
+    data = read_file(savefile)
+
+    def fail(filename, expected):
+        raise VerificationError("broken")
+
+    monkeypatch.setattr(save, "verify", fail)
+    with pytest.raises(VerificationError):
+        save_file(savefile, data)
+
+    assert savefile.read_bytes() == original
+    assert [p.name for p in savefile.parent.iterdir()] == ["carparts.txt"]
@@ -1,6 +1,9 @@
 from io import BytesIO
-from msc.es2.enums import ES2ValueType
-from msc.es2.types import ES2Field
+
+import pytest
+
+from msc.es2.enums import ES2Key, ES2ValueType
+from msc.es2.types import ES2Field, ES2Header
 from msc.es2.unity import (
     Color,
     Mesh,
@@ -10,7 +13,7 @@ from msc.es2.unity import (
     Texture2D,
     Transform,
 )
-from msc.es2.writer import ES2Writer
+from msc.es2.writer import ES2Writer, check_field
 
 
 def test_write_file():
@@ -32,3 +35,18 @@ def test_write_file():
         writer.save_all()
 
         assert len(f.getvalue()) == 338
+
+
+def test_check_field():
+    check_field(ES2Field.from_value_type(ES2ValueType.byte, 255))
+    check_field(ES2Field.from_value_type(ES2ValueType.float, float("inf")))
+    for value_type, value in [
+        (ES2ValueType.byte, 300),
+        (ES2ValueType.int32, 2**31),
+        (ES2ValueType.float, 1e39),
+    ]:
+        with pytest.raises(ValueError):
+            check_field(ES2Field.from_value_type(value_type, value))
+    with pytest.raises(ValueError):
+        header = ES2Header(ES2Key.List, value_type=ES2ValueType.vector3)
+        check_field(ES2Field(header, [Vector3(0, 1e39, 0)]))